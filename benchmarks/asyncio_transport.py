@@ -0,0 +1,90 @@
+"""Threaded (WebSocketApp) vs asyncio transport, seen from an asyncio consumer
+
+A local server sends frames stamped with their send time; the consumer is an asyncio coroutine,
+so the threaded transport has to hand every message over to the event loop
+while the asyncio transport delivers on the loop directly.
+Reports messages per second at full speed, and p50/p99 send -> consumer latency at a paced rate
+(at full speed the latency would mostly measure the backlog).
+
+Requires the `websockets` package. Run with `python -m benchmarks.asyncio_transport`
+"""
+import asyncio
+import threading
+import time
+
+from bittrade_kraken_websocket.connection.asyncio_connection import (
+    raw_websocket_connection_async,
+    to_async_iterable,
+)
+from bittrade_kraken_websocket.connection.generic import raw_websocket_connection
+from bittrade_kraken_websocket.messages.listen import keep_messages_only
+
+import websockets
+
+MESSAGES = 20_000
+PACED_BURST = 20  # paced mode sends bursts of 20 messages every millisecond
+
+
+def start_server(paced: bool) -> int:
+    ready = threading.Event()
+    port = []
+
+    async def handler(websocket, *args):
+        for i in range(MESSAGES):
+            await websocket.send(
+                f'[1,{{"t":{time.perf_counter_ns()}}},"ticker","XBT/USD"]'
+            )
+            if paced and not i % PACED_BURST:
+                await asyncio.sleep(0.001)
+        await asyncio.Future()  # keep the socket open, client closes
+
+    async def serve():
+        async with websockets.serve(handler, "127.0.0.1", 0) as server:
+            port.append(server.sockets[0].getsockname()[1])
+            ready.set()
+            await asyncio.Future()
+
+    threading.Thread(target=lambda: asyncio.run(serve()), daemon=True).start()
+    ready.wait()
+    return port[0]
+
+
+def _report(name: str, full_speed, paced):
+    _, elapsed_ns = full_speed
+    latencies = sorted(paced[0])
+    print(
+        f"{name:>8} | {MESSAGES / elapsed_ns * 1e9:>10.0f} msg/s"
+        f" | p50 {latencies[len(latencies) // 2] / 1000:>8.1f} µs"
+        f" | p99 {latencies[int(len(latencies) * 0.99)] / 1000:>8.1f} µs"
+    )
+
+
+async def consume(messages):
+    latencies = []
+    start = None
+    async for message in to_async_iterable(messages):
+        now = time.perf_counter_ns()
+        start = start or now
+        latencies.append(now - message[1]["t"])
+        if len(latencies) == MESSAGES:
+            return latencies, time.perf_counter_ns() - start
+
+
+def main():
+    full_speed_url = f"ws://127.0.0.1:{start_server(paced=False)}"
+    paced_url = f"ws://127.0.0.1:{start_server(paced=True)}"
+
+    async def threaded(url):
+        messages = raw_websocket_connection(url).pipe(keep_messages_only())
+        return await consume(messages)
+
+    async def native(url):
+        messages = raw_websocket_connection_async(url).pipe(keep_messages_only())
+        return await consume(messages)
+
+    for name, run in (("threaded", threaded), ("asyncio", native)):
+        _report(name, asyncio.run(run(full_speed_url)), asyncio.run(run(paced_url)))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,53 @@
+"""Per message cost of the ticker pipeline, one emission per message vs batches of messages
+
+Run with `python -m benchmarks.batching`
+"""
+import time
+from unittest.mock import MagicMock
+
+from reactivex import operators
+from reactivex.subject import Subject
+
+from bittrade_kraken_websocket.channels.ticker import subscribe_ticker
+from bittrade_kraken_websocket.connection.generic import WEBSOCKET_MESSAGE, WEBSOCKET_MESSAGE_BATCH
+from bittrade_kraken_websocket.messages.listen import keep_message_batches_only, keep_messages_only
+
+MESSAGES = 100_000
+PAIRS = [f"PAIR{i}/USD" for i in range(10)]
+
+
+def run(batch_size: int) -> float:
+    socket = MagicMock(token="")
+    bundles = Subject()
+    sockets = Subject()
+    if batch_size:
+        messages = bundles.pipe(keep_message_batches_only(), operators.share())
+    else:
+        messages = bundles.pipe(keep_messages_only(), operators.share())
+    for pair in PAIRS:
+        sockets.pipe(subscribe_ticker(pair, messages, batched=bool(batch_size))).subscribe(
+            lambda _: None
+        )
+    sockets.on_next(socket)
+    frames = [
+        [i, {"c": ["1.0", "0.1"]}, "ticker", PAIRS[i % len(PAIRS)]]
+        for i in range(MESSAGES)
+    ]
+    start = time.perf_counter_ns()
+    if batch_size:
+        for i in range(0, MESSAGES, batch_size):
+            bundles.on_next((socket, WEBSOCKET_MESSAGE_BATCH, frames[i : i + batch_size]))
+    else:
+        for frame in frames:
+            bundles.on_next((socket, WEBSOCKET_MESSAGE, frame))
+    return (time.perf_counter_ns() - start) / MESSAGES
+
+
+def main():
+    print(f"{'batch size':>10} | {'ns/msg':>8}")
+    for batch_size in (0, 10, 100, 1000):
+        print(f"{batch_size or 'none':>10} | {run(batch_size):>8.0f}")
+
+
+if __name__ == "__main__":
+    main()
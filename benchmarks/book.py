@@ -0,0 +1,164 @@
+"""Cost of keeping an OrderBook up to date, at book depths 10 to 1000
+
+Updates change a level's volume, remove a level and add another, or add a new best level (pushing the worst one out),
+spread over the whole depth of the book. Reported per depth:
+- apply ns/update: `OrderBook.apply` alone, on decoded messages
+- pipeline ns/update: through `subscribe_book` (channel filter, book maintenance, checksum verification, emission)
+- metrics ns/update: applying the update then getting `OrderBook.metrics` (mid, microprice, imbalance over 10 levels,
+  depth within 10 bps), kept up to date by the book, against computing them again from all levels
+- checksum ns: `OrderBook.compute_checksum` against formatting the level strings as Kraken describes it
+
+Run with `python -m benchmarks.book`
+"""
+import heapq
+import random
+import time
+from typing import Any, Dict, List, Tuple
+from unittest.mock import MagicMock
+
+from reactivex import operators
+from reactivex.subject import Subject
+
+from bittrade_kraken_websocket.channels.book import DEPTHS, OrderBook, subscribe_book
+from bittrade_kraken_websocket.development.server import book_checksum
+
+PAIR = "XBT/USD"
+UPDATES = 20_000
+REPEAT = 3
+
+
+def _level(price: int, volume: float) -> List[str]:
+    return [f"{price / 100:.5f}", f"{volume:.8f}", "1534614248.456738"]
+
+
+def messages_for(depth: int, count: int, seed: int = 7) -> Tuple[List[Any], List[List[Any]]]:
+    """Snapshot then `count` updates, for a book of `depth` levels per side (prices in cents around 30000)"""
+    rng = random.Random(seed)
+    # One level every 2 cents, leaving room for new levels in between
+    asks: Dict[int, float] = {3_000_002 + 2 * i: rng.uniform(0.1, 10) for i in range(depth)}
+    bids: Dict[int, float] = {3_000_000 - 2 * i: rng.uniform(0.1, 10) for i in range(depth)}
+    snapshot = [
+        0,
+        {"as": [_level(p, asks[p]) for p in sorted(asks)], "bs": [_level(p, bids[p]) for p in sorted(bids, reverse=True)]},
+        f"book-{depth}",
+        PAIR,
+    ]
+    updates = []
+    for _ in range(count):
+        is_ask = rng.random() < 0.5
+        side = asks if is_ask else bids
+        levels = []
+        roll = rng.random()
+        if roll < 0.6:
+            price = rng.choice(list(side))
+            side[price] = rng.uniform(0.1, 10)
+            levels.append(_level(price, side[price]))
+        else:
+            worst = max(side) if is_ask else min(side)
+            del side[worst]
+            levels.append(_level(worst, 0))
+            if roll < 0.85:
+                price = rng.randint(min(side), max(side))
+                if price in side:
+                    price = worst
+            else:
+                other = bids if is_ask else asks
+                price = (min(side) - 1) if is_ask else (max(side) + 1)
+                if (is_ask and price <= max(other)) or (not is_ask and price >= min(other)):
+                    price = worst
+            side[price] = rng.uniform(0.1, 10)
+            levels.append(_level(price, side[price]))
+        checksum = book_checksum(
+            [tuple(_level(p, asks[p])[:2]) for p in heapq.nsmallest(10, asks)],  # type: ignore
+            [tuple(_level(p, bids[p])[:2]) for p in heapq.nlargest(10, bids)],  # type: ignore
+        )
+        updates.append([0, {"a" if is_ask else "b": levels, "c": checksum}, f"book-{depth}", PAIR])
+    return snapshot, updates
+
+
+def run_apply(depth: int, snapshot: List[Any], updates: List[List[Any]]) -> float:
+    best = float("inf")
+    for _ in range(REPEAT):
+        book = OrderBook(PAIR, depth)
+        book.apply(snapshot)
+        start = time.perf_counter_ns()
+        for message in updates:
+            book.apply(message)
+        best = min(best, (time.perf_counter_ns() - start) / len(updates))
+    return best
+
+
+def run_pipeline(depth: int, snapshot: List[Any], updates: List[List[Any]]) -> float:
+    best = float("inf")
+    for _ in range(REPEAT):
+        messages = Subject()
+        sockets = Subject()
+        sockets.pipe(subscribe_book(PAIR, messages, depth), operators.ignore_elements()).subscribe()
+        sockets.on_next(MagicMock(token=""))
+        messages.on_next(snapshot)
+        start = time.perf_counter_ns()
+        for message in updates:
+            messages.on_next(message)
+        best = min(best, (time.perf_counter_ns() - start) / len(updates))
+    return best
+
+
+def _metrics_from_levels(book: OrderBook) -> Tuple[Any, ...]:
+    asks, bids = book.ask_levels(), book.bid_levels()
+    (ask, ask_volume), (bid, bid_volume) = asks[0], bids[0]
+    ask_top, bid_top = sum(v for _, v in asks[:10]), sum(v for _, v in bids[:10])
+    ask_depth = sum(v for p, v in asks if p <= ask * 1.001)
+    bid_depth = sum(v for p, v in bids if p >= bid * 0.999)
+    return (
+        (ask + bid) / 2,
+        (ask * bid_volume + bid * ask_volume) / (ask_volume + bid_volume),
+        (bid_top - ask_top) / (bid_top + ask_top),
+        bid_depth,
+        ask_depth,
+    )
+
+
+def run_metrics(depth: int, snapshot: List[Any], updates: List[List[Any]]) -> Tuple[float, float]:
+    results = []
+    for book, compute in (
+        (OrderBook(PAIR, depth, top_levels=10, band_bps=10), OrderBook.metrics),
+        (OrderBook(PAIR, depth), _metrics_from_levels),
+    ):
+        book.apply(snapshot)
+        start = time.perf_counter_ns()
+        for message in updates:
+            book.apply(message)
+            compute(book)
+        results.append((time.perf_counter_ns() - start) / len(updates))
+    return results[0], results[1]
+
+
+def run_checksum(snapshot: List[Any]) -> Tuple[float, float]:
+    book = OrderBook(PAIR, 10)
+    book.apply(snapshot)
+    asks = [tuple(level[:2]) for level in snapshot[1]["as"][:10]]
+    bids = [tuple(level[:2]) for level in snapshot[1]["bs"][:10]]
+    count = 20_000
+    start = time.perf_counter_ns()
+    for _ in range(count):
+        book.compute_checksum()
+    integers = (time.perf_counter_ns() - start) / count
+    start = time.perf_counter_ns()
+    for _ in range(count):
+        book_checksum(asks, bids)  # type: ignore
+    return integers, (time.perf_counter_ns() - start) / count
+
+
+def main():
+    print(f"{'depth':>5} | {'apply ns/update':>15} | {'pipeline ns/update':>18} | {'metrics ns/update':>17} | {'from levels':>11}")
+    for depth in DEPTHS:
+        snapshot, updates = messages_for(depth, UPDATES)
+        apply, pipeline = run_apply(depth, snapshot, updates), run_pipeline(depth, snapshot, updates)
+        incremental, from_levels = run_metrics(depth, snapshot, updates)
+        print(f"{depth:>5} | {apply:>15.0f} | {pipeline:>18.0f} | {incremental:>17.0f} | {from_levels:>11.0f}")
+    integers, strings = run_checksum(messages_for(10, 0)[0])
+    print(f"checksum: {integers:.0f} ns from the book's integers, {strings:.0f} ns from level strings")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,62 @@
+"""Per message cost of routing channel messages to many subscriptions
+
+Compares one `keep_channel_messages` filter per subscription (cost grows with the number of subscriptions)
+against a single ChannelRouter (cost stays flat).
+
+Run with `python -m benchmarks.channel_router`
+"""
+import time
+
+from reactivex import operators
+from reactivex.subject import Subject
+
+from bittrade_kraken_websocket.channels import ChannelName
+from bittrade_kraken_websocket.messages.filters.kind import keep_channel_messages
+from bittrade_kraken_websocket.messages.filters.router import ChannelRouter
+
+MESSAGES = 20_000
+
+
+def _frames(pairs):
+    return [
+        [i, {"c": ["1.0", "0.1"]}, "ticker", pairs[i % len(pairs)]]
+        for i in range(MESSAGES)
+    ]
+
+
+def run_filters(pairs, frames) -> float:
+    messages = Subject()
+    shared = messages.pipe(operators.share())
+    for pair in pairs:
+        shared.pipe(keep_channel_messages(ChannelName.CHANNEL_TICKER, pair)).subscribe(
+            lambda _: None
+        )
+    start = time.perf_counter_ns()
+    for frame in frames:
+        messages.on_next(frame)
+    return (time.perf_counter_ns() - start) / len(frames)
+
+
+def run_router(pairs, frames) -> float:
+    messages = Subject()
+    router = ChannelRouter(messages)
+    for pair in pairs:
+        router.channel("ticker", pair).subscribe(lambda _: None)
+    start = time.perf_counter_ns()
+    for frame in frames:
+        messages.on_next(frame)
+    return (time.perf_counter_ns() - start) / len(frames)
+
+
+def main():
+    print(f"{'subscriptions':>13} | {'filters ns/msg':>14} | {'router ns/msg':>13}")
+    for count in (1, 10, 50, 100, 300, 1000):
+        pairs = [f"PAIR{i}/USD" for i in range(count)]
+        frames = _frames(pairs)
+        print(
+            f"{count:>13} | {run_filters(pairs, frames):>14.0f} | {run_router(pairs, frames):>13.0f}"
+        )
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,69 @@
+"""CPU spent by a slow ticker consumer under a synthetic 10k msg/s load, with and without `conflate_latest`
+
+Without conflation the consumer (on its own thread via `observe_on`) processes every stale update and falls behind;
+with conflation it only processes the latest value per pair whenever it is ready.
+
+Run with `python -m benchmarks.conflation`
+"""
+import threading
+import time
+
+from reactivex import operators
+from reactivex.scheduler import EventLoopScheduler
+from reactivex.subject import Subject
+
+from bittrade_kraken_websocket.operators import conflate_latest
+
+RATE = 10_000  # messages per second
+DURATION = 3.0  # seconds
+PAIRS = [f"PAIR{i}/USD" for i in range(20)]
+WORK = 0.00015  # seconds of CPU per processed update, slower than the arrival rate
+
+
+def consume(_):
+    deadline = time.thread_time() + WORK
+    while time.thread_time() < deadline:
+        pass
+
+
+def run(conflate: bool):
+    source = Subject()
+    done = threading.Event()
+    processed = [0]
+
+    def on_next(value):
+        consume(value)
+        processed[0] += 1
+
+    operator = conflate_latest() if conflate else operators.observe_on(EventLoopScheduler())
+    subscription = source.pipe(operator).subscribe(on_next=on_next, on_completed=done.set)
+
+    cpu_start = time.process_time()
+    start = time.perf_counter()
+    sent = 0
+    # Paced producer: sends whatever is due every millisecond
+    while (elapsed := time.perf_counter() - start) < DURATION:
+        due = int(elapsed * RATE)
+        while sent < due:
+            source.on_next((PAIRS[sent % len(PAIRS)], {"c": [str(sent), "0.1"]}))
+            sent += 1
+        time.sleep(0.001)
+    source.on_completed()
+    done.wait()
+    wall = time.perf_counter() - start
+    cpu = time.process_time() - cpu_start
+    subscription.dispose()
+    return sent, processed[0], cpu, wall
+
+
+def main():
+    print(f"{'mode':>10} | {'sent':>6} | {'processed':>9} | {'cpu s':>6} | {'until caught up s':>17}")
+    for conflate in (False, True):
+        sent, processed, cpu, wall = run(conflate)
+        print(
+            f"{'conflate' if conflate else 'every msg':>10} | {sent:>6} | {processed:>9} | {cpu:>6.2f} | {wall:>17.2f}"
+        )
+
+
+if __name__ == "__main__":
+    main()
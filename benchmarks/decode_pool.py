@@ -0,0 +1,93 @@
+"""Throughput of DecodePool with 1 to 8 worker processes, against decoding on the calling thread
+
+Frames are book updates of depth 100 spread over many pairs; the handler sums each side's volume and keeps the best level,
+as a stand-in for per message work done in the workers.
+
+Run with `python -m benchmarks.decode_pool [--messages N] [--workers 1 2 4 8]`
+"""
+import argparse
+import os
+import random
+import threading
+import time
+
+import orjson
+
+from bittrade_kraken_websocket.connection.decode_pool import DecodePool
+
+PAIRS = 64
+DEPTH = 100
+
+
+def _frames(count: int):
+    rng = random.Random(7)
+
+    def levels():
+        return [[f"{rng.uniform(100, 200):.5f}", f"{rng.uniform(0, 10):.8f}", f"{1700000000 + rng.random():.6f}"] for _ in range(DEPTH)]
+
+    return [
+        orjson.dumps([i % PAIRS, {"a": levels()}, {"b": levels(), "c": "123"}, f"book-{DEPTH}", f"PAIR{i % PAIRS}/USD"])
+        for i in range(count)
+    ]
+
+
+def top_of_book(message):
+    asks, bids = message[1]["a"], message[2]["b"]
+    return [
+        message[0],
+        [asks[0][0], bids[0][0], sum(float(level[1]) for level in asks), sum(float(level[1]) for level in bids)],
+        message[-2],
+        message[-1],
+    ]
+
+
+def run_inline(frames) -> float:
+    start = time.perf_counter()
+    for frame in frames:
+        top_of_book(orjson.loads(frame))
+    return len(frames) / (time.perf_counter() - start)
+
+
+def run_pool(frames, workers: int) -> float:
+    done = threading.Event()
+    received = [0]
+    expected = [1]
+
+    def receiver(_):
+        received[0] += 1
+        if received[0] == expected[0]:
+            done.set()
+
+    with DecodePool(workers, handler=top_of_book, ring_size=16 * 1024 * 1024) as pool:
+        pool.receiver = receiver
+        # Let the workers start before timing
+        pool.submit(frames[0])
+        done.wait()
+        done.clear()
+        received[0], expected[0] = 0, len(frames)
+        start = time.perf_counter()
+        for frame in frames:
+            if not pool.submit(frame):
+                # Worker given up on: decoded here, as the connection would
+                receiver(top_of_book(orjson.loads(frame)))
+        done.wait()
+        return len(frames) / (time.perf_counter() - start)
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--messages", type=int, default=50_000)
+    parser.add_argument("--workers", type=int, nargs="*", default=[1, 2, 4, 8])
+    args = parser.parse_args()
+    frames = _frames(args.messages)
+    print(f"{args.messages} frames of {len(frames[0])} bytes, {os.cpu_count()} cores")
+    inline = run_inline(frames)
+    print(f"{'workers':>7} | {'msg/s':>9} | {'speedup':>7}")
+    print(f"{'inline':>7} | {inline:>9.0f} | {1:>7.2f}")
+    for workers in args.workers:
+        rate = run_pool(frames, workers)
+        print(f"{workers:>7} | {rate:>9.0f} | {rate / inline:>7.2f}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,389 @@
+"""Benchmark suite of the real operator chains, from raw frames to payloads, for each channel and for order requests
+
+For each channel, frames go through `message_to_bundle` -> `keep_messages_only` -> `subscribe_to_channel` -> payload mapping,
+exactly as with a live connection (the socket is a stub). Reported per benchmark:
+- msgs_per_s: end to end throughput
+- cumulative_ns: per message cost of the chain cut after each stage; the cost of a stage is roughly the difference with the
+  previous cut, but cheap stages are within the noise, so those differences can come out negative
+- latency_ns: p50/p99 of the time from raw frame to payload delivered
+- peak_bytes_per_msg: median of the memory allocated at peak while processing one message (tracemalloc)
+- retained_blocks_per_msg: memory blocks still allocated after the run, per message (should stay close to 0)
+CPython doesn't count individual allocations, so allocations are reported as the two memory figures above.
+
+Order benchmarks measure add/cancel requests from subscription to the response being emitted, the socket answering synchronously.
+
+Run with `python -m benchmarks.suite --output results.json`, compare runs with `--compare previous.json`,
+and use recorded frames (see `CaptureLog`) with `--capture path`.
+"""
+import argparse
+import dataclasses
+import gc
+import json
+import platform
+import statistics
+import subprocess
+import sys
+import time
+import tracemalloc
+from typing import Any, Callable, Dict, List, Optional
+
+import orjson
+from reactivex import Observable, operators
+from reactivex.subject import Subject
+
+from benchmarks.book import messages_for as book_messages
+from bittrade_kraken_websocket.channels.book import subscribe_book
+from bittrade_kraken_websocket.channels.channels import ChannelName
+from bittrade_kraken_websocket.channels.ohlc import subscribe_ohlc
+from bittrade_kraken_websocket.channels.own_trades import subscribe_own_trades
+from bittrade_kraken_websocket.channels.spread import subscribe_spread
+from bittrade_kraken_websocket.channels.subscribe import subscribe_to_channel
+from bittrade_kraken_websocket.channels.ticker import subscribe_ticker
+from bittrade_kraken_websocket.channels.trade import subscribe_trade
+from bittrade_kraken_websocket.connection.capture import read_capture, capture_files
+from bittrade_kraken_websocket.connection.generic import message_to_bundle
+from bittrade_kraken_websocket.events.add_order import AddOrderRequest, create_order_lifecycle
+from bittrade_kraken_websocket.events.cancel_order import CancelOrderRequest, cancel_order_lifecycle
+from bittrade_kraken_websocket.events.models.order import OrderSide, OrderType
+from bittrade_kraken_websocket.messages.listen import keep_messages_only
+
+PAIR = "XBT/USD"
+MESSAGES = 20_000
+LATENCY_SAMPLES = 5_000
+MEMORY_SAMPLES = 500
+ORDERS = 2_000
+WARMUP = 1_000
+REPEAT = 3
+
+
+class _StubSocket:
+    """Stands in for EnhancedWebsocket; `on_send` may answer synchronously"""
+
+    token = ""
+
+    def __init__(self, on_send: Optional[Callable[[bytes], None]] = None):
+        self.on_send = on_send
+
+    def send_bytes(self, data: bytes, *_: Any):
+        if self.on_send is not None:
+            self.on_send(data)
+
+    def send(self, payload: Dict, *_: Any):
+        self.send_bytes(orjson.dumps(payload))
+
+
+@dataclasses.dataclass
+class ChannelBenchmark:
+    name: str
+    frames: Callable[[int], List[str]]
+    # messages -> operator on sockets, stopping after subscribe_to_channel
+    channel: Callable[[Observable], Callable[[Observable], Observable]]
+    # messages -> operator on sockets, the full subscribe_x chain
+    payloads: Callable[[Observable], Callable[[Observable], Observable]]
+
+
+def _public_frames(channel_name: str, payload: Callable[[int], Any]) -> Callable[[int], List[str]]:
+    return lambda count: [orjson.dumps([42, payload(i), channel_name, PAIR]).decode() for i in range(count)]
+
+
+def _ticker(i: int):
+    price = f"{30000 + i % 100:.5f}"
+    return {
+        "a": [price, 1, "1.000"], "b": [price, 1, "1.000"], "c": [price, "0.10000000"],
+        "v": ["2634.11501494", "3591.17907851"], "p": [price, price], "t": [11493, 16267],
+        "l": [price, price], "h": [price, price], "o": [price, price],
+    }
+
+
+def _own_trades_frames(count: int) -> List[str]:
+    return [
+        orjson.dumps([
+            [{f"T{i}-AAAAA-BBBBBB": {
+                "cost": "5953.07941194", "fee": "0.00000000", "margin": "0.00000000", "ordertxid": "O6NWS2-XCOZX-QBLVDD",
+                "ordertype": "limit", "pair": "USDT/USD", "postxid": "TKH2SE-M7IF5-CFI7LT", "price": "0.99980000",
+                "time": "1672125042.588699", "type": "buy", "vol": "5954.27026599",
+            }}],
+            "ownTrades",
+            {"sequence": i + 1},
+        ]).decode()
+        for i in range(count)
+    ]
+
+
+def _book_frames(count: int) -> List[str]:
+    # Snapshot first, so that the book is reset each time the frames are pushed again
+    snapshot, updates = book_messages(100, count - 1)
+    return [orjson.dumps(message).decode() for message in [snapshot, *updates]]
+
+
+CHANNEL_BENCHMARKS: List[ChannelBenchmark] = [
+    ChannelBenchmark(
+        "ticker",
+        _public_frames("ticker", _ticker),
+        lambda messages: subscribe_to_channel(messages, ChannelName.CHANNEL_TICKER, pair=PAIR),
+        lambda messages: subscribe_ticker(PAIR, messages),
+    ),
+    ChannelBenchmark(
+        "trade",
+        _public_frames("trade", lambda i: [[f"{30000 + i % 100:.5f}", "0.10000000", "1672125042.588699", "b", "l", ""]]),
+        lambda messages: subscribe_to_channel(messages, ChannelName.CHANNEL_TRADE, pair=PAIR),
+        lambda messages: subscribe_trade(PAIR, messages),
+    ),
+    ChannelBenchmark(
+        "spread",
+        _public_frames("spread", lambda i: [f"{30000 + i % 100:.5f}", "30001.00000", "1672125042.588699", "1.0", "2.0"]),
+        lambda messages: subscribe_to_channel(messages, ChannelName.CHANNEL_SPREAD, pair=PAIR),
+        lambda messages: subscribe_spread(PAIR, messages),
+    ),
+    ChannelBenchmark(
+        "ohlc",
+        _public_frames("ohlc-5", lambda i: ["1672125042.588699", "1672125300.000000", "30000.0", "30010.0", "29990.0", f"{30000 + i % 100:.1f}", "30000.0", "1.5", 12]),
+        lambda messages: subscribe_to_channel(messages, ChannelName.CHANNEL_OHLC, pair=PAIR, subscription_kwargs={"interval": 5}),
+        lambda messages: subscribe_ohlc(PAIR, messages, 5),
+    ),
+    ChannelBenchmark(
+        "book",
+        _book_frames,
+        lambda messages: subscribe_to_channel(messages, ChannelName.CHANNEL_BOOK, pair=PAIR, subscription_kwargs={"depth": 100}),
+        lambda messages: subscribe_book(PAIR, messages, 100),
+    ),
+    ChannelBenchmark(
+        "own_trades",
+        _own_trades_frames,
+        lambda messages: subscribe_to_channel(messages, ChannelName.CHANNEL_OWN_TRADES, subscription_kwargs={"snapshot": False}),
+        lambda messages: subscribe_own_trades(messages),
+    ),
+]
+
+
+def _chain(benchmark: ChannelBenchmark, stage: str, sink: Callable[[Any], None]) -> Callable[[str], None]:
+    """Returns a function pushing one raw frame through the chain cut after `stage`.
+    Chains keep state (books, own trades sequence), so each pass over the frames needs a new one"""
+    socket = _StubSocket()
+    if stage == "decode":
+        return lambda frame: sink(message_to_bundle(socket, frame))  # type: ignore
+    bundles: Subject = Subject()
+    messages = bundles.pipe(keep_messages_only(), operators.share())
+    if stage == "keep_messages_only":
+        messages.subscribe(sink)
+    else:
+        sockets: Subject = Subject()
+        operator = benchmark.channel if stage == "subscribe_to_channel" else benchmark.payloads
+        sockets.pipe(operator(messages)).subscribe(sink)
+        sockets.on_next(socket)
+    on_next = bundles.on_next
+
+    def push(frame: str):
+        bundle = message_to_bundle(socket, frame)  # type: ignore
+        if bundle is not None:
+            on_next(bundle)
+
+    return push
+
+
+STAGES = ["decode", "keep_messages_only", "subscribe_to_channel", "payload"]
+
+
+def _percentiles(samples: List[int]) -> Dict[str, float]:
+    samples = sorted(samples)
+    return {
+        "p50": samples[len(samples) // 2],
+        "p99": samples[min(len(samples) - 1, int(len(samples) * 0.99))],
+    }
+
+
+def run_channel(benchmark: ChannelBenchmark, frames: List[str]) -> Dict[str, Any]:
+    count = len(frames)
+    cumulative: Dict[str, float] = {}
+    for stage in STAGES:
+        push = _chain(benchmark, stage, lambda _: None)
+        for frame in frames[:WARMUP]:
+            push(frame)
+        timings = []
+        for _ in range(REPEAT):
+            push = _chain(benchmark, stage, lambda _: None)
+            start = time.perf_counter_ns()
+            for frame in frames:
+                push(frame)
+            timings.append(time.perf_counter_ns() - start)
+        # The fastest run is the least disturbed by the rest of the machine
+        cumulative[stage] = min(timings) / count
+
+    received = [0]
+    push = _chain(benchmark, "payload", lambda _: received.__setitem__(0, received[0] + 1))
+    latencies = []
+    for frame in frames[:LATENCY_SAMPLES]:
+        start = time.perf_counter_ns()
+        push(frame)
+        latencies.append(time.perf_counter_ns() - start)
+
+    gc.collect()
+    blocks = sys.getallocatedblocks()
+    push = _chain(benchmark, "payload", lambda _: None)
+    for frame in frames:
+        push(frame)
+    gc.collect()
+    retained = (sys.getallocatedblocks() - blocks) / count
+
+    push = _chain(benchmark, "payload", lambda _: None)
+    peaks = []
+    tracemalloc.start()
+    for frame in frames[:MEMORY_SAMPLES]:
+        tracemalloc.reset_peak()
+        current, _ = tracemalloc.get_traced_memory()
+        push(frame)
+        peaks.append(tracemalloc.get_traced_memory()[1] - current)
+    tracemalloc.stop()
+
+    return {
+        "name": benchmark.name,
+        "messages": count,
+        "delivered": received[0],
+        "msgs_per_s": 1e9 / cumulative["payload"],
+        "cumulative_ns": cumulative,
+        "latency_ns": _percentiles(latencies),
+        "peak_bytes_per_msg": statistics.median(peaks),
+        "retained_blocks_per_msg": retained,
+    }
+
+
+def _order_responses(data: bytes) -> List[str]:
+    request = orjson.loads(data)
+    reqid = request["reqid"]
+    if request["event"] == "addOrder":
+        txid = f"O{reqid}-AAAAA-BBBBBB"
+        return [
+            orjson.dumps({"descr": "buy 10.00000000 USDTUSD @ limit 0.9980", "event": "addOrderStatus", "reqid": reqid, "status": "ok", "txid": txid}).decode(),
+        ]
+    return [orjson.dumps({"event": "cancelOrderStatus", "reqid": reqid, "status": "ok"}).decode()]
+
+
+def run_order(name: str, lifecycle: Callable[[int, Any, Observable], Observable]) -> Dict[str, Any]:
+    bundles: Subject = Subject()
+    messages = bundles.pipe(keep_messages_only(), operators.share())
+    # Lifecycles send before listening for the response, so responses are held until the lifecycle is subscribed
+    responses: List[str] = []
+    socket = _StubSocket(lambda data: responses.extend(_order_responses(data)))
+    latencies, requests = [], []
+    for i in range(ORDERS):
+        done: List[int] = []
+        start = time.perf_counter_ns()
+        subscription = lifecycle(i + 1, socket, messages).pipe(operators.take(1)).subscribe(
+            on_next=lambda _: done.append(time.perf_counter_ns())
+        )
+        sent = time.perf_counter_ns()
+        for frame in responses:
+            bundles.on_next(message_to_bundle(socket, frame))  # type: ignore
+        responses.clear()
+        subscription.dispose()
+        assert done, f"No response for {name} {i}"
+        latencies.append(done[0] - start)
+        requests.append(sent - start)
+    mean, request = statistics.mean(latencies), statistics.mean(requests)
+    return {
+        "name": name,
+        "messages": ORDERS,
+        "delivered": ORDERS,
+        "msgs_per_s": 1e9 / mean,
+        "stages_ns": {"request": request, "response": mean - request},
+        "latency_ns": _percentiles(latencies),
+    }
+
+
+def _add_order(reqid: int, socket: Any, messages: Observable) -> Observable:
+    request = AddOrderRequest(
+        ordertype=OrderType.limit, type=OrderSide.buy, price="0.998", volume="10", pair="USDT/USD", reqid=reqid
+    )
+    return create_order_lifecycle((request, socket), messages)
+
+
+def _cancel_order(reqid: int, socket: Any, messages: Observable) -> Observable:
+    return cancel_order_lifecycle((CancelOrderRequest(txid=[f"O{reqid}-AAAAA-BBBBBB"], reqid=reqid), socket), messages)
+
+
+def _captured_frames(path: str) -> Dict[str, List[str]]:
+    """Recorded channel frames, by benchmark name; they are re-tagged with the benchmark pair"""
+    by_channel: Dict[str, List[str]] = {}
+    for file in capture_files(path) or [path]:
+        for _, frame in read_capture(file):
+            if frame[:1] != b"[":
+                continue
+            message = orjson.loads(frame)
+            channel_name = message[-2]
+            if type(channel_name) != str:
+                continue
+            name = {"ownTrades": "own_trades"}.get(channel_name, channel_name.split("-")[0])
+            if type(message[-1]) == str:
+                message[-1] = PAIR
+                if name == "ohlc":
+                    message[-2] = "ohlc-5"
+                elif name == "book":
+                    message[-2] = "book-100"
+            by_channel.setdefault(name, []).append(orjson.dumps(message).decode())
+    return by_channel
+
+
+def _metadata() -> Dict[str, Any]:
+    try:
+        commit = subprocess.run(["git", "rev-parse", "HEAD"], capture_output=True, text=True).stdout.strip()
+    except OSError:
+        commit = ""
+    return {
+        "time": time.strftime("%Y-%m-%dT%H:%M:%S"),
+        "commit": commit,
+        "python": platform.python_version(),
+        "platform": platform.platform(),
+    }
+
+
+def run(messages: int = MESSAGES, capture: Optional[str] = None, only: Optional[List[str]] = None) -> Dict[str, Any]:
+    captured = _captured_frames(capture) if capture else {}
+    results = []
+    for benchmark in CHANNEL_BENCHMARKS:
+        if only and benchmark.name not in only:
+            continue
+        frames = captured.get(benchmark.name) if capture else benchmark.frames(messages)
+        if not frames:
+            continue
+        results.append(run_channel(benchmark, frames))
+    for name, lifecycle in (("add_order", _add_order), ("cancel_order", _cancel_order)):
+        if not only or name in only:
+            results.append(run_order(name, lifecycle))
+    return {"meta": _metadata(), "results": results}
+
+
+def print_results(report: Dict[str, Any], previous: Optional[Dict[str, Any]] = None):
+    before = {r["name"]: r for r in (previous or {}).get("results", [])}
+    print(f"{'benchmark':>12} | {'msgs/s':>9} | {'p50 ns':>8} | {'p99 ns':>8} | {'peak B':>7} | ns/msg up to each stage (orders: per stage)")
+    for result in report["results"]:
+        stages = ", ".join(f"{k}={v:.0f}" for k, v in (result.get("cumulative_ns") or result["stages_ns"]).items())
+        line = (
+            f"{result['name']:>12} | {result['msgs_per_s']:>9.0f} | {result['latency_ns']['p50']:>8.0f} | "
+            f"{result['latency_ns']['p99']:>8.0f} | {result.get('peak_bytes_per_msg', 0):>7.0f} | {stages}"
+        )
+        if result["name"] in before:
+            line += f" | {result['msgs_per_s'] / before[result['name']]['msgs_per_s'] - 1:+.1%} msgs/s"
+        print(line)
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark suite for the message pipeline")
+    parser.add_argument("--messages", type=int, default=MESSAGES, help="Synthetic frames per channel")
+    parser.add_argument("--capture", help="Use frames recorded with CaptureLog instead of synthetic ones")
+    parser.add_argument("--only", nargs="*", help="Benchmark names to run")
+    parser.add_argument("--output", help="Write results as JSON")
+    parser.add_argument("--compare", help="Previous JSON results to compare with")
+    args = parser.parse_args()
+    report = run(args.messages, args.capture, args.only)
+    previous = None
+    if args.compare:
+        with open(args.compare) as file:
+            previous = json.load(file)
+    print_results(report, previous)
+    if args.output:
+        with open(args.output, "w") as file:
+            json.dump(report, file, indent=2)
+
+
+if __name__ == "__main__":
+    main()
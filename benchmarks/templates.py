@@ -0,0 +1,55 @@
+"""Cost of encoding an order request, `dataclasses.asdict` + `orjson.dumps` (what `send_json` did) vs a pre-encoded template
+
+Run with `python -m benchmarks.templates`
+"""
+import dataclasses
+import time
+
+import orjson
+
+from bittrade_kraken_websocket.events.add_order import ADD_ORDER_VARIABLES, AddOrderRequest
+from bittrade_kraken_websocket.events.models.order import OrderSide, OrderType
+from bittrade_kraken_websocket.events.templates import encode_request
+
+ITERATIONS = 100_000
+TOKEN = "WW91ciBhdXRoZW50aWNhdGlvbiB0b2tlbiBnb2VzIGhlcmUu"
+
+
+def _requests():
+    return [
+        AddOrderRequest(
+            ordertype=OrderType.limit,
+            type=OrderSide.buy,
+            price=f"{0.99 + i % 100 / 10_000:.4f}",
+            volume="10",
+            pair="USDT/USD",
+            reqid=i,
+        )
+        for i in range(ITERATIONS)
+    ]
+
+
+def run_asdict(requests) -> float:
+    start = time.perf_counter_ns()
+    for request in requests:
+        payload = dataclasses.asdict(request)
+        payload["token"] = TOKEN
+        orjson.dumps(payload)
+    return (time.perf_counter_ns() - start) / len(requests)
+
+
+def run_template(requests) -> float:
+    start = time.perf_counter_ns()
+    for request in requests:
+        encode_request(request, TOKEN, ADD_ORDER_VARIABLES)
+    return (time.perf_counter_ns() - start) / len(requests)
+
+
+def main():
+    requests = _requests()
+    print(f"{'asdict + dumps':>14} | {run_asdict(requests):>6.0f} ns/order")
+    print(f"{'template':>14} | {run_template(requests):>6.0f} ns/order")
+
+
+if __name__ == "__main__":
+    main()
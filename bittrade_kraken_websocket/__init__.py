@@ -2,7 +2,26 @@ __version__ = "0.1.0"
 
 from .connection.public import public_websocket_connection
 from .connection.private import private_websocket_connection
+from .connection.asyncio_connection import (
+    private_websocket_connection_async,
+    public_websocket_connection_async,
+    to_async_iterable,
+)
+from .connection.capture import CaptureLog, replay_capture
+from .connection.decode_pool import DecodePool
 from .connection.enhanced_websocket import EnhancedWebsocket
+from .connection.handoff import (
+    HANDOFF_BLOCK,
+    HANDOFF_CONFLATE,
+    HANDOFF_DROP_OLDEST,
+    HandoffQueue,
+    handoff_key,
+    to_blocking_iterator,
+)
+from .connection.outbound import KRAKEN_INTERMEDIATE, KRAKEN_PRO, KRAKEN_STARTER, RateLimit, TokenBucket
+from .connection.pool import ConnectionPool, hash_sharding, least_loaded_sharding
+from .connection.redundant import FirstArrival, RedundantConnection
+from .connection.shared_feed import SharedFeedPublisher, SharedFeedReader
 from .channels import ChannelName, subscribe_trade, TradePayload
 from .channels.ticker import TickerPayload, subscribe_ticker
 from .channels.own_trades import (
@@ -27,12 +46,29 @@ from .channels.open_orders import (
     is_initial_details,
 )
 from .channels.spread import subscribe_spread, SpreadPayload
+from .channels.book import OrderBook, subscribe_book, subscribe_book_metrics
+from .channels.models.book import BookLevelChange, BookMetrics
+from .channels.registry import SubscriptionRegistry
 from .events.models import Order, OrderSide, OrderStatus, OrderType
+from .messages.latency import LatencyCollector, LatencyHistogram
+from .messages.timestamps import Stamped, StampedMessage
+from .messages.watchdog import StalenessWatchdog
+from .metrics import MetricsRegistry, registry as metrics_registry
 
 
 __all__ = [
+    "CaptureLog",
     "ChannelName",
+    "ConnectionPool",
+    "DecodePool",
     "EnhancedWebsocket",
+    "FirstArrival",
+    "HANDOFF_BLOCK",
+    "HANDOFF_CONFLATE",
+    "HANDOFF_DROP_OLDEST",
+    "HandoffQueue",
+    "handoff_key",
+    "hash_sharding",
     "initial_details_to_order", 
     "is_cancel_message", 
     "is_close_message", 
@@ -40,7 +76,18 @@ __all__ = [
     "is_initial_details",
     "is_open_message",
     "is_partial_fill_update", 
+    "KRAKEN_INTERMEDIATE",
+    "KRAKEN_PRO",
+    "KRAKEN_STARTER",
+    "LatencyCollector",
+    "LatencyHistogram",
+    "least_loaded_sharding",
+    "MetricsRegistry",
+    "metrics_registry",
     "OHLCPayload",
+    "BookLevelChange",
+    "BookMetrics",
+    "OrderBook",
     "subscribe_ohlc",
     "to_ohlc_payload",
     "OpenOrdersPayload", 
@@ -51,14 +98,30 @@ __all__ = [
     "OwnTradesPayloadParsed",
     "parse_own_trade",
     "private_websocket_connection",
+    "RateLimit",
+    "RedundantConnection",
+    "SharedFeedPublisher",
+    "SharedFeedReader",
+    "private_websocket_connection_async",
     "public_websocket_connection",
+    "public_websocket_connection_async",
+    "replay_capture",
+    "subscribe_book",
+    "subscribe_book_metrics",
     "subscribe_open_orders", 
     "subscribe_own_trades",
     "subscribe_ticker",
     "subscribe_trade",
     "subscribe_spread", 
     "SpreadPayload",
+    "StalenessWatchdog",
+    "SubscriptionRegistry",
+    "Stamped",
+    "StampedMessage",
     "TickerPayload",
+    "TokenBucket",
+    "to_async_iterable",
+    "to_blocking_iterator",
     "TradePayload",
     "Order", 
     "OrderSide", 
@@ -0,0 +1,543 @@
+import time
+import zlib
+from array import array
+from bisect import bisect_left, bisect_right
+from itertools import chain
+from logging import getLogger
+from operator import attrgetter, neg
+from typing import Any, Callable, Dict, List, Literal, Optional, Sequence, Tuple, TypeVar
+
+from reactivex import Observable, compose, operators
+from reactivex.abc import ObserverBase, SchedulerBase
+
+from .channels import ChannelName
+from .models.book import BookLevel, BookLevelChange, BookMetrics, BookSnapshotPayload, BookUpdatePayload
+from .registry import SubscriptionRegistry
+from bittrade_kraken_websocket.connection.enhanced_websocket import EnhancedWebsocket
+from bittrade_kraken_websocket.messages.watchdog import StalenessWatchdog
+from bittrade_kraken_websocket.metrics import registry as metrics
+from .subscribe import send_resubscription, subscribe_to_channel
+
+logger = getLogger(__name__)
+
+_T = TypeVar("_T")
+
+DEPTHS = (10, 25, 100, 500, 1000)
+# Levels per side covered by Kraken's checksum
+CHECKSUM_LEVELS = 10
+# Format of the checksummed text by number of values: each level is its price then its volume, without '.' nor leading zeros,
+# which is exactly how the scaled integers print
+_CHECKSUM_FORMATS = ["%d" * count for count in range(4 * CHECKSUM_LEVELS + 1)]
+
+
+def _scaled(text: str, decimals: int) -> int:
+    """Decimal text as an integer number of 10**-decimals units, e.g. ("5541.3", 5) -> 554130000"""
+    dot = text.find(".")
+    if dot < 0:
+        return int(text) * 10**decimals
+    digits = len(text) - dot - 1
+    value = int(text.replace(".", ""))
+    if digits == decimals:
+        return value
+    if digits < decimals:
+        return value * 10 ** (decimals - digits)
+    return value // 10 ** (digits - decimals)
+
+
+def _decimals(text: str) -> int:
+    dot = text.find(".")
+    return 0 if dot < 0 else len(text) - dot - 1
+
+
+class BookSide:
+    """Price levels of one side of a book, best first, in buffers preallocated for `capacity` levels:
+    prices and volumes as integers (see OrderBook.price_decimals and volume_decimals) and as floats.
+    Only the first `count` entries are levels; levels are shifted in place within the buffers and no per-level Python objects are kept.
+
+    The total volume of the first `top_levels` levels and of the levels within `band_bps` basis points of the best price
+    are kept up to date as levels change (0 to not keep them); the band is only summed again when the best price changes"""
+
+    __slots__ = (
+        "descending", "capacity", "count", "prices", "volumes", "px", "qty", "views", "_buffers", "_price_scale", "_volume_scale",
+        "top_levels", "top_volume", "band_bps", "band_count", "band_volume", "_band_limit",
+    )
+
+    def __init__(self, descending: bool, capacity: int, top_levels: int = 0, band_bps: int = 0):
+        # Bids are kept in descending price order, asks in ascending order
+        self.descending = descending
+        self.capacity = capacity
+        self.count = 0
+        self.prices = array("q", bytes(8 * capacity))
+        self.volumes = array("q", bytes(8 * capacity))
+        self.px = array("d", bytes(8 * capacity))
+        self.qty = array("d", bytes(8 * capacity))
+        buffers = (self.prices, self.volumes, self.px, self.qty)
+        self._buffers = tuple(memoryview(buffer) for buffer in buffers)
+        self.views = tuple(memoryview(buffer).toreadonly() for buffer in buffers)
+        """Read-only views of prices, volumes, px and qty"""
+        self._price_scale = 1
+        self._volume_scale = 1
+        self.top_levels = min(top_levels, capacity)
+        self.top_volume = 0
+        """Total volume of the first `top_levels` levels, as an integer"""
+        self.band_bps = band_bps
+        self.band_count = 0
+        """Number of levels within `band_bps` of the best price"""
+        self.band_volume = 0
+        """Their total volume, as an integer"""
+        self._band_limit = 0
+
+    def __len__(self) -> int:
+        return self.count
+
+    def scale(self, price_decimals: int, volume_decimals: int):
+        self._price_scale = 10**price_decimals
+        self._volume_scale = 10**volume_decimals
+
+    def index(self, price: int) -> int:
+        """Where `price` is or would be inserted"""
+        if self.descending:
+            return bisect_left(self.prices, -price, 0, self.count, key=neg)  # type: ignore
+        return bisect_left(self.prices, price, 0, self.count)
+
+    def _rebase_band(self):
+        """Finds the levels within the band again, for a new best price"""
+        count = self.count
+        if not count:
+            self.band_count = self.band_volume = 0
+            return
+        best = self.prices[0]
+        # Integer bounds, rounded towards the best price, so that comparing prices to them is exact
+        if self.descending:
+            limit = -((-best * (10_000 - self.band_bps)) // 10_000)
+            band_count = bisect_right(self.prices, -limit, 0, count, key=neg)  # type: ignore
+        else:
+            limit = best * (10_000 + self.band_bps) // 10_000
+            band_count = bisect_right(self.prices, limit, 0, count)
+        self._band_limit = limit
+        self.band_count = band_count
+        self.band_volume = sum(self._buffers[1][:band_count])
+
+    def set(self, price: int, volume: int) -> int:
+        """Sets (or removes, with a volume of 0) a level, the worst level falling off when the side is full;
+        returns its index, or -1 when it's outside the book"""
+        count = self.count
+        volumes = self.volumes
+        top = self.top_levels
+        i = self.index(price)
+        if i < count and self.prices[i] == price:
+            previous = volumes[i]
+            if volume:
+                volumes[i] = volume
+                self.qty[i] = volume / self._volume_scale
+                if i < top:
+                    self.top_volume += volume - previous
+                if i < self.band_count:
+                    self.band_volume += volume - previous
+                return i
+            for buffer in self._buffers:
+                buffer[i : count - 1] = buffer[i + 1 : count]
+            self.count = count - 1
+            if i < top:
+                # The level that was just below the top levels moved into them
+                self.top_volume += (volumes[top - 1] if count > top else 0) - previous
+            if self.band_bps:
+                if not i:
+                    self._rebase_band()
+                elif i < self.band_count:
+                    self.band_count -= 1
+                    self.band_volume -= previous
+            return i
+        capacity = self.capacity
+        if not volume or i >= capacity:
+            return -1
+        last = min(count, capacity - 1)
+        # Volumes of the levels pushed out of the top levels and out of the book by the new level
+        leaving = volumes[top - 1] if top and count >= top else 0
+        dropped = volumes[capacity - 1] if count == capacity else 0
+        for buffer in self._buffers:
+            buffer[i + 1 : last + 1] = buffer[i:last]
+        self.prices[i] = price
+        volumes[i] = volume
+        self.px[i] = price / self._price_scale
+        self.qty[i] = volume / self._volume_scale
+        self.count = last + 1
+        if i < top:
+            self.top_volume += volume - leaving
+        if self.band_bps:
+            if not i:
+                self._rebase_band()
+            elif price >= self._band_limit if self.descending else price <= self._band_limit:
+                self.band_count += 1
+                self.band_volume += volume
+                if self.band_count > self.count:
+                    self.band_count -= 1
+                    self.band_volume -= dropped
+        return i
+
+    def clear(self):
+        self.count = 0
+        self.top_volume = self.band_count = self.band_volume = 0
+
+
+class OrderBook:
+    """Local copy of a pair's book, kept up to date from the snapshot and updates of Kraken's book channel.
+
+    Prices and volumes are stored as integers, scaled by the number of decimals Kraken uses for the pair (learned from the snapshot):
+    levels are compared, inserted and removed without going through floats or strings. They are also kept as floats,
+    exposed best first through read-only views such as `book.bids_px` and `book.asks_qty` (`numpy.asarray(book.bids_px)` doesn't copy).
+    `subscribe_book` emits the same OrderBook object after each update; read it right away, or see `read_consistent` from another thread
+    """
+
+    def __init__(self, pair: str = "", depth: int = 10, *, top_levels: int = 0, band_bps: int = 0):
+        """
+        :param: top_levels: Levels per side kept summed for `imbalance`
+        :param: band_bps: Distance from the best prices, in basis points, within which volume is kept summed for `bid_depth` and `ask_depth`
+        """
+        self.pair = pair
+        self.depth = depth
+        self.asks = BookSide(False, depth, top_levels, band_bps)
+        self.bids = BookSide(True, depth, top_levels, band_bps)
+        self.price_decimals = 0
+        self.volume_decimals = 0
+        self._scales_known = False
+        self.ready = False
+        """Whether a snapshot was received"""
+        self.updates = 0
+        """Updates applied since the last snapshot"""
+        self.checksum: Optional[int] = None
+        """Checksum sent by Kraken with the last update"""
+        self.version = 0
+        """Odd while a message is being applied; changes with each message"""
+        self.resync: Optional[List[BookLevelChange]] = None
+        """Set when the last message was a snapshot replacing levels the book had: what changed between them"""
+
+    def _learn_scales(self, level: BookLevel):
+        self.price_decimals = _decimals(level[0])
+        self.volume_decimals = _decimals(level[1])
+        self.asks.scale(self.price_decimals, self.volume_decimals)
+        self.bids.scale(self.price_decimals, self.volume_decimals)
+        self._scales_known = True
+
+    def _apply_levels(self, side: BookSide, levels: List[BookLevel]):
+        price_decimals, volume_decimals = self.price_decimals, self.volume_decimals
+        for level in levels:
+            side.set(_scaled(level[0], price_decimals), _scaled(level[1], volume_decimals))
+
+    def load_snapshot(self, payload: BookSnapshotPayload):
+        """Replaces the book's levels; when it had some already (e.g. a snapshot after a reconnection), `resync` is set to
+        the level changes going from those to the snapshot's"""
+        asks, bids = payload.get("as", []), payload.get("bs", [])
+        previous = None
+        if self.ready or self.asks.count or self.bids.count:
+            previous = self._side_levels(self.asks), self._side_levels(self.bids)
+        if asks or bids:
+            self._learn_scales((asks or bids)[0])
+        self.asks.clear()
+        self.bids.clear()
+        self._apply_levels(self.asks, asks)
+        self._apply_levels(self.bids, bids)
+        self.resync = None
+        if previous is not None:
+            self.resync = [*self._changes_from("a", previous[0], self.asks), *self._changes_from("b", previous[1], self.bids)]
+        self.updates = 0
+        self.checksum = None
+        self.ready = True
+
+    @staticmethod
+    def _side_levels(side: BookSide) -> Dict[float, float]:
+        return dict(zip(side.px[: side.count], side.qty[: side.count]))
+
+    def _changes_from(self, kind: Literal["a", "b"], previous: Dict[float, float], side: BookSide) -> List[BookLevelChange]:
+        """Removed levels (with a volume of 0), then new and changed levels, best first"""
+        current = self._side_levels(side)
+        changes = [BookLevelChange(kind, price, 0.0) for price in previous if price not in current]
+        changes.extend(BookLevelChange(kind, price, volume) for price, volume in current.items() if previous.get(price) != volume)
+        return changes
+
+    def apply_update(self, payload: BookUpdatePayload):
+        if not self._scales_known:
+            first = (payload.get("a") or payload.get("b") or [None])[0]
+            if first is None:
+                return
+            self._learn_scales(first)
+        if "a" in payload:
+            self._apply_levels(self.asks, payload["a"])
+        if "b" in payload:
+            self._apply_levels(self.bids, payload["b"])
+        if "c" in payload:
+            self.checksum = int(payload["c"])
+
+    def apply(self, message: List[Any]) -> bool:
+        """Applies a book channel message (snapshot or update, with its payload in one or two dicts);
+        returns False for an update received before any snapshot"""
+        payloads = message[1:-2]
+        is_snapshot = "as" in payloads[0] or "bs" in payloads[0]
+        if not is_snapshot and not self.ready:
+            logger.debug("[BOOK] Update for %s before its snapshot; ignored", self.pair)
+            return False
+        self.version += 1
+        try:
+            if is_snapshot:
+                self.load_snapshot(payloads[0])
+            else:
+                self.resync = None
+                for payload in payloads:
+                    self.apply_update(payload)
+                self.updates += 1
+        finally:
+            self.version += 1
+        return True
+
+    def read_consistent(self, read: Callable[["OrderBook"], _T], attempts: int = 1000) -> _T:
+        """Calls `read` with the book until it ran without the book changing meanwhile; for reading (e.g. copying views)
+        from another thread than the one applying messages"""
+        for _ in range(attempts):
+            version = self.version
+            if not version % 2:
+                value = read(self)
+                if self.version == version:
+                    return value
+            time.sleep(0)
+        raise RuntimeError(f"Book of {self.pair} kept changing while being read")
+
+    def price(self, value: int) -> float:
+        return value / 10**self.price_decimals
+
+    def volume(self, value: int) -> float:
+        return value / 10**self.volume_decimals
+
+    @property
+    def best_ask(self) -> Optional[float]:
+        return self.asks.px[0] if self.asks.count else None
+
+    @property
+    def best_bid(self) -> Optional[float]:
+        return self.bids.px[0] if self.bids.count else None
+
+    @property
+    def mid(self) -> Optional[float]:
+        if not (self.asks.count and self.bids.count):
+            return None
+        return (self.asks.px[0] + self.bids.px[0]) / 2
+
+    @property
+    def microprice(self) -> Optional[float]:
+        """Best prices weighted by the volume on the other side"""
+        if not (self.asks.count and self.bids.count):
+            return None
+        ask_volume, bid_volume = self.asks.volumes[0], self.bids.volumes[0]
+        return (self.asks.px[0] * bid_volume + self.bids.px[0] * ask_volume) / (ask_volume + bid_volume)
+
+    @property
+    def imbalance(self) -> Optional[float]:
+        """(bid volume - ask volume) / (bid volume + ask volume) over the first `top_levels` levels of each side"""
+        bid_volume, ask_volume = self.bids.top_volume, self.asks.top_volume
+        total = bid_volume + ask_volume
+        return (bid_volume - ask_volume) / total if total else None
+
+    @property
+    def bid_depth(self) -> float:
+        """Bid volume within `band_bps` of the best bid"""
+        return self.bids.band_volume / 10**self.volume_decimals
+
+    @property
+    def ask_depth(self) -> float:
+        """Ask volume within `band_bps` of the best ask"""
+        return self.asks.band_volume / 10**self.volume_decimals
+
+    def metrics(self) -> BookMetrics:
+        return BookMetrics(self.pair, self.mid, self.microprice, self.imbalance, self.bid_depth, self.ask_depth)
+
+    asks_px = property(lambda self: self.asks.views[2][: self.asks.count], doc="Ask prices, best first (float64, read-only)")
+    asks_qty = property(lambda self: self.asks.views[3][: self.asks.count], doc="Ask volumes, best first (float64, read-only)")
+    bids_px = property(lambda self: self.bids.views[2][: self.bids.count], doc="Bid prices, best first (float64, read-only)")
+    bids_qty = property(lambda self: self.bids.views[3][: self.bids.count], doc="Bid volumes, best first (float64, read-only)")
+    asks_px_int = property(lambda self: self.asks.views[0][: self.asks.count], doc="Ask prices in units of 10**-price_decimals (int64, read-only)")
+    asks_qty_int = property(lambda self: self.asks.views[1][: self.asks.count], doc="Ask volumes in units of 10**-volume_decimals (int64, read-only)")
+    bids_px_int = property(lambda self: self.bids.views[0][: self.bids.count], doc="Bid prices in units of 10**-price_decimals (int64, read-only)")
+    bids_qty_int = property(lambda self: self.bids.views[1][: self.bids.count], doc="Bid volumes in units of 10**-volume_decimals (int64, read-only)")
+
+    def _levels(self, side: BookSide, n: Optional[int]) -> List[Tuple[float, float]]:
+        count = side.count if n is None else min(n, side.count)
+        return list(zip(side.px[:count], side.qty[:count]))
+
+    def compute_checksum(self) -> int:
+        """Kraken's CRC32 of the 10 best asks then the 10 best bids, computed from the local book"""
+        asks, bids = self.asks, self.bids
+        na, nb = min(CHECKSUM_LEVELS, asks.count), min(CHECKSUM_LEVELS, bids.count)
+        values = (
+            *chain.from_iterable(zip(asks.prices[:na], asks.volumes[:na])),
+            *chain.from_iterable(zip(bids.prices[:nb], bids.volumes[:nb])),
+        )
+        return zlib.crc32((_CHECKSUM_FORMATS[len(values)] % values).encode())
+
+    def verify(self) -> bool:
+        """Whether the local book matches the checksum of the last update (True when there's nothing to check against)"""
+        return self.checksum is None or self.compute_checksum() == self.checksum
+
+    def ask_levels(self, n: Optional[int] = None) -> List[Tuple[float, float]]:
+        """(price, volume) of the `n` best asks, best first"""
+        return self._levels(self.asks, n)
+
+    def bid_levels(self, n: Optional[int] = None) -> List[Tuple[float, float]]:
+        """(price, volume) of the `n` best bids, best first"""
+        return self._levels(self.bids, n)
+
+
+def maintain_book(
+    depth: int = 10,
+    keyed: bool = False,
+    verify_every: int = 1,
+    resync: Optional[Callable[[List[str]], None]] = None,
+    *,
+    top_levels: int = 0,
+    band_bps: int = 0,
+) -> Callable[[Observable[List]], Observable[OrderBook | Tuple[str, OrderBook]]]:
+    """Operator on book channel messages keeping one OrderBook per pair and emitting it after each message
+    (as (pair, book) tuples with `keyed`). A new snapshot, e.g. after a reconnection, replaces the book's content;
+    the book is then emitted with `book.resync` listing only the levels that changed, for consumers to update what they derived from it
+
+    :param: verify_every: Checks the book against Kraken's checksum every that many updates; 0 to never check
+    :param: resync: Called with the pair whose book doesn't match its checksum (and is not emitted anymore until its next snapshot);
+            meant to resubscribe it
+    :param: top_levels, band_bps: See OrderBook
+    """
+
+    def _maintain_book(source: Observable[List]) -> Observable[OrderBook | Tuple[str, OrderBook]]:
+        def subscribe(observer: ObserverBase, scheduler: Optional[SchedulerBase] = None):
+            books: Dict[str, OrderBook] = {}
+
+            def on_next(message: List):
+                pair = message[-1]
+                book = books.get(pair)
+                if book is None:
+                    book = books[pair] = OrderBook(pair, depth, top_levels=top_levels, band_bps=band_bps)
+                if not book.apply(message):
+                    return
+                if verify_every and book.updates and not book.updates % verify_every and not book.verify():
+                    logger.warning("[BOOK] Checksum mismatch for %s; resynchronizing", pair)
+                    metrics.increment("book_checksum_mismatches_total", (message[-2], pair))
+                    book.ready = False
+                    if resync is not None:
+                        resync([pair])
+                    return
+                observer.on_next((pair, book) if keyed else book)
+
+            return source.subscribe(on_next, observer.on_error, observer.on_completed, scheduler=scheduler)
+
+        return Observable(subscribe)
+
+    return _maintain_book
+
+
+def subscribe_book(
+    pair: str | Sequence[str],
+    messages: Observable[Dict | List],
+    depth: int = 10,
+    *,
+    verify_every: int = 1,
+    top_levels: int = 0,
+    band_bps: int = 0,
+    registry: Optional[SubscriptionRegistry] = None,
+    watchdog: Optional[StalenessWatchdog] = None,
+):
+    """Emits the pair's OrderBook after each snapshot or update; with a list of pairs, (pair, book) tuples are emitted
+    After a reconnection or a resynchronization, the book is emitted with `book.resync` set to the level changes the new snapshot brought
+    Books are checked against Kraken's checksum every `verify_every` updates (0 to never check); a pair whose book drifted
+    is resubscribed on its own, to get a fresh snapshot, and isn't emitted until then
+    Other options are those of `subscribe_to_channel`"""
+    if depth not in DEPTHS:
+        raise ValueError(f"Book depth must be one of {DEPTHS}")
+    subscription_kwargs = {"depth": depth}
+
+    def _subscribe_book(sockets: Observable[EnhancedWebsocket]) -> Observable[OrderBook | Tuple[str, OrderBook]]:
+        def subscribe(observer: ObserverBase, scheduler: Optional[SchedulerBase] = None):
+            # Latest socket
+            current: List[EnhancedWebsocket] = []
+
+            def use(socket: EnhancedWebsocket):
+                current[:] = [socket]
+
+            def resync(pairs: List[str]):
+                if registry is not None:
+                    registry.refresh(ChannelName.CHANNEL_BOOK, pairs, subscription_kwargs)
+                elif current:
+                    send_resubscription(current[0], ChannelName.CHANNEL_BOOK, pairs, subscription_kwargs)
+
+            return sockets.pipe(
+                operators.do_action(use),
+                subscribe_to_channel(messages, ChannelName.CHANNEL_BOOK, pair=pair, subscription_kwargs=subscription_kwargs, registry=registry, watchdog=watchdog),
+                maintain_book(
+                    depth, keyed=not isinstance(pair, str), verify_every=verify_every, resync=resync, top_levels=top_levels, band_bps=band_bps
+                ),
+            ).subscribe(observer, scheduler=scheduler)
+
+        return Observable(subscribe)
+
+    return _subscribe_book
+
+
+def book_metrics(
+    interval: Optional[float] = None, scheduler: Optional[SchedulerBase] = None
+) -> Callable[[Observable[OrderBook | Tuple[str, OrderBook]]], Observable[BookMetrics]]:
+    """Operator turning the books emitted by `subscribe_book` into their BookMetrics, emitted only when they changed.
+    With `interval` (seconds), each pair's latest metrics are emitted at most once per interval"""
+
+    def _book_metrics(source: Observable[OrderBook | Tuple[str, OrderBook]]) -> Observable[BookMetrics]:
+        def subscribe(observer: ObserverBase[BookMetrics], scheduler_: Optional[SchedulerBase] = None):
+            latest: Dict[str, BookMetrics] = {}
+
+            def on_next(value: OrderBook | Tuple[str, OrderBook]):
+                book = value[1] if type(value) is tuple else value
+                current = book.metrics()  # type: ignore
+                if latest.get(current.pair) != current:
+                    latest[current.pair] = current
+                    observer.on_next(current)
+
+            return source.subscribe(on_next, observer.on_error, observer.on_completed, scheduler=scheduler_)
+
+        changes = Observable(subscribe)
+        if not interval:
+            return changes
+        return changes.pipe(
+            operators.group_by(attrgetter("pair")),
+            operators.flat_map(lambda group: group.pipe(operators.sample(interval, scheduler=scheduler))),
+        )
+
+    return _book_metrics
+
+
+def subscribe_book_metrics(
+    pair: str | Sequence[str],
+    messages: Observable[Dict | List],
+    depth: int = 10,
+    *,
+    top_levels: int = 10,
+    band_bps: int = 10,
+    interval: Optional[float] = None,
+    scheduler: Optional[SchedulerBase] = None,
+    verify_every: int = 1,
+    registry: Optional[SubscriptionRegistry] = None,
+    watchdog: Optional[StalenessWatchdog] = None,
+) -> Callable[[Observable[EnhancedWebsocket]], Observable[BookMetrics]]:
+    """Emits BookMetrics (mid, microprice, imbalance over `top_levels` levels, volume within `band_bps` of the best prices) of the pair(s)
+    whenever they change, or each pair's latest at most once per `interval` seconds. They are kept up to date by the books as levels change
+    rather than computed again from all levels. Other options are those of `subscribe_book`"""
+    return compose(
+        subscribe_book(
+            pair, messages, depth, verify_every=verify_every, top_levels=top_levels, band_bps=band_bps, registry=registry, watchdog=watchdog
+        ),
+        book_metrics(interval, scheduler),
+    )
+
+
+__all__ = [
+    "BookSide",
+    "DEPTHS",
+    "OrderBook",
+    "book_metrics",
+    "maintain_book",
+    "subscribe_book",
+    "subscribe_book_metrics",
+]
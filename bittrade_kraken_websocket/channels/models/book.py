@@ -0,0 +1,17 @@
+from typing import List, Literal, NamedTuple, Optional, TypedDict
+
+"""https://docs.kraken.com/websockets/#message-book"""
+BookLevel = List[str]  # price, volume, timestamp, and "r" when republished (an update repeated after a trade)
+
+BookSnapshotPayload = TypedDict("BookSnapshotPayload", {"as": List[BookLevel], "bs": List[BookLevel]})
+# A volume of 0 removes the level; `c` is the checksum of the book after the update. Both sides may come in one dict or in two
+BookUpdatePayload = TypedDict("BookUpdatePayload", {"a": List[BookLevel], "b": List[BookLevel], "c": str}, total=False)
+
+# Change of a level of a local book, like those of updates: side ("a" or "b"), price and new volume, 0 for a removed level
+BookLevelChange = NamedTuple("BookLevelChange", [("side", Literal["a", "b"]), ("price", float), ("volume", float)])
+
+# Derived from a local book: bid and ask depths are the volumes within some basis points of the best prices
+BookMetrics = NamedTuple(
+    "BookMetrics",
+    [("pair", str), ("mid", Optional[float]), ("microprice", Optional[float]), ("imbalance", Optional[float]), ("bid_depth", float), ("ask_depth", float)],
+)
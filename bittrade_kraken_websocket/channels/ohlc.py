@@ -1,11 +1,14 @@
-from typing import List, Dict, Any
+from typing import List, Dict, Any, Sequence, Optional
 
-from reactivex import Observable, compose, operators
+from reactivex import Observable, compose
 
 from .models.message import PrivateMessage, PublicMessage
 
 from .channels import ChannelName
 from .models.ohlc import OHLCPayload
+from .payload import map_payloads
+from .registry import SubscriptionRegistry
+from bittrade_kraken_websocket.messages.watchdog import StalenessWatchdog
 from .subscribe import subscribe_to_channel
 
 
@@ -13,10 +16,20 @@ def to_ohlc_payload(message):
     return OHLCPayload(*message[1]) 
 
 
-def subscribe_ohlc(pair: str, messages: Observable[Dict | List], interval: int=1):
+def subscribe_ohlc(
+    pair: str | Sequence[str],
+    messages: Observable[Dict | List],
+    interval: int=1,
+    *,
+    batched: bool = False,
+    stamped: bool = False,
+    registry: Optional[SubscriptionRegistry] = None,
+    watchdog: Optional[StalenessWatchdog] = None,
+):
+    """OHLC payloads of the pair(s) for the interval. Options are those of `subscribe_to_channel`"""
     return compose(
-        subscribe_to_channel(messages, ChannelName.CHANNEL_OHLC, pair=pair, subscription_kwargs={"interval": interval}),
-        operators.map(to_ohlc_payload),
+        subscribe_to_channel(messages, ChannelName.CHANNEL_OHLC, pair=pair, subscription_kwargs={"interval": interval}, batched=batched, registry=registry, watchdog=watchdog),
+        map_payloads(to_ohlc_payload, batched, keyed=not isinstance(pair, str), stamped=stamped),
     )
 
 __all__ = [
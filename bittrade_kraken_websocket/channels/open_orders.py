@@ -2,7 +2,7 @@ from decimal import Decimal
 from typing import Dict, List, Literal, Optional, TypedDict
 
 from expression import Some
-from reactivex import Observable, compose, operators
+from reactivex import Observable, compose
 from pydantic.dataclasses import dataclass
 from bittrade_kraken_websocket.channels.models.message import (
     PrivateMessage,
@@ -12,7 +12,8 @@ from bittrade_kraken_websocket.channels.models.message import (
 from bittrade_kraken_websocket.events import Order, OrderStatus, OrderSide, OrderType
 
 from .channels import ChannelName
-from .payload import private_to_payload
+from .payload import map_payloads, private_to_payload
+from .registry import SubscriptionRegistry
 from .subscribe import subscribe_to_channel
 
 
@@ -93,10 +94,13 @@ def to_open_orders_payload(message: PrivateMessage | PublicMessage):
     return private_to_payload(message, OpenOrdersPayload)
 
 
-def subscribe_open_orders(messages: Observable[Dict | List]):
+def subscribe_open_orders(
+    messages: Observable[Dict | List], *, stamped: bool = False, registry: Optional[SubscriptionRegistry] = None
+):
+    """Options are those of `subscribe_to_channel`"""
     return compose(
-        subscribe_to_channel(messages, ChannelName.CHANNEL_OPEN_ORDERS),
-        operators.map(to_open_orders_payload),
+        subscribe_to_channel(messages, ChannelName.CHANNEL_OPEN_ORDERS, registry=registry),
+        map_payloads(to_open_orders_payload, stamped=stamped),
     )
 
 
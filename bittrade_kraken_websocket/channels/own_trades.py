@@ -1,11 +1,12 @@
 from decimal import Decimal
 from typing import List, Dict, Optional, TypedDict, Any, cast
 
-from reactivex import Observable, compose, operators
+from reactivex import Observable, compose
 
 from bittrade_kraken_websocket.channels import ChannelName
 from bittrade_kraken_websocket.channels.models.message import PrivateMessage
-from bittrade_kraken_websocket.channels.payload import private_to_payload
+from bittrade_kraken_websocket.channels.payload import map_payloads, private_to_payload
+from bittrade_kraken_websocket.channels.registry import SubscriptionRegistry
 from bittrade_kraken_websocket.channels.subscribe import subscribe_to_channel
 from bittrade_kraken_websocket.events import OrderSide, OrderType
 from pydantic.dataclasses import dataclass
@@ -115,7 +116,11 @@ def parse_own_trade(payload: OwnTradesPayloadEntry):
 
 
 def subscribe_own_trades(
-    messages: Observable[Dict | List], subscription_kwargs: Optional[Dict] = None
+    messages: Observable[Dict | List],
+    subscription_kwargs: Optional[Dict] = None,
+    *,
+    stamped: bool = False,
+    registry: Optional[SubscriptionRegistry] = None,
 ):
     """Subscribe to list of own trades
     By default, we skip the first message each time we have to resubscribe because:
@@ -123,6 +128,8 @@ def subscribe_own_trades(
     However trades don't get updated so this snapshot feels inconsistent with other feeds
 
     Set your own subscription_kwargs to avoid that behavior
+
+    Options are those of `subscribe_to_channel`
     """
     subscription_kwargs = subscription_kwargs or {"snapshot": False}
     return compose(
@@ -130,8 +137,9 @@ def subscribe_own_trades(
             messages,
             ChannelName.CHANNEL_OWN_TRADES,
             subscription_kwargs=subscription_kwargs,
+            registry=registry,
         ),
-        operators.map(lambda x: to_own_trades_payload(cast(PrivateMessage, x))),
+        map_payloads(lambda x: to_own_trades_payload(cast(PrivateMessage, x)), stamped=stamped),
     )
 
 
@@ -1,6 +1,10 @@
-from typing import TypeVar, Type, cast
+from typing import Any, Callable, Tuple, TypeVar, Type, cast
+
+from reactivex import Observable, operators
+from reactivex.observable import GroupedObservable
 
 from .models.message import PrivateMessage, PublicMessage
+from bittrade_kraken_websocket.messages.timestamps import stamped as _stamped
 
 _T = TypeVar("_T")
 
@@ -11,3 +15,23 @@ def to_payload(message: PrivateMessage | PublicMessage, payload_type: Type[_T])
 
 def private_to_payload(message: PrivateMessage | PublicMessage,  payload_type: Type[_T]) -> _T:
     return cast(_T, message[0])
+
+
+def map_payloads(mapper: Callable[[Any], _T], batched: bool = False, keyed: bool = False, stamped: bool = False):
+    """Maps messages to payloads; with `batched`, maps each message of the batches.
+    With `keyed`, payloads come as (pair, payload) tuples, as used by multi-pair subscriptions.
+    With `stamped`, payloads come as Stamped(payload, received_ns, received_at); messages must be StampedMessage (see `timestamps` on connections)"""
+    if stamped:
+        _payload_mapper = mapper
+        mapper = lambda message: _stamped(_payload_mapper(message), message)  # type: ignore
+    if keyed:
+        _mapper = mapper
+        mapper = lambda message: (message[-1], _mapper(message))  # type: ignore
+    if batched:
+        return operators.map(lambda batch: [mapper(message) for message in batch])
+    return operators.map(mapper)
+
+
+def group_by_pair() -> Callable[[Observable[Tuple[str, _T]]], Observable[GroupedObservable[str, _T]]]:
+    """Splits the (pair, payload) output of a multi-pair subscription into one observable of payloads per pair, keyed by pair"""
+    return operators.group_by(lambda x: x[0], lambda x: x[1])
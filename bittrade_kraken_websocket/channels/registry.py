@@ -0,0 +1,196 @@
+import time
+from logging import getLogger
+from threading import RLock
+from typing import Any, Callable, Dict, List, Optional, Sequence, Set, Tuple
+
+from reactivex import Observable
+from reactivex.abc import DisposableBase, ObserverBase, SchedulerBase
+from reactivex.disposable import CompositeDisposable, Disposable
+from reactivex.subject import Subject
+
+from .channels import ChannelName
+from .subscribe import as_pairs, subscription_messages
+from bittrade_kraken_websocket.connection.enhanced_websocket import EnhancedWebsocket
+from bittrade_kraken_websocket.events import EventName
+from bittrade_kraken_websocket.messages.filters.kind import channel_name_for
+
+logger = getLogger(__name__)
+
+# (channel, subscription keywords as sorted items)
+_Subscription = Tuple[ChannelName, Tuple[Tuple[str, Any], ...]]
+# (channel name as used by Kraken, e.g. ohlc-5, pair); pair is empty for private channels
+SubscriptionKey = Tuple[str, str]
+
+
+def _status_key(message: Dict) -> Optional[SubscriptionKey]:
+    subscription = message.get("subscription") or {}
+    try:
+        channel = ChannelName(subscription.get("name"))
+    except ValueError:
+        return None
+    return channel_name_for(channel, subscription), message.get("pair") or ""
+
+
+class SubscriptionRegistry:
+    """Knows every active subscription of a connection and sends their subscribe events itself, in as few frames as possible.
+
+    Pass it as `registry` to `subscribe_ticker`, `subscribe_ohlc`, etc. (all subscriptions of one connection sharing the same registry):
+    subscriptions are registered when subscribed to and, on each new socket, all of them are resubscribed at once
+    (one event per channel and set of subscription keywords, up to MAX_PAIRS_PER_SUBSCRIPTION pairs each)
+    instead of one event per subscription.
+    When given `messages`, `subscriptionStatus` acknowledgements are tracked and the time taken to get every subscription
+    acknowledged after a new socket is emitted by `resubscribed`
+    """
+
+    def __init__(self, messages: Optional[Observable[Dict | List]] = None, clock: Callable[[], float] = time.monotonic):
+        self.clock = clock
+        self._messages = messages
+        self._lock = RLock()
+        self._pairs: Dict[_Subscription, Dict[str, int]] = {}
+        self._socket: Optional[EnhancedWebsocket] = None
+        self._holds = 0
+        self._acks_subscription: Optional[DisposableBase] = None
+        self._pending: Set[SubscriptionKey] = set()
+        self._started: Optional[float] = None
+        self._resubscribed: Subject[float] = Subject()
+        self.last_resubscribe_duration: Optional[float] = None
+        self.errors: Dict[SubscriptionKey, str] = {}
+        """Error message of subscriptions refused by Kraken"""
+
+    @property
+    def resubscribed(self) -> Observable[float]:
+        """Seconds between a new socket and the acknowledgement of all its subscriptions"""
+        return self._resubscribed
+
+    @property
+    def pending(self) -> Set[SubscriptionKey]:
+        """Subscriptions sent but not acknowledged yet"""
+        with self._lock:
+            return set(self._pending)
+
+    @property
+    def active(self) -> List[SubscriptionKey]:
+        with self._lock:
+            return [
+                (channel_name_for(channel, dict(keywords)), pair)
+                for (channel, keywords), pairs in self._pairs.items()
+                for pair in pairs
+            ]
+
+    def _send(self, subscription: _Subscription, pairs: Sequence[str], event: EventName):
+        socket = self._socket
+        if socket is None:
+            return
+        channel, keywords = subscription
+        kwargs = dict(keywords)
+        for message in subscription_messages(channel, [pair for pair in pairs if pair], kwargs, event):
+            socket.send(message)  # type: ignore
+        if event == EventName.EVENT_SUBSCRIBE:
+            channel_name = channel_name_for(channel, kwargs)
+            self._pending.update((channel_name, pair) for pair in pairs)
+            if self._started is None:
+                self._started = self.clock()
+
+    def _use_socket(self, socket: EnhancedWebsocket):
+        with self._lock:
+            if socket is self._socket:
+                return
+            self._socket = socket
+            self._pending = set()
+            self._started = None
+            logger.info("[SUBSCRIPTIONS] New socket; resubscribing %s channel(s)", len(self._pairs))
+            for subscription, pairs in self._pairs.items():
+                self._send(subscription, list(pairs), EventName.EVENT_SUBSCRIBE)
+
+    def _register(self, subscription: _Subscription, pairs: List[str]):
+        with self._lock:
+            counts = self._pairs.setdefault(subscription, {})
+            added = [pair for pair in pairs if not counts.get(pair)]
+            for pair in pairs:
+                counts[pair] = counts.get(pair, 0) + 1
+            if added:
+                self._send(subscription, added, EventName.EVENT_SUBSCRIBE)
+            self._holds += 1
+            if self._holds == 1 and self._messages is not None:
+                self._acks_subscription = self._messages.subscribe(self._on_message)
+
+    def _unregister(self, subscription: _Subscription, pairs: List[str]):
+        with self._lock:
+            counts = self._pairs.get(subscription, {})
+            removed = []
+            for pair in pairs:
+                counts[pair] -= 1
+                if not counts[pair]:
+                    del counts[pair]
+                    removed.append(pair)
+            if not counts:
+                self._pairs.pop(subscription, None)
+            if removed:
+                try:
+                    self._send(subscription, removed, EventName.EVENT_UNSUBSCRIBE)
+                except Exception as ex:
+                    logger.error("Could not send unsubscribe messages: %s", ex)
+            self._holds -= 1
+            acks_subscription = None
+            if not self._holds:
+                acks_subscription, self._acks_subscription = self._acks_subscription, None
+        if acks_subscription is not None:
+            acks_subscription.dispose()
+
+    def refresh(self, channel: ChannelName, pairs: Sequence[str], subscription_kwargs: Optional[Dict] = None):
+        """Unsubscribes then subscribes again the given pairs (that must be registered), e.g. when they stopped updating"""
+        subscription: _Subscription = (channel, tuple(sorted((subscription_kwargs or {}).items())))
+        with self._lock:
+            self._send(subscription, pairs, EventName.EVENT_UNSUBSCRIBE)
+            self._send(subscription, pairs, EventName.EVENT_SUBSCRIBE)
+
+    def _on_message(self, message: Dict | List):
+        if type(message) != dict or message.get("event") != "subscriptionStatus":
+            return
+        status = message.get("status")
+        if status not in ("subscribed", "error"):
+            return
+        key = _status_key(message)
+        duration = None
+        with self._lock:
+            if status == "error":
+                logger.error("[SUBSCRIPTIONS] Subscription %s refused: %s", key, message.get("errorMessage"))
+                if key is not None:
+                    self.errors[key] = message.get("errorMessage", "")
+            self._pending.discard(key)  # type: ignore
+            if not self._pending and self._started is not None:
+                duration = self.last_resubscribe_duration = self.clock() - self._started
+                self._started = None
+        if duration is not None:
+            logger.info("[SUBSCRIPTIONS] All subscriptions acknowledged in %.3fs", duration)
+            self._resubscribed.on_next(duration)
+
+    def hold(
+        self, channel: ChannelName, pair: str | Sequence[str] = "", subscription_kwargs: Optional[Dict] = None
+    ) -> Callable[[Observable[EnhancedWebsocket]], Observable[EnhancedWebsocket]]:
+        """Operator on sockets keeping the subscription registered for as long as it's subscribed to"""
+        subscription: _Subscription = (channel, tuple(sorted((subscription_kwargs or {}).items())))
+        pairs = as_pairs(pair) or [""]
+
+        def _hold(source: Observable[EnhancedWebsocket]) -> Observable[EnhancedWebsocket]:
+            def subscribe(observer: ObserverBase[EnhancedWebsocket], scheduler: Optional[SchedulerBase] = None):
+                self._register(subscription, pairs)
+
+                def on_next(socket: EnhancedWebsocket):
+                    self._use_socket(socket)
+                    observer.on_next(socket)
+
+                return CompositeDisposable(
+                    source.subscribe(on_next, observer.on_error, observer.on_completed, scheduler=scheduler),
+                    Disposable(lambda: self._unregister(subscription, pairs)),
+                )
+
+            return Observable(subscribe)
+
+        return _hold
+
+
+__all__ = [
+    "SubscriptionKey",
+    "SubscriptionRegistry",
+]
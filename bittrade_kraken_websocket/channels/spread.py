@@ -1,12 +1,14 @@
-from typing import List, Dict, Any
+from typing import List, Dict, Any, Sequence, Optional
 
-from reactivex import Observable, compose, operators
+from reactivex import Observable, compose
 
 from .models.message import PrivateMessage, PublicMessage
 
 from .channels import ChannelName
 from .models.spread import SpreadPayload
-from .payload import to_payload
+from .payload import map_payloads, to_payload
+from .registry import SubscriptionRegistry
+from bittrade_kraken_websocket.messages.watchdog import StalenessWatchdog
 from .subscribe import subscribe_to_channel
 
 
@@ -14,10 +16,19 @@ def to_spread_payload(message: PrivateMessage | PublicMessage):
     return to_payload(message, SpreadPayload)
 
 
-def subscribe_spread(pair: str, messages: Observable[Dict | List]):
+def subscribe_spread(
+    pair: str | Sequence[str],
+    messages: Observable[Dict | List],
+    *,
+    batched: bool = False,
+    stamped: bool = False,
+    registry: Optional[SubscriptionRegistry] = None,
+    watchdog: Optional[StalenessWatchdog] = None,
+):
+    """Spread payloads of the pair(s). Options are those of `subscribe_to_channel`"""
     return compose(
-        subscribe_to_channel(messages, ChannelName.CHANNEL_SPREAD, pair=pair),
-        operators.map(to_spread_payload),
+        subscribe_to_channel(messages, ChannelName.CHANNEL_SPREAD, pair=pair, batched=batched, registry=registry, watchdog=watchdog),
+        map_payloads(to_spread_payload, batched, keyed=not isinstance(pair, str), stamped=stamped),
     )
 
 __all__ = [
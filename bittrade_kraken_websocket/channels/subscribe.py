@@ -1,6 +1,7 @@
 from logging import getLogger
-from typing import Callable, Dict, List, Optional
+from typing import Callable, Dict, Hashable, List, Optional, Sequence
 import typing
+from typing import TYPE_CHECKING
 
 from reactivex import Observable, operators, compose
 from reactivex.abc import ObserverBase, SchedulerBase
@@ -13,39 +14,106 @@ from .models.message import (
 )
 from bittrade_kraken_websocket.connection.generic import EnhancedWebsocket
 from bittrade_kraken_websocket.events import EventName, SubscriptionRequestMessage
-from bittrade_kraken_websocket.messages.filters.kind import keep_channel_messages
+from bittrade_kraken_websocket.events.templates import MAX_CACHED_TEMPLATES, Template
+from bittrade_kraken_websocket.messages.filters.kind import (
+    channel_name_for,
+    keep_channel_messages,
+    keep_channel_messages_batched,
+)
+from bittrade_kraken_websocket.messages.filters.router import ChannelRouter
 from bittrade_kraken_websocket.messages.sequence import (
     in_sequence,
     retry_on_invalid_sequence,
 )
 
+if TYPE_CHECKING:
+    from .registry import SubscriptionRegistry
+    from bittrade_kraken_websocket.messages.watchdog import StalenessWatchdog
+
 logger = getLogger(__name__)
 
+# Kraken accepts a list of pairs in a single subscribe event; larger lists are split over several events
+MAX_PAIRS_PER_SUBSCRIPTION = 100
+
+
+def as_pairs(pair: str | Sequence[str]) -> List[str]:
+    """Pairs as a list; an empty string (private channels) gives an empty list"""
+    if isinstance(pair, str):
+        return [pair] if pair else []
+    return list(dict.fromkeys(pair))
+
+
+def subscription_messages(
+    channel: ChannelName,
+    pair: str | Sequence[str] = "",
+    subscription_kwargs: Optional[Dict[str, str]] = None,
+    event: EventName = EventName.EVENT_SUBSCRIBE,
+) -> List[SubscriptionRequestMessage]:
+    """Subscribe (or unsubscribe) events for the pairs, in as few messages as allowed"""
+    pairs = as_pairs(pair)
+    chunks = [
+        pairs[i : i + MAX_PAIRS_PER_SUBSCRIPTION]
+        for i in range(0, len(pairs), MAX_PAIRS_PER_SUBSCRIPTION)
+    ] or [[]]
+    messages = []
+    for chunk in chunks:
+        message: SubscriptionRequestMessage = {
+            "event": event,
+            "subscription": {"name": channel.value},
+        }  # type: ignore  We have to ignore because NotRequired (a feature of TypedDict) is currently not available so "pair" is always required
+        if chunk:
+            message["pair"] = chunk
+        if subscription_kwargs:
+            message["subscription"].update(subscription_kwargs)
+        messages.append(message)
+    return messages
+
+
+_templates_cache: Dict[Hashable, List[Template]] = {}
+
+
+def subscription_templates(
+    channel: ChannelName,
+    pair: str | Sequence[str] = "",
+    subscription_kwargs: Optional[Dict[str, str]] = None,
+    event: EventName = EventName.EVENT_SUBSCRIBE,
+    cache: bool = True,
+) -> List[Template]:
+    """`subscription_messages` encoded once; cached (unless `cache` is False, e.g. for one-off resubscriptions of some pairs)
+    so that resubscribing on a new socket only has to add the token"""
+    key = (channel, tuple(as_pairs(pair)), tuple(sorted((subscription_kwargs or {}).items())), event)
+    templates = _templates_cache.get(key)
+    if templates is None:
+        templates = [
+            Template(typing.cast(Dict, message))
+            for message in subscription_messages(channel, pair, subscription_kwargs, event)
+        ]
+        if cache:
+            if len(_templates_cache) >= MAX_CACHED_TEMPLATES:
+                _templates_cache.clear()
+            _templates_cache[key] = templates
+    return templates
+
 
 def channel_subscription(
     socket: EnhancedWebsocket,
     channel: ChannelName,
-    pair: str = "",
+    pair: str | Sequence[str] = "",
     subscription_kwargs: Optional[Dict[str, str]] = None,
 ):
-    subscription_message: SubscriptionRequestMessage = {
-        "event": EventName.EVENT_SUBSCRIBE,
-        "subscription": {"name": channel.value},
-    }  # type: ignore  We have to ignore because NotRequired (a feature of TypedDict) is currently not available so "pair" is always required
-    if pair:
-        subscription_message["pair"] = [pair]
-    if subscription_kwargs:
-        subscription_message["subscription"].update(subscription_kwargs)
-
-    unsubscription_message = dict(subscription_message)
-    unsubscription_message["event"] = EventName.EVENT_UNSUBSCRIBE
+    subscribe_templates = subscription_templates(channel, pair, subscription_kwargs)
+    unsubscribe_templates = subscription_templates(
+        channel, pair, subscription_kwargs, EventName.EVENT_UNSUBSCRIBE
+    )
 
     def on_enter():
-        socket.send_json(typing.cast(Dict, subscription_message))
+        for template in subscribe_templates:
+            socket.send_bytes(template.render(socket.token))
 
     def on_exit():
         try:
-            socket.send_json(typing.cast(Dict, unsubscription_message))
+            for template in unsubscribe_templates:
+                socket.send_bytes(template.render(socket.token))
         except Exception as ex:
             logger.error("Could not send unsubscribe messages: %s", ex)
 
@@ -64,19 +132,64 @@ def channel_subscription(
     return _channel_subscription
 
 
+def send_resubscription(
+    socket: EnhancedWebsocket,
+    channel: ChannelName,
+    pair: str | Sequence[str] = "",
+    subscription_kwargs: Optional[Dict[str, str]] = None,
+):
+    """Unsubscribes then subscribes again, e.g. pairs that stopped updating"""
+    for event in (EventName.EVENT_UNSUBSCRIBE, EventName.EVENT_SUBSCRIBE):
+        for template in subscription_templates(channel, pair, subscription_kwargs, event, cache=False):
+            socket.send_bytes(template.render(socket.token))
+
+
+def channel_messages(
+    messages: Observable[Dict | List],
+    channel: ChannelName,
+    pair: str | Sequence[str] = "",
+    subscription_keywords: Optional[Dict] = None,
+    batched: bool = False,
+) -> Observable[Dict | List]:
+    """Messages for the given channel only; uses the routes when `messages` is a ChannelRouter"""
+    if batched:
+        return messages.pipe(keep_channel_messages_batched(channel, pair, subscription_keywords))
+    if isinstance(messages, ChannelRouter):
+        return messages.channel(channel_name_for(channel, subscription_keywords), pair)
+    return messages.pipe(keep_channel_messages(channel, pair, subscription_keywords))
+
+
 def subscribe_to_channel(
     messages: Observable[Dict | List],
     channel: ChannelName,
     *,
-    pair: str = "",
+    pair: str | Sequence[str] = "",
     subscription_kwargs: Optional[Dict] = None,
+    batched: bool = False,
+    registry: Optional["SubscriptionRegistry"] = None,
+    watchdog: Optional["StalenessWatchdog"] = None,
 ) -> Callable[
     [Observable[EnhancedWebsocket]], Observable[PublicMessage | PrivateMessage]
 ]:
+    """
+    :param: pair: A pair or a list of pairs; all of them are subscribed with a single event (see MAX_PAIRS_PER_SUBSCRIPTION)
+    :param: batched: `messages` is a stream of message batches (see `keep_message_batches_only`); the result is then a stream of lists of channel messages.
+            Only available for public channels
+    :param: registry: Subscribe and unsubscribe events are sent by the registry, batched with those of the other subscriptions of the connection
+    :param: watchdog: Resubscribes pairs that stop updating, then recycles the socket if that didn't help; public channels only
+
+    The `subscribe_*` helpers take the same options and map messages to payloads: with a list of pairs they emit (pair, payload) tuples
+    (see `group_by_pair`), with `batched` lists of payloads, and with `stamped` Stamped(payload, received_ns, received_at),
+    which requires a connection created with `timestamps=True`
+    """
     is_private = channel in (
         ChannelName.CHANNEL_OWN_TRADES,
         ChannelName.CHANNEL_OPEN_ORDERS,
     )
+    if is_private and batched:
+        raise ValueError("Batched subscriptions are not available for private channels")
+    if not isinstance(pair, str) and not as_pairs(pair):
+        raise ValueError("A list of pairs must hold at least one pair")
     subscription_keywords: Dict = subscription_kwargs or {}
     messages_operators = []
     if is_private:
@@ -85,13 +198,24 @@ def subscribe_to_channel(
     def socket_to_channel_messages(
         socket: EnhancedWebsocket,
     ) -> Observable[PublicMessage | PrivateMessage]:
-        return messages.pipe(
-            keep_channel_messages(channel, pair, subscription_keywords),
-            channel_subscription(socket, channel, pair, subscription_keywords),
-            *messages_operators,
-        )
+        source = channel_messages(messages, channel, pair, subscription_keywords, batched)
+        if registry is None:
+            source = source.pipe(channel_subscription(socket, channel, pair, subscription_keywords))
+        if watchdog is not None and not is_private:
+            if registry is None:
+                resubscribe = lambda pairs: send_resubscription(socket, channel, pairs, subscription_keywords)
+            else:
+                resubscribe = lambda pairs: registry.refresh(channel, pairs, subscription_keywords)
+            source = source.pipe(
+                watchdog.watch(
+                    channel_name_for(channel, subscription_keywords), as_pairs(pair), resubscribe, socket.socket.close
+                )
+            )
+        return source.pipe(*messages_operators)
 
+    socket_operators = [] if registry is None else [registry.hold(channel, pair, subscription_keywords)]
     return compose(
+        *socket_operators,
         operators.map(socket_to_channel_messages),
         operators.switch_latest(),
         operators.share(),
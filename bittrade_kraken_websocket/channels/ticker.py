@@ -1,11 +1,13 @@
-from typing import List, Dict
+from typing import List, Dict, Sequence, Optional
 
-from reactivex import Observable, compose, operators
+from reactivex import Observable, compose
 
 from bittrade_kraken_websocket.channels import ChannelName
 from bittrade_kraken_websocket.channels.models.message import PrivateMessage, PublicMessage
 from bittrade_kraken_websocket.channels.models.ticker import TickerPayload
-from bittrade_kraken_websocket.channels.payload import to_payload
+from bittrade_kraken_websocket.channels.payload import map_payloads, to_payload
+from bittrade_kraken_websocket.channels.registry import SubscriptionRegistry
+from bittrade_kraken_websocket.messages.watchdog import StalenessWatchdog
 from bittrade_kraken_websocket.channels.subscribe import subscribe_to_channel
 
 
@@ -13,10 +15,19 @@ def to_ticker_payload(message: PrivateMessage | PublicMessage):
     return to_payload(message, TickerPayload)
 
 
-def subscribe_ticker(pair: str, messages: Observable[Dict | List]):
+def subscribe_ticker(
+    pair: str | Sequence[str],
+    messages: Observable[Dict | List],
+    *,
+    batched: bool = False,
+    stamped: bool = False,
+    registry: Optional[SubscriptionRegistry] = None,
+    watchdog: Optional[StalenessWatchdog] = None,
+):
+    """Ticker payloads of the pair(s). Options are those of `subscribe_to_channel`"""
     return compose(
-        subscribe_to_channel(messages, ChannelName.CHANNEL_TICKER, pair=pair),
-        operators.map(to_ticker_payload),
+        subscribe_to_channel(messages, ChannelName.CHANNEL_TICKER, pair=pair, batched=batched, registry=registry, watchdog=watchdog),
+        map_payloads(to_ticker_payload, batched, keyed=not isinstance(pair, str), stamped=stamped),
     )
 
 __all__ = [
@@ -1,4 +1,4 @@
-from typing import List, Dict, Any
+from typing import List, Dict, Any, Sequence, Optional
 
 from reactivex import Observable, compose, operators
 
@@ -6,7 +6,10 @@ from .models.message import PrivateMessage, PublicMessage
 
 from .channels import ChannelName
 from .models.trade import TradePayload
-from .payload import to_payload
+from .payload import map_payloads, to_payload
+from bittrade_kraken_websocket.messages.timestamps import stamped as _stamped
+from .registry import SubscriptionRegistry
+from bittrade_kraken_websocket.messages.watchdog import StalenessWatchdog
 from .subscribe import subscribe_to_channel
 
 
@@ -14,9 +17,42 @@ def to_trade_payload(message: PrivateMessage | PublicMessage):
     return [TradePayload(*payload) for payload in message]
 
 
-def subscribe_trade(pair: str, messages: Observable[Dict | List]):
+def to_trade_payload_batched(batch: List[PublicMessage]):
+    return [TradePayload(*payload) for message in batch for payload in message[1]]
+
+
+def to_stamped_trade_payload_batched(batch: List[PublicMessage]):
+    return [_stamped(TradePayload(*payload), message) for message in batch for payload in message[1]]  # type: ignore
+
+
+def subscribe_trade(
+    pair: str | Sequence[str],
+    messages: Observable[Dict | List],
+    *,
+    batched: bool = False,
+    stamped: bool = False,
+    registry: Optional[SubscriptionRegistry] = None,
+    watchdog: Optional[StalenessWatchdog] = None,
+):
+    """Lists of trades of the pair(s); with `batched`, the trades of a batch are emitted together in one list
+    (and with `stamped`, each of them is stamped). Options are those of `subscribe_to_channel`"""
+    if not isinstance(pair, str):
+        return compose(
+            subscribe_to_channel(messages, ChannelName.CHANNEL_TRADE, pair=pair, batched=batched, registry=registry, watchdog=watchdog),
+            map_payloads(lambda x: to_trade_payload(x[1]), batched, keyed=True, stamped=stamped),
+        )
+    if batched:
+        return compose(
+            subscribe_to_channel(messages, ChannelName.CHANNEL_TRADE, pair=pair, batched=True, registry=registry, watchdog=watchdog),
+            operators.map(to_stamped_trade_payload_batched if stamped else to_trade_payload_batched),
+        )
+    if stamped:
+        return compose(
+            subscribe_to_channel(messages, ChannelName.CHANNEL_TRADE, pair=pair, registry=registry, watchdog=watchdog),
+            map_payloads(lambda x: to_trade_payload(x[1]), stamped=True),
+        )
     return compose(
-        subscribe_to_channel(messages, ChannelName.CHANNEL_TRADE, pair=pair),
+        subscribe_to_channel(messages, ChannelName.CHANNEL_TRADE, pair=pair, registry=registry, watchdog=watchdog),
         operators.map(lambda x: x[1]),
         operators.map(to_trade_payload),
     )
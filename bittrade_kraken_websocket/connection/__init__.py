@@ -3,3 +3,9 @@ from .public import *
 from .reconnect import *
 from .enhanced_websocket import *
 from .status import *
+from .asyncio_connection import *
+from .batching import *
+from .handoff import *
+from .outbound import *
+from .capture import *
+from .decode_pool import *
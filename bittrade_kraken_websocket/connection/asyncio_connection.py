@@ -0,0 +1,201 @@
+import asyncio
+import time
+from logging import getLogger
+from typing import Any, AsyncIterator, Optional, Set, TypeVar
+
+from reactivex import ConnectableObservable, Notification, Observable, operators
+from reactivex.abc import ObserverBase, SchedulerBase
+from reactivex.disposable import Disposable
+from reactivex.notification import OnCompleted, OnError
+from reactivex.operators import publish
+from reactivex.scheduler.eventloop import AsyncIOScheduler
+
+from bittrade_kraken_websocket.connection.enhanced_websocket import EnhancedWebsocket
+from bittrade_kraken_websocket.connection.generic import (
+    WEBSOCKET_STATUS,
+    WS_PRIVATE_URL,
+    WS_PUBLIC_URL,
+    WebsocketBundle,
+    message_to_bundle,
+)
+from bittrade_kraken_websocket.connection.reconnect import retry_with_backoff
+from bittrade_kraken_websocket.connection.status import WEBSOCKET_CLOSED, WEBSOCKET_OPENED
+
+try:
+    import websockets
+except ImportError:  # pragma: no cover
+    websockets = None
+
+logger = getLogger(__name__)
+
+_T = TypeVar("_T")
+
+
+class AsyncioSocket:
+    """Gives an asyncio websocket the (synchronous) `send`/`close` interface that EnhancedWebsocket relies on.
+    Sends are scheduled as tasks on the event loop, in call order; they may be called from any thread (e.g. the outbound writer)"""
+
+    def __init__(self, protocol: Any, loop: asyncio.AbstractEventLoop):
+        self.protocol = protocol
+        self.loop = loop
+        self._tasks: Set[asyncio.Task] = set()
+
+    def _track(self, coroutine):
+        try:
+            running = asyncio.get_running_loop()
+        except RuntimeError:
+            running = None
+        if running is not self.loop:
+            self.loop.call_soon_threadsafe(self._create_task, coroutine)
+        else:
+            self._create_task(coroutine)
+
+    def _create_task(self, coroutine):
+        task = self.loop.create_task(coroutine)
+        self._tasks.add(task)
+        task.add_done_callback(self._tasks.discard)
+
+    def send(self, data: bytes | str):
+        self._track(self.protocol.send(data))
+
+    def close(self):
+        self._track(self.protocol.close())
+
+
+def raw_websocket_connection_async(
+    url: str, loop: Optional[asyncio.AbstractEventLoop] = None, heartbeats: bool = True, timestamps: bool = False
+) -> Observable[WebsocketBundle]:
+    """Same as `raw_websocket_connection` but reads frames on the asyncio event loop instead of a separate thread.
+    Must be subscribed to from the event loop's thread unless `loop` is given"""
+    if websockets is None:
+        raise ImportError(
+            "Package `websockets` is required for asyncio connections; install the `asyncio` extra"
+        )
+
+    def subscribe(observer: ObserverBase[WebsocketBundle], scheduler_: Optional[SchedulerBase] = None):
+        _loop = loop or asyncio.get_running_loop()
+
+        async def run():
+            enhanced: Optional[EnhancedWebsocket] = None
+            try:
+                async with websockets.connect(url, ping_interval=10, ping_timeout=5) as protocol:
+                    enhanced = EnhancedWebsocket(AsyncioSocket(protocol, _loop))  # type: ignore
+                    logger.info(f"[SOCKET][ASYNC] Websocket opened at {url}")
+                    observer.on_next((enhanced, WEBSOCKET_STATUS, WEBSOCKET_OPENED))
+                    async for message in protocol:
+                        stamp = (time.monotonic_ns(), time.time_ns()) if timestamps else None
+                        bundle = message_to_bundle(enhanced, message, heartbeats, stamp)
+                        if bundle is None:
+                            continue
+                        try:
+                            observer.on_next(bundle)
+                        except:
+                            logger.exception("[SOCKET][ASYNC] Error on socket message")
+                    logger.warning(
+                        "[SOCKET][ASYNC] Websocket closed | status: %s, close message: %s",
+                        protocol.close_code,
+                        protocol.close_reason,
+                    )
+                error = Exception("Socket closed")
+            except asyncio.CancelledError:
+                logger.info(f"[SOCKET][ASYNC] Releasing resources for {url}")
+                return
+            except Exception as exc:
+                logger.error("[SOCKET][ASYNC] Websocket errored %s", exc)
+                error = exc
+            finally:
+                if enhanced is not None:
+                    enhanced.stop_writer()
+            # There are errors that occur before we even get connected, so we should not emit a status message
+            if enhanced is not None:
+                observer.on_next((enhanced, WEBSOCKET_STATUS, WEBSOCKET_CLOSED))
+            observer.on_error(error)
+
+        task = _loop.create_task(run())
+
+        def disconnect():
+            if _loop.is_closed():
+                return
+            _loop.call_soon_threadsafe(task.cancel)
+
+        return Disposable(disconnect)
+
+    return Observable(subscribe)
+
+
+def websocket_connection_async(
+    private: bool = False, loop: Optional[asyncio.AbstractEventLoop] = None, heartbeats: bool = True, timestamps: bool = False
+) -> Observable[WebsocketBundle]:
+    url = WS_PRIVATE_URL if private else WS_PUBLIC_URL
+    return raw_websocket_connection_async(url, loop=loop, heartbeats=heartbeats, timestamps=timestamps)
+
+
+def _on_event_loop(source: Observable[_T], loop: Optional[asyncio.AbstractEventLoop]) -> Observable[_T]:
+    """Unless told otherwise, timers (backoff, stabilization) run on the event loop too"""
+
+    def subscribe(observer: ObserverBase[_T], scheduler: Optional[SchedulerBase] = None):
+        _scheduler = scheduler or AsyncIOScheduler(loop or asyncio.get_running_loop())
+        return source.subscribe(observer, scheduler=_scheduler)
+
+    return Observable(subscribe)
+
+
+def public_websocket_connection_async(
+    *, reconnect: bool = True, loop: Optional[asyncio.AbstractEventLoop] = None, heartbeats: bool = True, timestamps: bool = False
+) -> ConnectableObservable[WebsocketBundle]:
+    """asyncio counterpart of `public_websocket_connection`; call `connect` from within the event loop"""
+    connection = websocket_connection_async(loop=loop, heartbeats=heartbeats, timestamps=timestamps)
+    if reconnect:
+        connection = connection.pipe(retry_with_backoff())
+    return _on_event_loop(connection, loop).pipe(publish())
+
+
+def private_websocket_connection_async(
+    *, reconnect: bool = True, loop: Optional[asyncio.AbstractEventLoop] = None, heartbeats: bool = True, timestamps: bool = False
+) -> ConnectableObservable[WebsocketBundle]:
+    """asyncio counterpart of `private_websocket_connection`; you need to add your token to the EnhancedWebsocket"""
+    connection = websocket_connection_async(private=True, loop=loop, heartbeats=heartbeats, timestamps=timestamps)
+    if reconnect:
+        connection = connection.pipe(retry_with_backoff())
+    return _on_event_loop(connection, loop).pipe(publish())
+
+
+async def to_async_iterable(
+    source: Observable[_T], loop: Optional[asyncio.AbstractEventLoop] = None
+) -> AsyncIterator[_T]:
+    """Consume any observable (e.g. the result of `subscribe_ticker`) with `async for`.
+    Values emitted from the event loop's own thread are queued directly; values from other threads are handed over safely.
+    Errors are raised from the iterator; breaking out of the loop disposes of the subscription"""
+    _loop = loop or asyncio.get_running_loop()
+    queue: asyncio.Queue[Notification[_T]] = asyncio.Queue()
+
+    def put(notification: Notification[_T]):
+        try:
+            running = asyncio.get_running_loop()
+        except RuntimeError:
+            running = None
+        if running is _loop:
+            queue.put_nowait(notification)
+        else:
+            _loop.call_soon_threadsafe(queue.put_nowait, notification)
+
+    subscription = source.pipe(operators.materialize()).subscribe(on_next=put)
+    try:
+        while True:
+            notification = await queue.get()
+            if isinstance(notification, OnCompleted):
+                return
+            if isinstance(notification, OnError):
+                raise notification.exception  # type: ignore
+            yield notification.value  # type: ignore
+    finally:
+        subscription.dispose()
+
+
+__all__ = [
+    "private_websocket_connection_async",
+    "public_websocket_connection_async",
+    "raw_websocket_connection_async",
+    "to_async_iterable",
+    "websocket_connection_async",
+]
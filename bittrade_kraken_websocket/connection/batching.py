@@ -0,0 +1,78 @@
+import dataclasses
+from threading import RLock
+from typing import Any, Callable, List, Optional
+
+from reactivex.abc import DisposableBase, SchedulerBase
+
+
+@dataclasses.dataclass
+class Batching:
+    """Options for grouping channel messages received close together into a single emission
+
+    :param: count: A batch is emitted as soon as it holds that many messages
+    :param: window: Seconds after its first message that a batch gets emitted, however small it is
+    :param: scheduler: Scheduler running the window timer; defaults to a dedicated thread per connection
+    """
+
+    count: int = 100
+    window: float = 0.005
+    scheduler: Optional[SchedulerBase] = None
+
+
+class MessageBatcher:
+    """Accumulates messages and hands them over as lists, on count or when the time window elapses.
+
+    Everything that gets emitted must go through the batcher (see `emit_in_order`) so that
+    emissions are serialized and a status change never overtakes messages received before it
+    """
+
+    def __init__(self, batching: Batching, emit_batch: Callable[[List[Any]], None], scheduler: SchedulerBase):
+        self._count = batching.count
+        self._window = batching.window
+        self._emit_batch = emit_batch
+        self._scheduler = scheduler
+        self._lock = RLock()
+        self._batch: List[Any] = []
+        self._timer: Optional[DisposableBase] = None
+
+    def add(self, message: Any):
+        with self._lock:
+            self._batch.append(message)
+            if len(self._batch) >= self._count:
+                self._flush()
+            elif len(self._batch) == 1:
+                batch = self._batch
+                self._timer = self._scheduler.schedule_relative(
+                    self._window, lambda *_: self._flush_if_current(batch)
+                )
+
+    def emit_in_order(self, emit: Callable[[], None]):
+        """Flushes pending messages, then emits something else (e.g. a status bundle)"""
+        with self._lock:
+            self._flush()
+            emit()
+
+    def flush(self):
+        with self._lock:
+            self._flush()
+
+    def _flush_if_current(self, batch: List[Any]):
+        with self._lock:
+            # The batch the timer was started for may have been emitted already because it reached `count`
+            if batch is self._batch:
+                self._flush()
+
+    def _flush(self):
+        if self._timer is not None:
+            self._timer.dispose()
+            self._timer = None
+        if not self._batch:
+            return
+        batch, self._batch = self._batch, []
+        self._emit_batch(batch)
+
+
+__all__ = [
+    "Batching",
+    "MessageBatcher",
+]
@@ -0,0 +1,183 @@
+import glob
+import mmap
+import os
+import struct
+import time
+from logging import getLogger
+from threading import Lock
+from typing import BinaryIO, Iterator, List, Optional, Sequence, Tuple
+
+from reactivex import Observable
+from reactivex.abc import ObserverBase, SchedulerBase
+from reactivex.disposable import CompositeDisposable, Disposable
+from reactivex.scheduler import NewThreadScheduler
+
+from bittrade_kraken_websocket.connection.enhanced_websocket import EnhancedWebsocket
+from bittrade_kraken_websocket.connection.generic import WEBSOCKET_STATUS, WebsocketBundle, message_to_bundle
+from bittrade_kraken_websocket.connection.status import WEBSOCKET_CLOSED, WEBSOCKET_OPENED
+
+logger = getLogger(__name__)
+
+# Each file starts with the magic, followed by records: receive time (time.monotonic_ns), frame length, raw frame (utf-8)
+CAPTURE_MAGIC = b"KRKNCAP1"
+_RECORD_HEADER = struct.Struct("<QI")
+
+
+def capture_files(path: str) -> List[str]:
+    """Files written by a CaptureLog for `path`, oldest first"""
+    return sorted(glob.glob(glob.escape(path) + ".[0-9]*"))
+
+
+class CaptureLog:
+    """Append-only log of raw frames, rotated to a new file (`path.000000`, `path.000001`...) once a file reaches `max_bytes`.
+
+    Pass it as `capture` to `raw_websocket_connection` (or the public/private connections) to record every frame as received,
+    and replay it with `replay_capture`. The connection closes it when disposed; frames written after that (e.g. by the next
+    connection after a reconnection) go to a new file
+    """
+
+    def __init__(self, path: str, max_bytes: int = 256 * 1024 * 1024):
+        self.path = path
+        self.max_bytes = max_bytes
+        self._lock = Lock()
+        existing = capture_files(path)
+        self._index = int(existing[-1].rsplit(".", 1)[1]) + 1 if existing else 0
+        self._file: Optional[BinaryIO] = None
+        self._size = 0
+
+    @property
+    def current_file(self) -> str:
+        return f"{self.path}.{self._index:06d}"
+
+    def _open(self) -> BinaryIO:
+        file = open(self.current_file, "ab")
+        file.write(CAPTURE_MAGIC)
+        self._size = len(CAPTURE_MAGIC)
+        return file
+
+    def write(self, frame: bytes | str, received_ns: Optional[int] = None):
+        if received_ns is None:
+            received_ns = time.monotonic_ns()
+        data = frame.encode() if type(frame) == str else frame
+        with self._lock:
+            if self._file is None:
+                self._file = self._open()
+            elif self._size >= self.max_bytes:
+                self._file.close()
+                self._index += 1
+                self._file = self._open()
+            self._file.write(_RECORD_HEADER.pack(received_ns, len(data)))
+            self._file.write(data)  # type: ignore
+            self._size += _RECORD_HEADER.size + len(data)
+
+    def flush(self):
+        with self._lock:
+            if self._file is not None:
+                self._file.flush()
+
+    def close(self):
+        with self._lock:
+            if self._file is not None:
+                self._file.close()
+                self._file = None
+                # A file is never reopened: its magic would end up in the middle of it
+                self._index += 1
+
+
+def read_capture(path: str) -> Iterator[Tuple[int, bytes]]:
+    """(receive time in ns, raw frame) of each record of a capture file; the file is memory-mapped, not loaded"""
+    with open(path, "rb") as file:
+        if os.fstat(file.fileno()).st_size <= len(CAPTURE_MAGIC):
+            return
+        with mmap.mmap(file.fileno(), 0, access=mmap.ACCESS_READ) as mapped:
+            if mapped[: len(CAPTURE_MAGIC)] != CAPTURE_MAGIC:
+                raise ValueError(f"{path} is not a capture file")
+            offset, end = len(CAPTURE_MAGIC), len(mapped)
+            header_size = _RECORD_HEADER.size
+            while offset + header_size <= end:
+                received_ns, length = _RECORD_HEADER.unpack_from(mapped, offset)
+                offset += header_size
+                if offset + length > end:
+                    logger.warning("[CAPTURE] Truncated record at the end of %s", path)
+                    return
+                yield received_ns, mapped[offset : offset + length]
+                offset += length
+
+
+class _ReplaySocket:
+    """Replays don't go anywhere; what would be sent is only logged"""
+
+    def send(self, data: bytes | str):
+        logger.debug("[CAPTURE] Replay ignoring sent %s", data)
+
+    def close(self):
+        pass
+
+
+def replay_capture(
+    path: str | Sequence[str],
+    speed: Optional[float] = 1.0,
+    scheduler: Optional[SchedulerBase] = None,
+    heartbeats: bool = True,
+) -> Observable[WebsocketBundle]:
+    """Emits the frames of a capture as WebsocketBundles, between WEBSOCKET_OPENED and WEBSOCKET_CLOSED statuses, then completes.
+
+    :param: path: Capture path as given to CaptureLog (all its rotated files are replayed), a single file, or a list of files
+    :param: speed: 1.0 replays at the recorded pace, 2.0 twice as fast etc.; None replays as fast as possible
+    :param: scheduler: Runs the replay loop; defaults to a new thread
+    """
+    if isinstance(path, str):
+        paths = [path] if os.path.isfile(path) else capture_files(path)
+    else:
+        paths = list(path)
+
+    def subscribe(observer: ObserverBase[WebsocketBundle], scheduler_: Optional[SchedulerBase] = None):
+        stopped = False
+        enhanced = EnhancedWebsocket(_ReplaySocket())  # type: ignore
+
+        def run(*_):
+            observer.on_next((enhanced, WEBSOCKET_STATUS, WEBSOCKET_OPENED))
+            first_ns: Optional[int] = None
+            start = time.monotonic_ns()
+            try:
+                for file in paths:
+                    for received_ns, frame in read_capture(file):
+                        if stopped:
+                            return
+                        if speed is not None:
+                            if first_ns is None:
+                                first_ns = received_ns
+                            delay = (received_ns - first_ns) / speed - (time.monotonic_ns() - start)
+                            if delay > 0:
+                                time.sleep(delay / 1e9)
+                        bundle = message_to_bundle(enhanced, frame, heartbeats)
+                        if bundle is not None:
+                            observer.on_next(bundle)
+            except Exception as exc:
+                enhanced.stop_writer()
+                observer.on_error(exc)
+                return
+            # As when a live socket closes: what subscribers send from now on is dropped
+            enhanced.stop_writer()
+            observer.on_next((enhanced, WEBSOCKET_STATUS, WEBSOCKET_CLOSED))
+            observer.on_completed()
+
+        def stop():
+            nonlocal stopped
+            stopped = True
+            enhanced.stop_writer()
+
+        return CompositeDisposable(
+            Disposable(stop), (scheduler or NewThreadScheduler()).schedule(run)
+        )
+
+    return Observable(subscribe)
+
+
+__all__ = [
+    "CAPTURE_MAGIC",
+    "CaptureLog",
+    "capture_files",
+    "read_capture",
+    "replay_capture",
+]
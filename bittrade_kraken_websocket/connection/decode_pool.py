@@ -0,0 +1,288 @@
+import multiprocessing
+import threading
+import time
+from logging import getLogger
+from typing import Any, Callable, List, Optional
+
+import orjson
+
+from bittrade_kraken_websocket.connection.shared_ring import FrameRing, RingFull
+
+logger = getLogger(__name__)
+
+# Decoded channel message -> what gets emitted; None drops the message. Must be picklable (e.g. a module level function)
+Handler = Callable[[List[Any]], Any]
+
+# Written to every ring when the receiver changes; workers tag what they decode after it with the new epoch
+_EPOCH_MARK = b""
+
+# Seconds `start` waits for each worker to be reading its ring
+_START_TIMEOUT = 30.0
+
+
+def shard_key(frame: bytes | str) -> Optional[bytes | str]:
+    """The `,"channelName","pair"]` tail of a public channel frame, found without decoding it; None for any other frame
+    (events, heartbeats and private channel messages, which end with their sequence object)"""
+    if type(frame) == str:
+        if frame[:1] != "[" or frame[-2:] != '"]':
+            return None
+        end = frame.rfind(',"')
+        start = frame.rfind(',"', 0, end)
+    else:
+        if frame[:1] != b"[" or frame[-2:] != b'"]':
+            return None
+        end = frame.rfind(b',"')
+        start = frame.rfind(b',"', 0, end)
+    if start < 0:
+        return None
+    return frame[start:]
+
+
+def _work(
+    index: int,
+    epoch: int,
+    ring_name: str,
+    capacity: int,
+    results: Any,
+    ready: Any,
+    stop: Any,
+    handler: Optional[Handler],
+    batch_size: int,
+    idle_sleep: float,
+):
+    ring = FrameRing(capacity, name=ring_name)
+    loads = orjson.loads
+    ready.release()
+    try:
+        while True:
+            frames = ring.read_many(batch_size)
+            if not frames:
+                if stop.is_set():
+                    return
+                time.sleep(idle_sleep)
+                continue
+            decoded = []
+            for frame in frames:
+                if frame == _EPOCH_MARK:
+                    if decoded:
+                        results.put((index, epoch, decoded))
+                        decoded = []
+                    epoch += 1
+                    continue
+                try:
+                    message = loads(frame)
+                except orjson.JSONDecodeError as exc:
+                    logger.error("[DECODE POOL] Error on message decode %s from %s", exc, frame)
+                    continue
+                if handler is not None:
+                    try:
+                        message = handler(message)
+                    except Exception:
+                        logger.exception("[DECODE POOL] Handler failed on %s", frame)
+                        continue
+                    if message is None:
+                        continue
+                decoded.append(message)
+            if decoded:
+                results.put((index, epoch, decoded))
+    finally:
+        results.put(None)
+        ring.close()
+
+
+class DecodePool:
+    """Decodes public channel frames in worker processes, so that decoding (and `handler`) doesn't compete for the socket thread's core.
+
+    Frames are written to a shared memory ring per worker; all the frames of a (channel, pair) go to the same worker, which keeps them in order.
+    Messages from different pairs may be emitted in a different order than they were received.
+    Events and private channel messages are still decoded on the socket thread.
+
+    Decoded messages are sent back to this process pickled, which costs about as much as decoding them, on top of copying the frames out:
+    the pool is only worth it with a `handler` doing substantial per message work and returning something small (or None to drop the message),
+    and with a free core per worker besides the socket thread's. Otherwise decoding inline is faster; measure with `python -m benchmarks.decode_pool`.
+    Return messages in Kraken's framing (ending with the channel name and pair) to keep `ChannelRouter` and the `subscribe_*` helpers working.
+
+    A worker that doesn't make room in its ring within `submit_timeout` is given up on: what it hasn't returned yet is dropped
+    and its frames are decoded inline from then on. Results still in flight when the receiver changes (e.g. on reconnect) are dropped.
+
+    pool = DecodePool(4, handler=top_of_book)
+    connection = public_websocket_connection(decode_pool=pool)
+    ...
+    pool.close()
+
+    Workers are started with "spawn" by default: the main module must be importable (guard the entry point with `if __name__ == "__main__"`)
+    """
+
+    def __init__(
+        self,
+        workers: int = 2,
+        handler: Optional[Handler] = None,
+        *,
+        ring_size: int = 4 * 1024 * 1024,
+        batch_size: int = 256,
+        idle_sleep: float = 0.0002,
+        submit_timeout: float = 0.05,
+        start_method: str = "spawn",
+    ):
+        """
+        :param: ring_size: Bytes of frames each worker can lag behind before `submit` waits for it
+        :param: idle_sleep: Seconds an idle worker waits before looking at its ring again
+        :param: submit_timeout: Seconds `submit` waits for a worker to make room before giving up on it
+        """
+        if workers < 1:
+            raise ValueError("A decode pool needs at least one worker")
+        self.workers = workers
+        self.handler = handler
+        self.ring_size = ring_size
+        self.batch_size = batch_size
+        self.idle_sleep = idle_sleep
+        self.submit_timeout = submit_timeout
+        self._context = multiprocessing.get_context(start_method)
+        self._lock = threading.Lock()
+        # Held while writing to the rings, so that `close` doesn't release them under a `submit`
+        self._writing = threading.Lock()
+        self._rings: List[FrameRing] = []
+        # Epoch whose results are emitted, per worker; None once given up on
+        self._accepting: List[Optional[int]] = []
+        self._epoch = 0
+        self._processes: List[Any] = []
+        self._receiver_thread: Optional[threading.Thread] = None
+        self._stop: Any = None
+        self._receiver: Optional[Callable[[Any], None]] = None
+
+    @property
+    def receiver(self) -> Optional[Callable[[Any], None]]:
+        """Called, on the pool's receiving thread, with every decoded (or handled) message.
+        Setting it drops the results of frames submitted before"""
+        return self._receiver
+
+    @receiver.setter
+    def receiver(self, receiver: Optional[Callable[[Any], None]]):
+        with self._writing:
+            self._epoch += 1
+            self._receiver = receiver
+            for index, ring in enumerate(self._rings):
+                if self._accepting[index] is None:
+                    continue
+                try:
+                    ring.write(_EPOCH_MARK, self.submit_timeout)
+                except RingFull:
+                    self._give_up(index)
+                    continue
+                self._accepting[index] = self._epoch
+
+    @property
+    def started(self) -> bool:
+        return bool(self._processes)
+
+    def start(self):
+        """Starts the workers and waits for them to be ready; does nothing when they are already started"""
+        with self._lock:
+            if self._processes:
+                return
+            self._stop = self._context.Event()
+            results = self._context.Queue()
+            ready = self._context.Semaphore(0)
+            rings = [FrameRing(self.ring_size) for _ in range(self.workers)]
+            self._processes = [
+                self._context.Process(
+                    target=_work,
+                    args=(i, self._epoch, ring.name, ring.capacity, results, ready, self._stop, self.handler, self.batch_size, self.idle_sleep),
+                    name=f"kraken-decode-{i}",
+                    daemon=True,
+                )
+                for i, ring in enumerate(rings)
+            ]
+            for process in self._processes:
+                process.start()
+            # `submit_timeout` is meant for workers falling behind, not for workers still being spawned
+            for _ in self._processes:
+                if not ready.acquire(timeout=_START_TIMEOUT):
+                    logger.warning("[DECODE POOL] A worker didn't start within %ss", _START_TIMEOUT)
+            with self._writing:
+                self._accepting = [self._epoch] * self.workers
+                self._rings = rings
+            self._receiver_thread = threading.Thread(
+                target=self._receive, args=(results, self.workers), name="kraken-decode-receiver", daemon=True
+            )
+            self._receiver_thread.start()
+            logger.info("[DECODE POOL] Started %s workers", self.workers)
+
+    def _receive(self, results: Any, workers: int):
+        while workers:
+            result = results.get()
+            if result is None:
+                workers -= 1
+                continue
+            index, epoch, decoded = result
+            receiver = self._receiver
+            if receiver is None or epoch != self._accepting[index]:
+                continue
+            for message in decoded:
+                try:
+                    receiver(message)
+                except Exception:
+                    logger.exception("[DECODE POOL] Error on decoded message")
+
+    def submit(self, frame: bytes | str) -> bool:
+        """Hands a public channel frame to its worker, waiting up to `submit_timeout` for room when that worker is `ring_size` behind.
+        Returns False, without doing anything, for any other frame, when the pool is not started (or closed),
+        and when the worker was given up on: the caller must then decode the frame itself"""
+        key = shard_key(frame)
+        if key is None:
+            return False
+        with self._writing:
+            if not self._rings:
+                return False
+            index = hash(key) % len(self._rings)
+            if self._accepting[index] is None:
+                return False
+            try:
+                self._rings[index].write(frame.encode() if type(frame) == str else frame, self.submit_timeout)  # type: ignore
+            except RingFull:
+                self._give_up(index)
+                return False
+        return True
+
+    def _give_up(self, index: int):
+        alive = self._processes[index].is_alive()
+        logger.error(
+            "[DECODE POOL] Worker %s made no room in %ss (alive: %s); dropping what it hasn't returned and decoding its frames inline",
+            index,
+            self.submit_timeout,
+            alive,
+        )
+        self._accepting[index] = None
+
+    def close(self, timeout: float = 5.0):
+        """Stops the workers once they have decoded what was submitted, then releases the shared memory"""
+        with self._lock:
+            if not self._processes:
+                return
+            with self._writing:
+                rings, self._rings = self._rings, []
+            self._stop.set()
+            for process in self._processes:
+                process.join(timeout)
+                if process.is_alive():
+                    process.terminate()
+            if self._receiver_thread is not None:
+                self._receiver_thread.join(timeout)
+            for ring in rings:
+                ring.close()
+            self._processes, self._receiver_thread = [], None
+            logger.info("[DECODE POOL] Stopped")
+
+    def __enter__(self) -> "DecodePool":
+        self.start()
+        return self
+
+    def __exit__(self, *args: Any):
+        self.close()
+
+
+__all__ = [
+    "DecodePool",
+    "Handler",
+    "shard_key",
+]
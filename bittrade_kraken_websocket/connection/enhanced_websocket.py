@@ -1,9 +1,12 @@
 from logging import getLogger
-from typing import Any, Dict
+from threading import Lock
+from typing import Any, Dict, Optional
 
 import orjson
 import websocket
 
+from bittrade_kraken_websocket.connection.outbound import PRIORITY_OTHER, OutboundWriter, TokenBucket, priority_of
+
 logger = getLogger(__name__)
 
 
@@ -14,21 +17,81 @@ class EnhancedWebsocket():
     def __init__(self, socket: websocket.WebSocketApp, *, token: str=''):
         self.socket = socket
         self.token = token
+        self._rate_limiter: Optional[TokenBucket] = None
+        self._writer: Optional[OutboundWriter] = None
+        self._writer_stopped = False
+        self._writer_lock = Lock()
+
+    @property
+    def rate_limiter(self) -> Optional[TokenBucket]:
+        """Token bucket throttling trading events; may be replaced at any time, also once frames were sent"""
+        return self._rate_limiter
+
+    @rate_limiter.setter
+    def rate_limiter(self, bucket: Optional[TokenBucket]):
+        with self._writer_lock:
+            self._rate_limiter = bucket
+            if self._writer is not None:
+                self._writer.use_bucket(bucket)
 
     @property
     def is_private(self) -> bool:
         return bool(self.token)
 
-    def send_json(self, payload: Dict[str, Any]) -> None:
+    def _encode(self, payload: Dict[str, Any]) -> bytes:
         if self.is_private:
             # if subscription, token goes into that, otherwise goes to top level
             put_token_into = payload.get('subscription', payload)
             put_token_into['token'] = self.token
-        as_bytes = orjson.dumps(payload)
+        return orjson.dumps(payload)
+
+    def send_json(self, payload: Dict[str, Any]) -> None:
+        """Sends right away, on the calling thread; prefer `send`"""
+        as_bytes = self._encode(payload)
         logger.debug('[SOCKET] Sending json to socket: %s', as_bytes)
         return self.socket.send(as_bytes)
 
+    def send(self, payload: Dict[str, Any]) -> None:
+        """Queues the payload for the outbound writer thread and returns immediately.
+        Cancels go out before adds/edits, which go out before subscriptions, and trading events are throttled by `rate_limiter`.
+        Once the writer is stopped (the socket closed), the payload is dropped"""
+        priority = priority_of(payload)
+        self.send_bytes(self._encode(payload), priority)
+
+    def send_bytes(self, data: bytes, priority: int = PRIORITY_OTHER) -> None:
+        """Same as `send` for a frame that's already encoded, token included (see `events.templates`)"""
+        writer = self._get_writer()
+        if writer is None:
+            logger.warning("[SOCKET][OUTBOUND] Writer stopped, dropping %s", data)
+            return
+        # A writer stopped meanwhile drops the frame itself
+        writer.put(data, priority)
+
+    def _get_writer(self) -> Optional[OutboundWriter]:
+        writer = self._writer
+        if writer is not None:
+            return writer
+        with self._writer_lock:
+            if self._writer is None and not self._writer_stopped:
+                self._writer = OutboundWriter(self.socket.send, self.rate_limiter)
+            return self._writer
+
+    @property
+    def writer(self) -> OutboundWriter:
+        """Started on first use; raises RuntimeError when the writer was stopped before ever being used"""
+        writer = self._get_writer()
+        if writer is None:
+            raise RuntimeError("The outbound writer of this socket is stopped")
+        return writer
+
+    def stop_writer(self):
+        """Stops the writer for good: frames still queued and those sent later are dropped"""
+        with self._writer_lock:
+            self._writer_stopped = True
+            if self._writer is not None:
+                self._writer.close()
+
 
 __all__ = [
     "EnhancedWebsocket"
-]
\ No newline at end of file
+]
@@ -1,22 +1,32 @@
 import errno
+import time
+from contextlib import nullcontext
 from logging import getLogger
-from typing import Any, Tuple, Dict, Literal, Union, List, Optional
+from typing import TYPE_CHECKING, Any, Tuple, Dict, Literal, Union, List, Optional
 from os import getenv
 
 import orjson
 import reactivex.disposable
 from reactivex import Observable
 from reactivex.abc import SchedulerBase, ObserverBase
-from reactivex.scheduler import ThreadPoolScheduler
+from reactivex.scheduler import EventLoopScheduler, ThreadPoolScheduler
+from threading import Lock
 from websocket import WebSocketConnectionClosedException, WebSocketApp
 
+from bittrade_kraken_websocket.connection.batching import Batching, MessageBatcher
 from bittrade_kraken_websocket.connection.enhanced_websocket import EnhancedWebsocket
 from bittrade_kraken_websocket.connection.status import (
     WEBSOCKET_OPENED,
     WEBSOCKET_CLOSED,
     Status,
 )
-from ..messages.heartbeat import HEARTBEAT
+from ..messages.classify import FRAME_HEARTBEAT, FRAME_STATUS, classify_frame
+from ..messages.timestamps import StampedMessage
+from ..metrics import registry
+
+if TYPE_CHECKING:
+    from bittrade_kraken_websocket.connection.capture import CaptureLog
+    from bittrade_kraken_websocket.connection.decode_pool import DecodePool
 
 logger = getLogger(__name__)
 
@@ -24,31 +34,81 @@ logger = getLogger(__name__)
 WEBSOCKET_STATUS = "WEBSOCKET_STATUS"
 WEBSOCKET_HEARTBEAT = "WEBSOCKET_HEARTBEAT"
 WEBSOCKET_MESSAGE = "WEBSOCKET_MESSAGE"
-MessageTypes = Literal["WEBSOCKET_STATUS", "WEBSOCKET_HEARTBEAT", "WEBSOCKET_MESSAGE"]
+WEBSOCKET_MESSAGE_BATCH = "WEBSOCKET_MESSAGE_BATCH"
+MessageTypes = Literal["WEBSOCKET_STATUS", "WEBSOCKET_HEARTBEAT", "WEBSOCKET_MESSAGE", "WEBSOCKET_MESSAGE_BATCH"]
 
 WebsocketBundle = Tuple[EnhancedWebsocket, MessageTypes, Union[Status, Dict[str, Any], List[Any]]]
 
 WS_PUBLIC_URL = getenv("WS_PUBLIC_URL", "wss://ws.kraken.com")
 WS_PRIVATE_URL = getenv("WS_PRIVATE_URL", "wss://ws-auth.kraken.com")
 
-def websocket_connection(private: bool = False, scheduler: Optional[SchedulerBase] = None) -> Observable[WebsocketBundle]:
+def message_to_bundle(
+    enhanced: EnhancedWebsocket, message: bytes | str, heartbeats: bool = True, stamp: Optional[Tuple[int, int]] = None
+) -> Optional[WebsocketBundle]:
+    """Categorizes and decodes a raw frame; returns None when the frame can't be decoded or is a heartbeat that's not wanted.
+    Heartbeats are recognized from the raw frame and never decoded.
+    With `stamp` (monotonic ns, wall clock ns), channel messages are decoded as StampedMessage"""
+    kind = classify_frame(message)
+    if kind == FRAME_HEARTBEAT:
+        if not heartbeats:
+            return None
+        return enhanced, WEBSOCKET_HEARTBEAT, {"event": "heartbeat"}
+    try:
+        pass_message = orjson.loads(message)
+    except orjson.JSONDecodeError as exc:
+        logger.error("[SOCKET][RAW] Error on message decode %s from %s", exc, message)
+        registry.increment("decode_errors_total")
+        return None
+    logger.debug("[SOCKET][RAW] %s", message)
+    if (
+        kind == FRAME_STATUS
+        and type(pass_message) == dict
+        and pass_message.get("event") == "systemStatus"
+    ):
+        return enhanced, WEBSOCKET_STATUS, pass_message["status"]
+    if type(pass_message) == list and len(pass_message) > 2:
+        registry.count_message(pass_message, len(message))
+        if stamp is not None:
+            pass_message = StampedMessage(pass_message, *stamp)
+    return enhanced, WEBSOCKET_MESSAGE, pass_message
+
+
+def websocket_connection(private: bool = False, scheduler: Optional[SchedulerBase] = None, heartbeats: bool = True, batching: Optional[Batching] = None, capture: Optional["CaptureLog"] = None, timestamps: bool = False, decode_pool: Optional["DecodePool"] = None) -> Observable[WebsocketBundle]:
     url = WS_PRIVATE_URL if private else WS_PUBLIC_URL
-    return raw_websocket_connection(url, scheduler=scheduler)
-
-
-def raw_websocket_connection(url: str, scheduler: Optional[SchedulerBase] = None) -> Observable[WebsocketBundle]:
+    return raw_websocket_connection(url, scheduler=scheduler, heartbeats=heartbeats, batching=batching, capture=capture, timestamps=timestamps, decode_pool=decode_pool)
+
+
+def raw_websocket_connection(url: str, scheduler: Optional[SchedulerBase] = None, heartbeats: bool = True, batching: Optional[Batching] = None, capture: Optional["CaptureLog"] = None, timestamps: bool = False, decode_pool: Optional["DecodePool"] = None) -> Observable[WebsocketBundle]:
+    """
+    :param: heartbeats: When False, heartbeats are dropped as soon as they are received and never emitted as WEBSOCKET_HEARTBEAT bundles
+    :param: batching: When set, channel messages are emitted in lists as WEBSOCKET_MESSAGE_BATCH bundles instead of one WEBSOCKET_MESSAGE bundle each.
+            Events (e.g. subscriptionStatus, addOrderStatus), statuses and heartbeats are still emitted on their own, after any pending batch
+    :param: capture: When set, every raw frame is written to it with its receive time, before anything else; see `replay_capture`.
+            It is closed when the connection is disposed
+    :param: timestamps: When True, channel messages are StampedMessage lists carrying their receive time; see `stamped=True` on the `subscribe_*` helpers
+    :param: decode_pool: When set, public channel frames are decoded by its worker processes (it is started if needed but not closed);
+            they are emitted from the pool's receiving thread, in order per (channel, pair), and are neither stamped nor counted in metrics
+    """
     def subscribe(observer: ObserverBase[WebsocketBundle], scheduler_: Optional[SchedulerBase] = None):
         _scheduler = scheduler or scheduler_ or ThreadPoolScheduler()
         connection: WebSocketApp | None = None
         was_connected = False
+        batcher: MessageBatcher | None = None
+        timer_scheduler: EventLoopScheduler | None = None
+        # Decoded messages come back from the pool on another thread than the socket's
+        emitting = Lock() if decode_pool is not None else nullcontext()
         def action(*args: Any):
-            nonlocal connection, was_connected
+            nonlocal connection, was_connected, batcher, timer_scheduler
             def on_error(_ws: WebSocketApp, error: Exception):
                 logger.error("[SOCKET][RAW] Websocket errored %s", error)
+                enhanced.stop_writer()
+                if batcher is not None:
+                    batcher.flush()
                 # There are errors that occur before we even get connected, so we should not emit a status message
-                if was_connected:
-                    observer.on_next((enhanced, WEBSOCKET_STATUS, WEBSOCKET_CLOSED))
-                observer.on_error(error)
+                with emitting:
+                    if was_connected:
+                        observer.on_next((enhanced, WEBSOCKET_STATUS, WEBSOCKET_CLOSED))
+                    observer.on_error(error)
 
             def on_close(_ws: WebSocketApp, close_status_code: int, close_msg: str):
                 logger.warning(
@@ -56,34 +116,42 @@ def raw_websocket_connection(url: str, scheduler: Optional[SchedulerBase] = None
                     close_status_code,
                     close_msg,
                 )
-                observer.on_next((enhanced, WEBSOCKET_STATUS, WEBSOCKET_CLOSED))
-                observer.on_error(Exception("Socket closed"))
+                enhanced.stop_writer()
+                if batcher is not None:
+                    batcher.flush()
+                with emitting:
+                    observer.on_next((enhanced, WEBSOCKET_STATUS, WEBSOCKET_CLOSED))
+                    observer.on_error(Exception("Socket closed"))
 
             def on_open(_ws: WebSocketApp):
                 nonlocal was_connected
                 was_connected = True
                 logger.info(f"[SOCKET][RAW] Websocket opened at {url}")
-                observer.on_next((enhanced, WEBSOCKET_STATUS, WEBSOCKET_OPENED))
+                with emitting:
+                    observer.on_next((enhanced, WEBSOCKET_STATUS, WEBSOCKET_OPENED))
 
             def on_message(_ws: WebSocketApp, message: bytes | str):
-                try:
-                    pass_message = orjson.loads(message)
-                except orjson.JSONDecodeError as exc:
-                    logger.error("[SOCKET][RAW] Error on message decode %s from %s", exc, message)
+                stamp = None
+                if timestamps:
+                    stamp = time.monotonic_ns(), time.time_ns()
+                if capture is not None:
+                    capture.write(message, stamp and stamp[0])
+                if decode_pool is not None and decode_pool.submit(message):
+                    return
+                bundle = message_to_bundle(enhanced, message, heartbeats, stamp)
+                if bundle is None:
                     return
-                category = WEBSOCKET_MESSAGE
-                if message == HEARTBEAT:
-                    category = WEBSOCKET_HEARTBEAT
-                else:
-                    logger.debug("[SOCKET][RAW] %s", message)
-                    if (
-                        type(pass_message) == dict
-                        and pass_message.get("event") == "systemStatus"
-                    ):
-                        category = WEBSOCKET_STATUS
-                        pass_message = pass_message["status"]
+                emit(bundle)
+
+            def emit(bundle: WebsocketBundle):
                 try:
-                    observer.on_next((enhanced, category, pass_message))
+                    with emitting:
+                        if batcher is None:
+                            observer.on_next(bundle)
+                        elif bundle[1] == WEBSOCKET_MESSAGE and isinstance(bundle[2], list):
+                            batcher.add(bundle[2])
+                        else:
+                            batcher.emit_in_order(lambda: observer.on_next(bundle))
                 except:
                     logger.exception("[SOCKET] Error on socket message")
 
@@ -95,6 +163,17 @@ def raw_websocket_connection(url: str, scheduler: Optional[SchedulerBase] = None
                 on_message=on_message,
             )
             enhanced = EnhancedWebsocket(connection)
+            if batching is not None:
+                if batching.scheduler is None:
+                    timer_scheduler = EventLoopScheduler()
+                batcher = MessageBatcher(
+                    batching,
+                    lambda batch: observer.on_next((enhanced, WEBSOCKET_MESSAGE_BATCH, batch)),
+                    batching.scheduler or timer_scheduler,  # type: ignore
+                )
+            if decode_pool is not None:
+                decode_pool.start()
+                decode_pool.receiver = lambda message: emit((enhanced, WEBSOCKET_MESSAGE, message))
             def run_forever(*args: Any):
                 assert connection is not None
                 connection.run_forever(ping_interval=10, ping_timeout=5)
@@ -102,6 +181,12 @@ def raw_websocket_connection(url: str, scheduler: Optional[SchedulerBase] = None
 
         def disconnect():
             logger.info(f"[SOCKET] Releasing resources for {url}")
+            if timer_scheduler is not None:
+                timer_scheduler.dispose()
+            if decode_pool is not None:
+                decode_pool.receiver = None
+            if capture is not None:
+                capture.close()
             if connection is None:
                 logger.info(f"[SOCKET] Connection not found when trying to disconnect {url}")
                 return
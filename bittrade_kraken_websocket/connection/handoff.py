@@ -0,0 +1,249 @@
+from collections import deque
+from logging import getLogger
+from threading import Condition
+from typing import Any, Callable, Deque, Dict, FrozenSet, Generic, Iterator, List, Literal, Optional, Tuple, TypeVar
+
+from reactivex import Observable
+from reactivex.abc import ObserverBase, SchedulerBase
+from reactivex.disposable import CompositeDisposable, Disposable
+from reactivex.scheduler import NewThreadScheduler
+
+from bittrade_kraken_websocket.connection.generic import WEBSOCKET_MESSAGE
+from bittrade_kraken_websocket.messages.filters.kind import public_channel_key
+
+logger = getLogger(__name__)
+
+_T = TypeVar("_T")
+
+HANDOFF_BLOCK = "block"
+HANDOFF_DROP_OLDEST = "drop_oldest"
+HANDOFF_CONFLATE = "conflate"
+HandoffPolicy = Literal["block", "drop_oldest", "conflate"]
+
+_NEXT, _ERROR, _COMPLETED = "N", "E", "C"
+
+# Channels whose every message carries the whole state of the pair, so that only the latest one matters
+LATEST_STATE_CHANNELS = ("ticker", "spread")
+_LATEST_STATE_CHANNELS = frozenset(LATEST_STATE_CHANNELS)
+
+
+def _channel_key(bundle: Any, channels: FrozenSet[str]) -> Optional[Tuple[str, str]]:
+    if bundle[1] != WEBSOCKET_MESSAGE:
+        return None
+    key = public_channel_key(bundle[2])
+    if key is None or (key[0] not in channels and key[0].split("-", 1)[0] not in channels):
+        return None
+    return key
+
+
+def bundle_channel_key(bundle: Any) -> Optional[Tuple[str, str]]:
+    """(channel name, pair) of a bundle holding a ticker or spread message; other bundles are never dropped nor conflated"""
+    return _channel_key(bundle, _LATEST_STATE_CHANNELS)
+
+
+def handoff_key(*channels: str) -> Callable[[Any], Optional[Tuple[str, str]]]:
+    """Key for a HandoffQueue letting messages of the given public channels be dropped or conflated; "book" stands for every depth, "ohlc" for every interval.
+
+    Only list channels whose messages can be lost: book messages are deltas, and dropping or conflating one corrupts the book
+    (until a checksum mismatch resubscribes); a dropped trade or OHLC update is gone for good"""
+    allowed = frozenset(channels)
+    return lambda bundle: _channel_key(bundle, allowed)
+
+
+class HandoffQueue(Generic[_T]):
+    """Bounded queue between the thread producing values (typically the websocket thread) and a consumer thread.
+
+    When full, depending on `policy`:
+    - block: the producer waits for the consumer
+    - drop_oldest: the oldest droppable value is discarded
+    - conflate: a value replaces the queued value with the same key, if any, keeping its place in the queue;
+      otherwise the oldest droppable value is discarded
+    Values for which `key` returns None are never dropped nor conflated, even if that means going over `maxsize`.
+    The default key only lets ticker and spread messages go; use `handoff_key` to allow other channels, knowing what it costs.
+
+    `depth`, `dropped` and `conflated` can be read at any time for monitoring.
+    """
+
+    def __init__(
+        self,
+        maxsize: int = 10_000,
+        policy: HandoffPolicy = HANDOFF_BLOCK,
+        key: Callable[[_T], Optional[Any]] = bundle_channel_key,
+    ):
+        if policy not in (HANDOFF_BLOCK, HANDOFF_DROP_OLDEST, HANDOFF_CONFLATE):
+            raise ValueError(f"Unknown handoff policy {policy}")
+        self.maxsize = maxsize
+        self.policy = policy
+        self._key = key
+        self._condition = Condition()
+        # Entries are [kind, key, value] lists so that conflation can replace a value in place
+        self._entries: Deque[List[Any]] = deque()
+        self._pending: Dict[Any, List[Any]] = {}
+        self._closed = False
+        self.dropped = 0
+        self.conflated = 0
+        self.high_watermark = 0
+
+    @property
+    def depth(self) -> int:
+        return len(self._entries)
+
+    def put(self, value: _T):
+        key = self._key(value) if self.policy != HANDOFF_BLOCK else None
+        with self._condition:
+            if self.policy == HANDOFF_CONFLATE and key is not None:
+                entry = self._pending.get(key)
+                if entry is not None:
+                    entry[2] = value
+                    self.conflated += 1
+                    return
+            if len(self._entries) >= self.maxsize:
+                if self.policy == HANDOFF_BLOCK:
+                    while len(self._entries) >= self.maxsize and not self._closed:
+                        self._condition.wait()
+                elif key is not None:
+                    self._drop_oldest()
+            self._append([_NEXT, key, value])
+
+    def put_error(self, error: Exception):
+        with self._condition:
+            self._append([_ERROR, None, error])
+
+    def put_completed(self):
+        with self._condition:
+            self._append([_COMPLETED, None, None])
+
+    def close(self):
+        """Wakes up producer and consumer for good; the consumer stops without draining"""
+        with self._condition:
+            self._closed = True
+            self._condition.notify_all()
+
+    def _reopen(self):
+        with self._condition:
+            self._entries.clear()
+            self._pending.clear()
+            self._closed = False
+
+    def _append(self, entry: List[Any]):
+        if self._closed:
+            return
+        self._entries.append(entry)
+        if self.policy == HANDOFF_CONFLATE and entry[1] is not None:
+            self._pending[entry[1]] = entry
+        if len(self._entries) > self.high_watermark:
+            self.high_watermark = len(self._entries)
+        self._condition.notify_all()
+
+    def _drop_oldest(self):
+        for entry in self._entries:
+            if entry[1] is not None:
+                self._entries.remove(entry)
+                if self._pending.get(entry[1]) is entry:
+                    del self._pending[entry[1]]
+                self.dropped += 1
+                return
+
+    def _get(self) -> Optional[List[Any]]:
+        """Next entry, waiting for one; None once closed"""
+        with self._condition:
+            while not self._entries and not self._closed:
+                self._condition.wait()
+            if self._closed:
+                return None
+            entry = self._entries.popleft()
+            if entry[1] is not None and self._pending.get(entry[1]) is entry:
+                del self._pending[entry[1]]
+            self._condition.notify_all()
+            return entry
+
+    def drain_to(self, observer: ObserverBase[_T]):
+        """Consumer loop; returns when closed or after forwarding an error/completion"""
+        while True:
+            entry = self._get()
+            if entry is None:
+                return
+            kind, _, value = entry
+            if kind == _NEXT:
+                try:
+                    observer.on_next(value)
+                except:
+                    logger.exception("[HANDOFF] Error in consumer")
+            elif kind == _ERROR:
+                observer.on_error(value)
+                return
+            else:
+                observer.on_completed()
+                return
+
+    def __iter__(self) -> Iterator[_T]:
+        while True:
+            entry = self._get()
+            if entry is None:
+                return
+            kind, _, value = entry
+            if kind == _ERROR:
+                raise value
+            if kind == _COMPLETED:
+                return
+            yield value
+
+
+def _feed(source: Observable[_T], queue: HandoffQueue[_T], scheduler: Optional[SchedulerBase] = None):
+    return source.subscribe(
+        on_next=queue.put,
+        on_error=queue.put_error,
+        on_completed=queue.put_completed,
+        scheduler=scheduler,
+    )
+
+
+def handoff(
+    queue: Optional[HandoffQueue[_T]] = None, scheduler: Optional[SchedulerBase] = None
+) -> Callable[[Observable[_T]], Observable[_T]]:
+    """Puts a HandoffQueue between the source and the observer, which then gets values on its own thread
+    (a new thread per subscription unless a scheduler is given; it must not run the drain loop inline) and can't slow down the source's thread.
+    A given queue is meant for one subscription at a time (typically the connection's `publish`); it is emptied on subscribe"""
+
+    def _handoff(source: Observable[_T]) -> Observable[_T]:
+        def subscribe(observer: ObserverBase[_T], scheduler_: Optional[SchedulerBase] = None):
+            _queue = queue or HandoffQueue()
+            _queue._reopen()
+            _scheduler = scheduler or NewThreadScheduler()
+            return CompositeDisposable(
+                Disposable(_queue.close),
+                _scheduler.schedule(lambda *_: _queue.drain_to(observer)),
+                _feed(source, _queue, scheduler_),
+            )
+
+        return Observable(subscribe)
+
+    return _handoff
+
+
+def to_blocking_iterator(source: Observable[_T], queue: Optional[HandoffQueue[_T]] = None) -> Iterator[_T]:
+    """Pull values from an observable in a plain for loop; the source keeps running on its own thread,
+    values wait in the queue (subject to its policy) until pulled. Leaving the loop disposes of the subscription.
+    A given queue is emptied first, and can be reused once the previous loop is left"""
+    _queue = queue or HandoffQueue()
+    _queue._reopen()
+    subscription = _feed(source, _queue)
+    try:
+        yield from _queue
+    finally:
+        _queue.close()
+        subscription.dispose()
+
+
+__all__ = [
+    "HANDOFF_BLOCK",
+    "HANDOFF_CONFLATE",
+    "HANDOFF_DROP_OLDEST",
+    "HandoffPolicy",
+    "HandoffQueue",
+    "LATEST_STATE_CHANNELS",
+    "bundle_channel_key",
+    "handoff",
+    "handoff_key",
+    "to_blocking_iterator",
+]
@@ -0,0 +1,172 @@
+import dataclasses
+import heapq
+import itertools
+import threading
+import time
+from logging import getLogger
+from typing import Any, Callable, Dict, List, Optional, Tuple
+
+logger = getLogger(__name__)
+
+# Lower goes first
+PRIORITY_CANCEL = 0
+PRIORITY_ORDER = 1
+PRIORITY_OTHER = 2
+
+_EVENT_PRIORITIES = {
+    "cancelOrder": PRIORITY_CANCEL,
+    "cancelAll": PRIORITY_CANCEL,
+    "cancelAllOrdersAfter": PRIORITY_CANCEL,
+    "addOrder": PRIORITY_ORDER,
+    "editOrder": PRIORITY_ORDER,
+}
+
+
+def priority_of(payload: Dict[str, Any]) -> int:
+    """Cancels before adds/edits before anything else (subscriptions, pings...)"""
+    event = payload.get("event")
+    return _EVENT_PRIORITIES.get(getattr(event, "value", event), PRIORITY_OTHER)  # type: ignore
+
+
+def cost_of(priority: int) -> float:
+    """Only trading events count towards Kraken's rate counter"""
+    return 1.0 if priority <= PRIORITY_ORDER else 0.0
+
+
+@dataclasses.dataclass(frozen=True)
+class RateLimit:
+    """Kraken's trading rate counter: it may go up to `capacity` and decays by `decay` per second.
+    Presets match the Starter/Intermediate/Pro verification tiers"""
+
+    capacity: float
+    decay: float
+
+
+KRAKEN_STARTER = RateLimit(60, 1.0)
+KRAKEN_INTERMEDIATE = RateLimit(125, 2.34)
+KRAKEN_PRO = RateLimit(180, 3.75)
+
+
+class TokenBucket:
+    """Token bucket mirroring a RateLimit; thread safe.
+    Share one instance between connections (assign it to `EnhancedWebsocket.rate_limiter`) so that reconnecting doesn't reset it"""
+
+    def __init__(self, limit: RateLimit = KRAKEN_STARTER, clock: Callable[[], float] = time.monotonic):
+        self.limit = limit
+        self._clock = clock
+        self._tokens = float(limit.capacity)
+        self._updated = clock()
+        self._lock = threading.Lock()
+
+    def _refill(self):
+        now = self._clock()
+        self._tokens = min(self.limit.capacity, self._tokens + (now - self._updated) * self.limit.decay)
+        self._updated = now
+
+    def wait_time(self, cost: float) -> float:
+        """Seconds until `cost` tokens are available, 0 if they are now"""
+        with self._lock:
+            self._refill()
+            if self._tokens >= cost:
+                return 0.0
+            return (cost - self._tokens) / self.limit.decay
+
+    def take(self, cost: float):
+        with self._lock:
+            self._refill()
+            self._tokens -= cost
+
+    @property
+    def available(self) -> float:
+        with self._lock:
+            self._refill()
+            return self._tokens
+
+
+class OutboundWriter:
+    """Sends queued frames from a dedicated thread, highest priority first (FIFO within a priority),
+    waiting for the token bucket when the next frame would exceed the rate limit (frames that cost nothing are sent meanwhile)"""
+
+    def __init__(self, send: Callable[[bytes], Any], bucket: Optional[TokenBucket] = None):
+        self._send = send
+        self.bucket = bucket or TokenBucket()
+        self._condition = threading.Condition()
+        self._heap: List[Tuple[int, int, float, bytes]] = []
+        self._sequence = itertools.count()
+        self._closed = False
+        self._thread = threading.Thread(target=self._run, name="kraken-outbound", daemon=True)
+        self._thread.start()
+
+    @property
+    def pending(self) -> int:
+        return len(self._heap)
+
+    def put(self, data: bytes, priority: int = PRIORITY_OTHER, cost: Optional[float] = None):
+        with self._condition:
+            if self._closed:
+                logger.warning("[SOCKET][OUTBOUND] Writer closed, dropping %s", data)
+                return
+            heapq.heappush(
+                self._heap,
+                (priority, next(self._sequence), cost_of(priority) if cost is None else cost, data),
+            )
+            self._condition.notify()
+
+    def use_bucket(self, bucket: Optional[TokenBucket]):
+        """Throttles the frames still queued and those to come with another bucket"""
+        with self._condition:
+            self.bucket = bucket or TokenBucket()
+            self._condition.notify()
+
+    def close(self):
+        """Stops the thread; frames still queued are not sent"""
+        with self._condition:
+            self._closed = True
+            self._heap.clear()
+            self._condition.notify()
+
+    def _next(self) -> Optional[bytes]:
+        with self._condition:
+            while True:
+                if self._closed:
+                    return None
+                if not self._heap:
+                    self._condition.wait()
+                    continue
+                cost = self._heap[0][2]
+                wait = self.bucket.wait_time(cost)
+                if wait:
+                    # Frames that don't count towards the rate limit (subscriptions...) needn't wait behind throttled orders
+                    free = [entry for entry in self._heap if not entry[2]]
+                    if free:
+                        entry = min(free)
+                        self._heap.remove(entry)
+                        heapq.heapify(self._heap)
+                        return entry[3]
+                    # Woken up early if something (possibly of higher priority) gets queued
+                    self._condition.wait(wait)
+                    continue
+                self.bucket.take(cost)
+                return heapq.heappop(self._heap)[3]
+
+    def _run(self):
+        while (data := self._next()) is not None:
+            try:
+                logger.debug("[SOCKET][OUTBOUND] Sending %s", data)
+                self._send(data)
+            except Exception as exc:
+                logger.error("[SOCKET][OUTBOUND] Error sending %s: %s", data, exc)
+
+
+__all__ = [
+    "KRAKEN_INTERMEDIATE",
+    "KRAKEN_PRO",
+    "KRAKEN_STARTER",
+    "OutboundWriter",
+    "PRIORITY_CANCEL",
+    "PRIORITY_ORDER",
+    "PRIORITY_OTHER",
+    "RateLimit",
+    "TokenBucket",
+    "priority_of",
+]
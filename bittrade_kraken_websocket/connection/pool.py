@@ -0,0 +1,123 @@
+import zlib
+from logging import getLogger
+from threading import Lock
+from typing import Any, Callable, List, Optional, Sequence, TypeVar
+
+import reactivex
+from reactivex import ConnectableObservable, Observable, operators
+from reactivex.abc import DisposableBase, ObserverBase, SchedulerBase
+from reactivex.disposable import CompositeDisposable, Disposable
+
+from bittrade_kraken_websocket.connection.enhanced_websocket import EnhancedWebsocket
+from bittrade_kraken_websocket.connection.generic import WebsocketBundle
+from bittrade_kraken_websocket.connection.public import public_websocket_connection
+from bittrade_kraken_websocket.messages.filters.router import ChannelRouter
+from bittrade_kraken_websocket.messages.listen import (
+    filter_new_socket_only,
+    keep_messages_only,
+)
+
+logger = getLogger(__name__)
+
+_T = TypeVar("_T")
+
+# Given a pair and the number of active subscriptions on each shard, returns the index of the shard to use
+ShardingPolicy = Callable[[str, Sequence[int]], int]
+# Same signature as subscribe_ticker, subscribe_trade etc.: (pair, messages, **kwargs) -> operator on new sockets
+ChannelSubscriber = Callable[..., Callable[[Observable[EnhancedWebsocket]], Observable[_T]]]
+
+
+def hash_sharding(pair: str, loads: Sequence[int]) -> int:
+    """Same pair always goes to the same shard (stable across runs)"""
+    return zlib.crc32(pair.encode()) % len(loads)
+
+
+def least_loaded_sharding(pair: str, loads: Sequence[int]) -> int:
+    """Shard with the fewest active subscriptions"""
+    return min(range(len(loads)), key=loads.__getitem__)
+
+
+class ConnectionPool:
+    """Spreads channel subscriptions over several websocket connections.
+
+    Each shard is a separate connection (by default `public_websocket_connection`, which reconnects on its own with `retry_with_backoff`),
+    so a burst on one socket doesn't delay the pairs handled by the others.
+
+    pool = ConnectionPool(4)
+    pool.subscribe(subscribe_ticker, "XBT/USD").subscribe(print)
+    pool.subscribe(subscribe_ohlc, "ETH/USD", interval=5).subscribe(print)
+    pool.connect()
+    """
+
+    def __init__(
+        self,
+        size: int = 2,
+        *,
+        sharding: ShardingPolicy = hash_sharding,
+        connection_factory: Callable[..., ConnectableObservable[WebsocketBundle]] = public_websocket_connection,
+        **connection_kwargs: Any,
+    ):
+        """
+        :param: size: Number of connections
+        :param: sharding: Picks the connection for each new subscription; see `hash_sharding` and `least_loaded_sharding`
+        :param: connection_factory: Creates each connection; keyword arguments not used by the pool (e.g. `reconnect`, `heartbeats`) are passed to it
+        """
+        if size < 1:
+            raise ValueError("A connection pool needs at least one connection")
+        self._sharding = sharding
+        self._lock = Lock()
+        self.connections: List[ConnectableObservable[WebsocketBundle]] = [
+            connection_factory(**connection_kwargs) for _ in range(size)
+        ]
+        self.shard_messages: List[ChannelRouter] = [
+            ChannelRouter(connection.pipe(keep_messages_only(), operators.share()))
+            for connection in self.connections
+        ]
+        self._new_sockets = [
+            connection.pipe(filter_new_socket_only(), operators.share())
+            for connection in self.connections
+        ]
+        self._loads = [0] * size
+        self.messages: Observable[Any] = reactivex.merge(*self.shard_messages)
+        """All messages from all the connections, merged"""
+
+    @property
+    def loads(self) -> List[int]:
+        """Number of active subscriptions per connection"""
+        return list(self._loads)
+
+    def subscribe(self, subscriber: ChannelSubscriber[_T], pair: str, **kwargs: Any) -> Observable[_T]:
+        """Observable of a channel subscription, e.g. `pool.subscribe(subscribe_ticker, "XBT/USD")`.
+        The connection is picked when subscribing and released on dispose"""
+
+        def subscribe(observer: ObserverBase[_T], scheduler: Optional[SchedulerBase] = None) -> DisposableBase:
+            with self._lock:
+                index = self._sharding(pair, tuple(self._loads))
+                self._loads[index] += 1
+            logger.debug("[POOL] Subscription for %s on connection %s", pair, index)
+
+            def release():
+                with self._lock:
+                    self._loads[index] -= 1
+
+            return CompositeDisposable(
+                self._new_sockets[index]
+                .pipe(subscriber(pair, self.shard_messages[index], **kwargs))
+                .subscribe(observer, scheduler=scheduler),
+                Disposable(release),
+            )
+
+        return Observable(subscribe)
+
+    def connect(self, scheduler: Optional[SchedulerBase] = None) -> DisposableBase:
+        return CompositeDisposable(
+            *[connection.connect(scheduler=scheduler) for connection in self.connections]
+        )
+
+
+__all__ = [
+    "ConnectionPool",
+    "ShardingPolicy",
+    "hash_sharding",
+    "least_loaded_sharding",
+]
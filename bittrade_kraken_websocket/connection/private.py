@@ -5,21 +5,29 @@ from reactivex import ConnectableObservable
 from reactivex.abc import SchedulerBase
 from reactivex.operators import publish
 
+from bittrade_kraken_websocket.connection.capture import CaptureLog
 from bittrade_kraken_websocket.connection.generic import websocket_connection, WebsocketBundle
+from bittrade_kraken_websocket.connection.handoff import HandoffQueue, handoff as handoff_operator
 from bittrade_kraken_websocket.connection.reconnect import retry_with_backoff
 
 logger = getLogger(__name__)
 
 
-def private_websocket_connection(*, reconnect: bool = True, scheduler: Optional[SchedulerBase] = None) -> ConnectableObservable[WebsocketBundle]:
+def private_websocket_connection(*, reconnect: bool = True, scheduler: Optional[SchedulerBase] = None, heartbeats: bool = True, handoff: Optional[HandoffQueue[WebsocketBundle]] = None, capture: Optional[CaptureLog] = None, timestamps: bool = False) -> ConnectableObservable[WebsocketBundle]:
     """You need to add your token to the EnhancedWebsocket
-    An example implementation can be found in `examples/private_subscription.py`"""
+    An example implementation can be found in `examples/private_subscription.py`
+    Set `heartbeats` to False to drop heartbeats at the socket rather than emitting them
+    Set `handoff` to deliver bundles on a consumer thread through a bounded queue, so slow subscribers can't stall the socket thread
+    Set `capture` to record every raw frame; see `replay_capture`
+    Set `timestamps` to stamp channel messages with their receive time; see `LatencyCollector`"""
     connection = websocket_connection(
-        private=True, scheduler=scheduler
+        private=True, scheduler=scheduler, heartbeats=heartbeats, capture=capture, timestamps=timestamps
     )
     if reconnect:
         connection = connection.pipe(retry_with_backoff())
-    
+    if handoff is not None:
+        connection = connection.pipe(handoff_operator(handoff))
+
     return connection.pipe(
         publish()
     )
@@ -4,15 +4,27 @@ from reactivex import ConnectableObservable
 from reactivex.operators import publish
 from reactivex.abc import SchedulerBase
 
+from .batching import Batching
+from .capture import CaptureLog
+from .decode_pool import DecodePool
+from .handoff import HandoffQueue, handoff as handoff_operator
 from .reconnect import retry_with_backoff
 from bittrade_kraken_websocket.connection.generic import websocket_connection, WebsocketBundle
 
 
-def public_websocket_connection(*, reconnect: bool = True, scheduler: Optional[SchedulerBase] = None) -> ConnectableObservable[
+def public_websocket_connection(*, reconnect: bool = True, scheduler: Optional[SchedulerBase] = None, heartbeats: bool = True, batching: Optional[Batching] = None, handoff: Optional[HandoffQueue[WebsocketBundle]] = None, capture: Optional[CaptureLog] = None, timestamps: bool = False, decode_pool: Optional[DecodePool] = None) -> ConnectableObservable[
                                                                                      WebsocketBundle]:
-    connection = websocket_connection(scheduler=scheduler)
+    """Set `heartbeats` to False to drop heartbeats at the socket rather than emitting them
+    Set `batching` to receive channel messages in lists (WEBSOCKET_MESSAGE_BATCH), events still coming one by one; see `keep_message_batches_only`
+    Set `handoff` to deliver bundles on a consumer thread through a bounded queue, so slow subscribers can't stall the socket thread
+    Set `capture` to record every raw frame; see `replay_capture`
+    Set `timestamps` to stamp channel messages with their receive time; see `LatencyCollector`
+    Set `decode_pool` to decode channel frames in worker processes; see `DecodePool`"""
+    connection = websocket_connection(scheduler=scheduler, heartbeats=heartbeats, batching=batching, capture=capture, timestamps=timestamps, decode_pool=decode_pool)
     if reconnect:
         connection = connection.pipe(retry_with_backoff())
+    if handoff is not None:
+        connection = connection.pipe(handoff_operator(handoff))
     return connection.pipe(publish())
     
 __all__ = [
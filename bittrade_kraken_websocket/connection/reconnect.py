@@ -10,6 +10,8 @@ from reactivex.disposable import CompositeDisposable
 from reactivex.operators import ignore_elements
 from expression import Some, Nothing, Option
 
+from bittrade_kraken_websocket.metrics import registry
+
 _T = TypeVar("_T")
 
 logger = getLogger(__name__)
@@ -80,12 +82,14 @@ def retry_with_backoff(
                 _is_first = False
             else:
                 logger.info("[BACKOFF] Back off delay is %s", delay_by)
+                registry.increment("reconnects_total")
+                registry.increment("backoff_seconds_total", value=delay_by)
             # Have to cheat a bit since there is no "Empty" observable type
             yield cast(Observable[_T], reactivex.timer(delay_by).pipe(ignore_elements()))
             if delay_by:
                 logger.info("[BACKOFF] Waited for back off; continuing")
             current_stable_subscription = Some(CompositeDisposable(
-                stabilized.subscribe(on_completed=reset_delay),
+                stabilized.subscribe(on_completed=reset_delay, scheduler=scheduler),
             ))
             yield source.pipe(
                 operators.do_action(on_completed=complete),
@@ -0,0 +1,210 @@
+import time
+from collections import OrderedDict
+from logging import getLogger
+from threading import Lock
+from typing import Any, Callable, Dict, Hashable, List, Optional, TypeVar
+
+import orjson
+import reactivex
+from reactivex import ConnectableObservable, Observable, operators
+from reactivex.abc import DisposableBase, ObserverBase, SchedulerBase
+from reactivex.disposable import CompositeDisposable
+
+from bittrade_kraken_websocket.connection.generic import WebsocketBundle
+from bittrade_kraken_websocket.connection.pool import ChannelSubscriber
+from bittrade_kraken_websocket.connection.public import public_websocket_connection
+from bittrade_kraken_websocket.messages.filters.kind import public_channel_key
+from bittrade_kraken_websocket.messages.filters.router import ChannelRouter
+from bittrade_kraken_websocket.messages.latency import LatencyHistogram
+from bittrade_kraken_websocket.messages.listen import filter_new_socket_only, keep_messages_only
+
+logger = getLogger(__name__)
+
+_T = TypeVar("_T")
+
+
+def _trade_identity(message: List) -> Hashable:
+    # Price, volume and time of each trade
+    return tuple((trade[0], trade[1], trade[2]) for trade in message[1])
+
+
+def _content_identity(message: List) -> Hashable:
+    # Everything but the channel id (which is per connection), the channel name and the pair; book updates include their checksum
+    return orjson.dumps(message[1:-2])
+
+
+# Identity of a channel message by channel name (without its parameter, e.g. "book" for "book-10"); content otherwise
+IDENTITIES: Dict[str, Callable[[List], Hashable]] = {
+    "trade": _trade_identity,
+}
+
+
+def message_identity(message: Any) -> Optional[Hashable]:
+    """Same value for the copies of one update received on different connections; None for anything but public channel messages"""
+    key = public_channel_key(message)
+    if key is None:
+        return None
+    identity = IDENTITIES.get(key[0].split("-", 1)[0], _content_identity)
+    return key, identity(message)
+
+
+class FirstArrival:
+    """Lets through the first copy of each update, whichever leg (connection) it comes from, and drops the copies received later on other legs.
+
+    An update received twice on the same leg (e.g. an unchanged ticker) is let through twice: a copy is a duplicate
+    only when another leg already delivered as many occurrences of it.
+    Only the last `window` distinct updates are remembered
+    """
+
+    def __init__(
+        self,
+        legs: int,
+        identity: Callable[[Any], Optional[Hashable]] = message_identity,
+        window: int = 10_000,
+        clock: Callable[[], int] = time.monotonic_ns,
+    ):
+        self.legs = legs
+        self.identity = identity
+        self.window = window
+        self.clock = clock
+        self._lock = Lock()
+        # identity: [occurrences per leg, leg that delivered the last occurrence, time it was delivered]
+        self._seen: OrderedDict[Hashable, List[Any]] = OrderedDict()
+        self.wins = [0] * legs
+        self.duplicates = 0
+        self.leads: List[LatencyHistogram] = [LatencyHistogram() for _ in range(legs)]
+        """How long before the other legs each leg delivered the updates it won, in ns"""
+
+    def accept(self, leg: int, message: Any) -> bool:
+        key = self.identity(message)
+        if key is None:
+            return True
+        now = self.clock()
+        with self._lock:
+            entry = self._seen.get(key)
+            if entry is None:
+                counts = [0] * self.legs
+                counts[leg] = 1
+                self._seen[key] = [counts, leg, now]
+                if len(self._seen) > self.window:
+                    self._seen.popitem(last=False)
+                self.wins[leg] += 1
+                return True
+            counts = entry[0]
+            counts[leg] += 1
+            if counts[leg] <= max(count for i, count in enumerate(counts) if i != leg):
+                self.duplicates += 1
+                self.leads[entry[1]].record(now - entry[2])
+                return False
+            entry[1], entry[2] = leg, now
+            self._seen.move_to_end(key)
+            self.wins[leg] += 1
+            return True
+
+    def stats(self) -> Dict[str, Any]:
+        return {
+            "wins": list(self.wins),
+            "duplicates": self.duplicates,
+            "leads": [lead.snapshot() for lead in self.leads],
+        }
+
+
+class RedundantConnection:
+    """Keeps several connections (legs) subscribed to the same public channels and merges them:
+    each update is delivered from whichever leg receives it first and later copies are dropped.
+    When a leg drops, updates keep coming from the others without waiting for it to reconnect.
+
+    redundant = RedundantConnection(2)
+    redundant.subscribe(subscribe_trade, "XBT/USD").subscribe(print)
+    redundant.connect()
+    redundant.stats()  # {"wins": [1520, 1488], "duplicates": 3008, "leads": [...]}
+
+    Subscribers run on every message of their leg, so stateful ones such as `subscribe_book` keep a complete state per leg;
+    it is their output that is deduplicated: what a leg emits for an update is dropped when another leg already emitted for it.
+    This relies on subscribers emitting synchronously, as the message comes in (as all the `subscribe_*` helpers do);
+    throttle or sample their output after `subscribe`, not within the subscriber.
+    Private channels must not go through it: their sequence numbers are per connection
+    """
+
+    def __init__(
+        self,
+        legs: int = 2,
+        *,
+        connection_factory: Callable[..., ConnectableObservable[WebsocketBundle]] = public_websocket_connection,
+        deduplicator: Optional[FirstArrival] = None,
+        **connection_kwargs: Any,
+    ):
+        """
+        :param: legs: Number of connections
+        :param: connection_factory: Creates each connection; other keyword arguments (e.g. `heartbeats`) are passed to it
+        :param: deduplicator: Deduplicates `messages` and keeps `stats`; defaults to a FirstArrival using `message_identity`
+        """
+        if legs < 2:
+            raise ValueError("A redundant connection needs at least two legs")
+        self.deduplicator = deduplicator or FirstArrival(legs)
+        self.connections: List[ConnectableObservable[WebsocketBundle]] = [
+            connection_factory(**connection_kwargs) for _ in range(legs)
+        ]
+        # Per leg, the message being delivered and whether that leg was the first to get it
+        self._current: List[Any] = [None] * legs
+        self._won = [False] * legs
+        accept = self.deduplicator.accept
+
+        def receive(leg: int, message: Any):
+            self._current[leg] = message
+            self._won[leg] = accept(leg, message)
+
+        leg_streams = [
+            connection.pipe(
+                keep_messages_only(),
+                operators.do_action(lambda message, leg=leg: receive(leg, message)),
+                operators.share(),
+            )
+            for leg, connection in enumerate(self.connections)
+        ]
+        self.leg_messages: List[ChannelRouter] = [ChannelRouter(stream) for stream in leg_streams]
+        """Every message of each leg, duplicates included"""
+        self._new_sockets = [
+            connection.pipe(filter_new_socket_only(), operators.share())
+            for connection in self.connections
+        ]
+        self.messages: Observable[Any] = reactivex.merge(
+            *[stream.pipe(operators.filter(lambda _, leg=leg: self._won[leg])) for leg, stream in enumerate(leg_streams)]
+        )
+        """Messages from all the legs, without duplicates"""
+
+    def subscribe(self, subscriber: ChannelSubscriber[_T], pair: str, **kwargs: Any) -> Observable[_T]:
+        """Observable of a channel subscription made on every leg, e.g. `redundant.subscribe(subscribe_ticker, "XBT/USD")`"""
+
+        def subscribe(observer: ObserverBase[_T], scheduler: Optional[SchedulerBase] = None) -> DisposableBase:
+            # What legs emit is deduplicated by the update it was emitted for: a leg that emitted nothing for an update
+            # (e.g. a book still waiting for its snapshot) leaves it to the others
+            outputs = FirstArrival(len(self.connections), self.deduplicator.identity, self.deduplicator.window, self.deduplicator.clock)
+            return reactivex.merge(
+                *[
+                    new_sockets.pipe(
+                        subscriber(pair, messages, **kwargs),
+                        operators.filter(lambda _, leg=leg: outputs.accept(leg, self._current[leg])),
+                    )
+                    for leg, (new_sockets, messages) in enumerate(zip(self._new_sockets, self.leg_messages))
+                ]
+            ).subscribe(observer, scheduler=scheduler)
+
+        return Observable(subscribe)
+
+    def stats(self) -> Dict[str, Any]:
+        """Updates won by each leg, duplicates dropped and by how much each leg was ahead when it won"""
+        return self.deduplicator.stats()
+
+    def connect(self, scheduler: Optional[SchedulerBase] = None) -> DisposableBase:
+        return CompositeDisposable(
+            *[connection.connect(scheduler=scheduler) for connection in self.connections]
+        )
+
+
+__all__ = [
+    "FirstArrival",
+    "IDENTITIES",
+    "RedundantConnection",
+    "message_identity",
+]
@@ -0,0 +1,158 @@
+import struct
+import threading
+import time
+from logging import getLogger
+from typing import Any, Dict, List, Optional, Sequence
+
+import orjson
+from reactivex import Observable
+from reactivex.abc import DisposableBase, ObserverBase, SchedulerBase
+from reactivex.disposable import Disposable
+
+from bittrade_kraken_websocket.channels.ohlc import to_ohlc_payload
+from bittrade_kraken_websocket.channels.payload import map_payloads
+from bittrade_kraken_websocket.channels.spread import to_spread_payload
+from bittrade_kraken_websocket.channels.ticker import to_ticker_payload
+from bittrade_kraken_websocket.channels.trade import to_trade_payload
+from bittrade_kraken_websocket.connection.shared_ring import BroadcastRing
+from bittrade_kraken_websocket.messages.filters.kind import public_channel_key
+from bittrade_kraken_websocket.messages.filters.router import ChannelRouter
+from bittrade_kraken_websocket.metrics import registry as metrics
+
+logger = getLogger(__name__)
+
+# Records are the lengths of the channel name and pair, both names, then the JSON of what's between the channel id and the channel name
+_HEADER = struct.Struct("<BB")
+
+
+class SharedFeedPublisher:
+    """Writes the public channel messages of a connection to a named shared memory ring that other processes on the host read with SharedFeedReader,
+    so that a single socket (and a single decode) serves all of them.
+
+    publisher = SharedFeedPublisher("kraken-feed")
+    publisher.publish(messages)  # e.g. socket_connection.pipe(keep_messages_only())
+    # subscriptions are made here, as usual: socket_connection.pipe(filter_new_socket_only(), subscribe_ticker(pairs, messages))
+
+    Channel name and pair are written ahead of the payload, so that readers skip the messages nobody subscribed to without decoding them.
+    Readers get messages in Kraken's framing with the channel id set to 0 (it is per socket), so payloads are the same
+    whichever socket the publisher is on. Writing never waits for readers; readers that fall behind lose messages and are told so
+    """
+
+    def __init__(self, name: str, capacity: int = 16 * 1024 * 1024):
+        """
+        :param: capacity: Bytes of messages kept for readers; a reader more than that behind skips to the newest message
+        """
+        self.name = name
+        self._ring = BroadcastRing(name, capacity)
+        self._lock = threading.Lock()
+
+    @property
+    def published(self) -> int:
+        return self._ring.written
+
+    def write(self, message: Any) -> bool:
+        """Writes a public channel message; anything else is ignored and False is returned"""
+        key = public_channel_key(message)
+        if key is None:
+            return False
+        channel_name, pair = key[0].encode(), key[1].encode()
+        data = _HEADER.pack(len(channel_name), len(pair)) + channel_name + pair + orjson.dumps(message[1:-2])
+        with self._lock:
+            self._ring.write(data)
+        return True
+
+    def publish(self, messages: Observable[Dict | List]) -> DisposableBase:
+        """Writes the messages (or message batches) of a connection until disposed"""
+
+        def on_next(value: Any):
+            if not self.write(value) and type(value) == list:
+                for message in value:
+                    self.write(message)
+
+        return messages.subscribe(on_next, lambda exc: logger.error("[SHARED FEED] Messages errored: %s", exc))
+
+    def close(self):
+        """Removes the ring; attached readers stop getting messages"""
+        self._ring.close()
+
+
+class SharedFeedReader:
+    """Reads, from another process, the messages written by a SharedFeedPublisher; mirrors the `subscribe_*` helpers
+    (subscriptions themselves are the publisher's: readers only pick from what it receives).
+
+    reader = SharedFeedReader("kraken-feed")
+    reader.subscribe_ticker("XBT/USD").subscribe(print)
+
+    The ring is polled on a thread of its own while anything is subscribed, starting from the newest message;
+    only the messages of subscribed channels and pairs are decoded.
+    A reader that falls too far behind skips to the newest message; `missed` counts the messages it lost that way
+    """
+
+    def __init__(self, name: str, *, poll_interval: float = 0.0005, batch_size: int = 256):
+        """
+        :param: poll_interval: Seconds to wait before looking at the ring again once everything was read
+        """
+        self.name = name
+        self.poll_interval = poll_interval
+        self.batch_size = batch_size
+        self.missed = 0
+        self.messages = ChannelRouter(Observable(self._poll))
+        """All messages; also usable as `messages` of `subscribe_to_channel`-based operators"""
+
+    def _poll(self, observer: ObserverBase[Dict | List], scheduler: Optional[SchedulerBase] = None) -> DisposableBase:
+        ring = BroadcastRing(self.name, create=False)
+        stop = threading.Event()
+
+        def run():
+            loads, header_size, wants = orjson.loads, _HEADER.size, self.messages.wants
+            try:
+                while not stop.is_set():
+                    records, missed = ring.read_many(self.batch_size)
+                    if missed:
+                        self.missed += missed
+                        metrics.increment("shared_feed_missed_total", (self.name,), missed)
+                        logger.warning("[SHARED FEED] Reader of %s fell behind and missed %s messages", self.name, missed)
+                    if not records:
+                        time.sleep(self.poll_interval)
+                        continue
+                    for record in records:
+                        # Lengths are single bytes, read straight from the record
+                        channel_end = header_size + record[0]
+                        pair_end = channel_end + record[1]
+                        channel_name, pair = record[header_size:channel_end].decode(), record[channel_end:pair_end].decode()
+                        if wants(channel_name, pair):
+                            observer.on_next([0, *loads(record[pair_end:]), channel_name, pair])
+            except Exception as exc:
+                observer.on_error(exc)
+            finally:
+                ring.close()
+
+        thread = threading.Thread(target=run, name=f"kraken-shared-feed-{self.name}", daemon=True)
+        thread.start()
+        return Disposable(stop.set)
+
+    def channel(self, channel_name: str, pair: str | Sequence[str] = "") -> Observable[Dict | List]:
+        """Messages of a channel, by the name Kraken gives it (e.g. "ohlc-5", "book-10")"""
+        return self.messages.channel(channel_name, pair)
+
+    def subscribe_ticker(self, pair: str | Sequence[str]):
+        """Like `subscribe_ticker`: with a list of pairs, (pair, payload) tuples are emitted"""
+        return self.channel("ticker", pair).pipe(map_payloads(to_ticker_payload, keyed=not isinstance(pair, str)))
+
+    def subscribe_trade(self, pair: str | Sequence[str]):
+        """Like `subscribe_trade`: lists of TradePayload or, with a list of pairs, (pair, trades) tuples"""
+        return self.channel("trade", pair).pipe(
+            map_payloads(lambda message: to_trade_payload(message[1]), keyed=not isinstance(pair, str))
+        )
+
+    def subscribe_spread(self, pair: str | Sequence[str]):
+        return self.channel("spread", pair).pipe(map_payloads(to_spread_payload, keyed=not isinstance(pair, str)))
+
+    def subscribe_ohlc(self, pair: str | Sequence[str], interval: int = 1):
+        return self.channel(f"ohlc-{interval}", pair).pipe(map_payloads(to_ohlc_payload, keyed=not isinstance(pair, str)))
+
+
+__all__ = [
+    "SharedFeedPublisher",
+    "SharedFeedReader",
+]
@@ -0,0 +1,267 @@
+import struct
+import sys
+import time
+from multiprocessing import resource_tracker, shared_memory
+from typing import List, Optional, Tuple
+
+# Write position, then read position, each on its own cache line
+_POSITION = struct.Struct("<Q")
+_WRITE_AT = 0
+_READ_AT = 64
+_HEADER_SIZE = 128
+_LENGTH = struct.Struct("<I")
+# Length value telling the reader that the next record starts back at the beginning of the buffer
+_WRAP = 0xFFFFFFFF
+
+
+class RingFull(Exception):
+    pass
+
+
+class FrameRing:
+    """Ring buffer of variable-size frames in shared memory, for exactly one writing and one reading process.
+
+    Positions only ever increase; the writer publishes a frame by moving the write position after copying it,
+    and the reader frees space by moving the read position after copying the frame out.
+    Relies on aligned 8-byte stores not being torn or reordered with the frame copy, which holds on x86-64 and ARM64 CPython builds
+    """
+
+    def __init__(self, capacity: int = 4 * 1024 * 1024, name: Optional[str] = None):
+        """Creates the ring, or attaches to the ring created by another process when given its `name`"""
+        self.capacity = capacity
+        self._owner = name is None
+        if name is None:
+            self._shm = shared_memory.SharedMemory(create=True, size=_HEADER_SIZE + capacity)
+            self._shm.buf[:_HEADER_SIZE] = bytes(_HEADER_SIZE)
+        else:
+            self._shm = shared_memory.SharedMemory(name=name)
+        self.name = self._shm.name
+        self._buf = self._shm.buf
+
+    def _position(self, at: int) -> int:
+        return _POSITION.unpack_from(self._buf, at)[0]
+
+    def __len__(self) -> int:
+        """Bytes in use"""
+        return self._position(_WRITE_AT) - self._position(_READ_AT)
+
+    def try_write(self, data: bytes) -> bool:
+        size = _LENGTH.size + len(data)
+        if size > self.capacity // 2:
+            raise ValueError(f"Frame of {len(data)} bytes is too large for a ring of {self.capacity} bytes")
+        buf, capacity = self._buf, self.capacity
+        write = self._position(_WRITE_AT)
+        offset = write % capacity
+        remaining = capacity - offset
+        skip = remaining if remaining < size else 0
+        if write + skip + size - self._position(_READ_AT) > capacity:
+            return False
+        if skip:
+            if remaining >= _LENGTH.size:
+                _LENGTH.pack_into(buf, _HEADER_SIZE + offset, _WRAP)
+            write += skip
+            offset = 0
+        start = _HEADER_SIZE + offset
+        _LENGTH.pack_into(buf, start, len(data))
+        buf[start + _LENGTH.size : start + size] = data
+        _POSITION.pack_into(buf, _WRITE_AT, write + size)
+        return True
+
+    def write(self, data: bytes, timeout: Optional[float] = None):
+        """Waits for the reader to make room when the ring is full; raises RingFull after `timeout` seconds"""
+        if self.try_write(data):
+            return
+        deadline = None if timeout is None else time.monotonic() + timeout
+        delay = 0.00005
+        while not self.try_write(data):
+            if deadline is not None and time.monotonic() > deadline:
+                raise RingFull()
+            time.sleep(delay)
+            delay = min(delay * 2, 0.001)
+
+    def read_many(self, limit: int = 256) -> List[bytes]:
+        """Up to `limit` frames, oldest first; empty when there's nothing to read"""
+        buf, capacity = self._buf, self.capacity
+        read = self._position(_READ_AT)
+        write = self._position(_WRITE_AT)
+        frames = []
+        while read < write and len(frames) < limit:
+            offset = read % capacity
+            remaining = capacity - offset
+            if remaining < _LENGTH.size:
+                read += remaining
+                continue
+            start = _HEADER_SIZE + offset
+            length = _LENGTH.unpack_from(buf, start)[0]
+            if length == _WRAP:
+                read += remaining
+                continue
+            frames.append(bytes(buf[start + _LENGTH.size : start + _LENGTH.size + length]))
+            read += _LENGTH.size + length
+        if frames or read != self._position(_READ_AT):
+            _POSITION.pack_into(buf, _READ_AT, read)
+        return frames
+
+    def close(self):
+        self._buf = None  # type: ignore
+        self._shm.close()
+        if self._owner:
+            self._shm.unlink()
+
+
+# Broadcast ring: position up to which the writer may be overwriting, number of records written and capacity,
+# then position of the end of the last complete record
+_RESERVED_AT = 0
+_SEQUENCE_AT = 8
+_CAPACITY_AT = 16
+_COMMITTED_AT = 64
+_RECORD = struct.Struct("<IQ")
+
+
+def _untrack(shm: shared_memory.SharedMemory):
+    # Before 3.13, every process opening a segment has it unlinked when it exits, which would take it away from the others;
+    # the ring's writer unlinks it itself on close instead (or the next writer with the same name does)
+    if sys.version_info < (3, 13):
+        resource_tracker.unregister(shm._name, "shared_memory")  # type: ignore
+
+
+def _attach(name: str) -> shared_memory.SharedMemory:
+    if sys.version_info >= (3, 13):
+        return shared_memory.SharedMemory(name=name, track=False)  # type: ignore
+    shm = shared_memory.SharedMemory(name=name)
+    _untrack(shm)
+    return shm
+
+
+def _create(name: Optional[str], size: int) -> shared_memory.SharedMemory:
+    if sys.version_info >= (3, 13):
+        return shared_memory.SharedMemory(name=name, create=True, size=size, track=False)  # type: ignore
+    shm = shared_memory.SharedMemory(name=name, create=True, size=size)
+    _untrack(shm)
+    return shm
+
+
+def _unlink(shm: shared_memory.SharedMemory):
+    if sys.version_info < (3, 13):
+        # unlink unregisters it
+        resource_tracker.register(shm._name, "shared_memory")  # type: ignore
+    shm.unlink()
+
+
+class BroadcastRing:
+    """Ring buffer of variable-size records in shared memory, written by one process and read by any number of processes.
+
+    The writer never waits: records that readers did not get to in time are overwritten.
+    Each record carries its sequence number, so a reader that fell behind by more than the ring's capacity knows it and how many records it missed;
+    it then resumes from the newest record
+    """
+
+    def __init__(self, name: Optional[str] = None, capacity: int = 16 * 1024 * 1024, create: bool = True):
+        """Creates the ring (under `name` when given, replacing any leftover of a previous writer), or attaches to it with `create=False`;
+        readers start at the newest record"""
+        self._owner = create
+        if create:
+            try:
+                self._shm = _create(name, _HEADER_SIZE + capacity)
+            except FileExistsError:
+                stale = _attach(name)  # type: ignore
+                stale.close()
+                _unlink(stale)
+                self._shm = _create(name, _HEADER_SIZE + capacity)
+            self._shm.buf[:_HEADER_SIZE] = bytes(_HEADER_SIZE)
+            _POSITION.pack_into(self._shm.buf, _CAPACITY_AT, capacity)
+        else:
+            self._shm = _attach(name)  # type: ignore
+        self.capacity = _POSITION.unpack_from(self._shm.buf, _CAPACITY_AT)[0]
+        self.name = self._shm.name
+        self._buf = self._shm.buf
+        # Reader state
+        self.position = self._position(_COMMITTED_AT)
+        self.sequence = self._position(_SEQUENCE_AT)
+
+    def _position(self, at: int) -> int:
+        return _POSITION.unpack_from(self._buf, at)[0]
+
+    @property
+    def written(self) -> int:
+        """Records written so far"""
+        return self._position(_SEQUENCE_AT)
+
+    def write(self, data: bytes):
+        size = _RECORD.size + len(data)
+        capacity = self.capacity
+        if size > capacity // 2:
+            raise ValueError(f"Record of {len(data)} bytes is too large for a ring of {capacity} bytes")
+        buf = self._buf
+        write = self._position(_COMMITTED_AT)
+        sequence = self._position(_SEQUENCE_AT)
+        offset = write % capacity
+        remaining = capacity - offset
+        if remaining < size:
+            # Readers must not trust what's between here and `reserved` until they've checked it was not being rewritten
+            _POSITION.pack_into(buf, _RESERVED_AT, write + remaining + size)
+            if remaining >= _LENGTH.size:
+                _LENGTH.pack_into(buf, _HEADER_SIZE + offset, _WRAP)
+            write += remaining
+            offset = 0
+        else:
+            _POSITION.pack_into(buf, _RESERVED_AT, write + size)
+        start = _HEADER_SIZE + offset
+        _RECORD.pack_into(buf, start, len(data), sequence)
+        buf[start + _RECORD.size : start + size] = data
+        _POSITION.pack_into(buf, _SEQUENCE_AT, sequence + 1)
+        _POSITION.pack_into(buf, _COMMITTED_AT, write + size)
+
+    def _skip_to_newest(self) -> int:
+        committed = self._position(_COMMITTED_AT)
+        sequence = self._position(_SEQUENCE_AT)
+        missed = max(sequence - self.sequence, 0)
+        self.position, self.sequence = committed, sequence
+        return missed
+
+    def read_many(self, limit: int = 256) -> Tuple[List[bytes], int]:
+        """Up to `limit` records, oldest first, and the number of records missed (overwritten before they could be read)"""
+        buf, capacity = self._buf, self.capacity
+        committed = self._position(_COMMITTED_AT)
+        position, sequence = self.position, self.sequence
+        if committed - position > capacity:
+            return [], self._skip_to_newest()
+        records: List[bytes] = []
+        starts: List[int] = []
+        while position < committed and len(records) < limit:
+            offset = position % capacity
+            remaining = capacity - offset
+            if remaining < _LENGTH.size:
+                position += remaining
+                continue
+            start = _HEADER_SIZE + offset
+            length = _LENGTH.unpack_from(buf, start)[0]
+            if length == _WRAP:
+                position += remaining
+                continue
+            if remaining < _RECORD.size or length > capacity // 2 or _RECORD.unpack_from(buf, start)[1] != sequence:
+                # Overwritten while reading
+                return [], self._skip_to_newest()
+            records.append(bytes(buf[start + _RECORD.size : start + _RECORD.size + length]))
+            starts.append(position)
+            position += _RECORD.size + length
+            sequence += 1
+        # Records the writer may have started overwriting while they were being copied
+        oldest_intact = self._position(_RESERVED_AT) - capacity
+        if starts and starts[0] < oldest_intact:
+            return [], self._skip_to_newest()
+        self.position, self.sequence = position, sequence
+        return records, 0
+
+    def close(self):
+        self._buf = None  # type: ignore
+        self._shm.close()
+        if self._owner:
+            _unlink(self._shm)
+
+
+__all__ = [
+    "BroadcastRing",
+    "FrameRing",
+    "RingFull",
+]
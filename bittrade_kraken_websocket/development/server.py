@@ -0,0 +1,525 @@
+"""Local stand-in for Kraken's websocket API (v1 framing), for load and recovery testing on one machine.
+
+Speaks: systemStatus, ping/pong, heartbeat, subscribe/unsubscribe with subscriptionStatus,
+ticker/trade/spread/ohlc/book feeds (with book checksums), openOrders/ownTrades with sequence numbers,
+and addOrder/cancelOrder/editOrder responses. Any token is accepted. Prices are a seeded random walk.
+
+Run with `python -m bittrade_kraken_websocket.development.server --port 8765 --rate 1000`
+then point the library to it, e.g. `WS_PUBLIC_URL=ws://127.0.0.1:8765 WS_PRIVATE_URL=ws://127.0.0.1:8765 python my_bot.py`.
+From tests, use `StandInServer(...).start_in_thread()`.
+
+Requires the `websockets` package (`asyncio` extra).
+"""
+import argparse
+import asyncio
+import dataclasses
+import itertools
+import random
+import string
+import threading
+import time
+import zlib
+from logging import getLogger
+from typing import Any, Dict, List, Optional, Set, Tuple
+
+import orjson
+
+try:
+    import websockets
+except ImportError:  # pragma: no cover
+    websockets = None
+
+logger = getLogger(__name__)
+
+PUBLIC_CHANNELS = ("ticker", "trade", "spread", "ohlc", "book")
+PRIVATE_CHANNELS = ("openOrders", "ownTrades")
+
+
+def book_checksum(asks: List[Tuple[str, str]], bids: List[Tuple[str, str]]) -> str:
+    """Kraken's CRC32 of the top 10 asks (ascending) then bids (descending), prices and volumes without '.' nor leading zeros"""
+
+    def level(price: str, volume: str) -> str:
+        return price.replace(".", "").lstrip("0") + volume.replace(".", "").lstrip("0")
+
+    text = "".join(level(p, v) for p, v in asks[:10]) + "".join(level(p, v) for p, v in bids[:10])
+    return str(zlib.crc32(text.encode()))
+
+
+def _txid(rng: random.Random, prefix: str) -> str:
+    chars = string.ascii_uppercase + string.digits
+    return "-".join(
+        [prefix + "".join(rng.choices(chars, k=5)), "".join(rng.choices(chars, k=5)), "".join(rng.choices(chars, k=6))]
+    )
+
+
+class _Book:
+    def __init__(self, rng: random.Random, mid: float, depth: int):
+        self.rng = rng
+        self.depth = depth
+        self.asks: Dict[float, str] = {round(mid + 0.01 * (i + 1), 2): self._volume() for i in range(depth)}
+        self.bids: Dict[float, str] = {round(mid - 0.01 * (i + 1), 2): self._volume() for i in range(depth)}
+
+    def _volume(self) -> str:
+        return f"{self.rng.uniform(0.1, 100):.8f}"
+
+    def sides(self) -> Tuple[List[Tuple[str, str]], List[Tuple[str, str]]]:
+        asks = [(f"{p:.5f}", self.asks[p]) for p in sorted(self.asks)[: self.depth]]
+        bids = [(f"{p:.5f}", self.bids[p]) for p in sorted(self.bids, reverse=True)[: self.depth]]
+        return asks, bids
+
+    def update(self, timestamp: str) -> Dict[str, Any]:
+        """Changes one level on one side (sometimes removing a level and adding another) and returns the update payload"""
+        side_key = self.rng.choice(("a", "b"))
+        side = self.asks if side_key == "a" else self.bids
+        levels: List[List[str]] = []
+        if len(side) > 1 and self.rng.random() < 0.3:
+            # Remove the worst level and insert a new best one, without crossing the other side
+            worst = max(side) if side_key == "a" else min(side)
+            del side[worst]
+            levels.append([f"{worst:.5f}", "0.00000000", timestamp])
+            if side_key == "a":
+                best = round(min(side) - 0.01, 2)
+                valid = not self.bids or best > max(self.bids)
+            else:
+                best = round(max(side) + 0.01, 2)
+                valid = not self.asks or best < min(self.asks)
+            if not valid:
+                best = worst
+            side[best] = self._volume()
+            levels.append([f"{best:.5f}", side[best], timestamp])
+        else:
+            price = self.rng.choice(list(side))
+            side[price] = self._volume()
+            levels.append([f"{price:.5f}", side[price], timestamp])
+        asks, bids = self.sides()
+        return {side_key: levels, "c": book_checksum(asks, bids)}
+
+
+@dataclasses.dataclass
+class _Order:
+    txid: str
+    pair: str
+    side: str
+    ordertype: str
+    price: str
+    price2: str
+    volume: str
+    userref: int
+    oflags: str
+
+    def description(self) -> str:
+        return f"{self.side} {self.volume} {self.pair} @ {self.ordertype} {self.price}"
+
+
+class _Client:
+    def __init__(self, server: "StandInServer", protocol: Any):
+        self.server = server
+        self.protocol = protocol
+        self.feeds: Dict[Tuple[str, str], asyncio.Task] = {}
+        self.sequences: Dict[str, int] = {}
+        self.private_channels: Set[str] = set()
+        self.orders: Dict[str, _Order] = {}
+
+    async def send(self, message: Any):
+        await self.protocol.send(orjson.dumps(message).decode())
+
+    async def send_private(self, channel: str, payload: Any):
+        if channel not in self.private_channels:
+            return
+        sequence = self.sequences.get(channel, 0) + 1
+        if self.server.skip_sequences:
+            self.server.skip_sequences -= 1
+            sequence += 1
+        self.sequences[channel] = sequence
+        await self.send([payload, channel, {"sequence": sequence}])
+
+    def stop(self):
+        for task in self.feeds.values():
+            task.cancel()
+        self.feeds.clear()
+
+
+class StandInServer:
+    """
+    :param: rate: Messages per second for each public channel subscription (channel and pair)
+    :param: rates: Per channel name override of `rate`, e.g. {"book": 5000, "ticker": 10}
+    :param: heartbeat_interval: Seconds between heartbeats
+    :param: fill_after: Seconds after which an open order gets filled (ownTrades and closed openOrders update); None never fills
+    """
+
+    def __init__(
+        self,
+        host: str = "127.0.0.1",
+        port: int = 0,
+        *,
+        rate: float = 10.0,
+        rates: Optional[Dict[str, float]] = None,
+        heartbeat_interval: float = 1.0,
+        fill_after: Optional[float] = None,
+        seed: int = 0,
+    ):
+        if websockets is None:
+            raise ImportError("Package `websockets` is required for the stand-in server; install the `asyncio` extra")
+        self.host = host
+        self.port = port
+        self.rate = rate
+        self.rates = rates or {}
+        self.heartbeat_interval = heartbeat_interval
+        self.fill_after = fill_after
+        self.rng = random.Random(seed)
+        self.clients: Set[_Client] = set()
+        self.messages_sent = 0
+        self.skip_sequences = 0
+        self._channel_ids = itertools.count(100)
+        self._prices: Dict[str, float] = {}
+        self._server: Any = None
+        self._loop: Optional[asyncio.AbstractEventLoop] = None
+        self._thread: Optional[threading.Thread] = None
+
+    @property
+    def url(self) -> str:
+        return f"ws://{self.host}:{self.port}"
+
+    async def start(self):
+        self._loop = asyncio.get_running_loop()
+        self._server = await websockets.serve(self._handle, self.host, self.port)
+        self.port = self._server.sockets[0].getsockname()[1]
+        logger.info("[STAND-IN] Listening on %s", self.url)
+
+    async def stop(self):
+        for client in list(self.clients):
+            client.stop()
+        self._server.close()
+        await self._server.wait_closed()
+
+    def start_in_thread(self) -> "StandInServer":
+        """Runs the server on its own event loop thread; returns once it's listening"""
+        started = threading.Event()
+
+        def run():
+            loop = asyncio.new_event_loop()
+            loop.run_until_complete(self.start())
+            started.set()
+            loop.run_forever()
+            loop.run_until_complete(self.stop())
+            loop.close()
+
+        self._thread = threading.Thread(target=run, name="kraken-stand-in", daemon=True)
+        self._thread.start()
+        started.wait()
+        return self
+
+    def stop_thread(self):
+        if self._loop is not None and self._thread is not None:
+            self._loop.call_soon_threadsafe(self._loop.stop)
+            self._thread.join()
+
+    def drop_connections(self):
+        """Closes every client connection (thread safe), e.g. to test reconnection"""
+
+        async def drop():
+            for client in list(self.clients):
+                client.stop()
+                await client.protocol.close(1011, "Stand-in dropping connection")
+
+        assert self._loop is not None
+        asyncio.run_coroutine_threadsafe(drop(), self._loop)
+
+    def skip_sequence(self, count: int = 1):
+        """Next private channel message(s) skip a sequence number, e.g. to test `retry_on_invalid_sequence`"""
+        self.skip_sequences += count
+
+    # Connection handling
+
+    async def _handle(self, protocol: Any, *_: Any):
+        client = _Client(self, protocol)
+        self.clients.add(client)
+        heartbeat = asyncio.create_task(self._heartbeats(client))
+        try:
+            await client.send(
+                {"connectionID": self.rng.getrandbits(64), "event": "systemStatus", "status": "online", "version": "1.9.0"}
+            )
+            async for raw in protocol:
+                try:
+                    request = orjson.loads(raw)
+                except orjson.JSONDecodeError:
+                    await client.send({"event": "error", "errorMessage": "Malformed request", "status": "error"})
+                    continue
+                await self._on_request(client, request)
+        except websockets.ConnectionClosed:
+            pass
+        finally:
+            heartbeat.cancel()
+            client.stop()
+            self.clients.discard(client)
+
+    async def _heartbeats(self, client: _Client):
+        while True:
+            await asyncio.sleep(self.heartbeat_interval)
+            await client.send({"event": "heartbeat"})
+
+    async def _on_request(self, client: _Client, request: Dict[str, Any]):
+        event = request.get("event")
+        reqid = request.get("reqid")
+        if event == "ping":
+            await client.send({"event": "pong", **({"reqid": reqid} if reqid is not None else {})})
+        elif event in ("subscribe", "unsubscribe"):
+            await self._on_subscription(client, request, event == "subscribe")
+        elif event == "addOrder":
+            await self._add_order(client, request)
+        elif event == "cancelOrder":
+            await self._cancel_order(client, request)
+        elif event == "editOrder":
+            await self._edit_order(client, request)
+        else:
+            await client.send({"errorMessage": f"Unsupported event {event}", "event": "error", "reqid": reqid, "status": "error"})
+
+    # Subscriptions
+
+    async def _on_subscription(self, client: _Client, request: Dict[str, Any], subscribe: bool):
+        subscription = dict(request.get("subscription") or {})
+        name = subscription.get("name")
+        reqid = request.get("reqid")
+        status = "subscribed" if subscribe else "unsubscribed"
+        subscription.pop("token", None)
+        if name in PRIVATE_CHANNELS:
+            message = {"channelName": name, "event": "subscriptionStatus", "status": status, "subscription": subscription}
+            if reqid is not None:
+                message["reqid"] = reqid
+            await client.send(message)
+            if subscribe:
+                client.private_channels.add(name)
+                client.sequences[name] = 0
+                snapshot = (
+                    [{o.txid: self._order_details(o, "open")} for o in client.orders.values()]
+                    if name == "openOrders"
+                    else []
+                )
+                await client.send_private(name, snapshot)
+            else:
+                client.private_channels.discard(name)
+            return
+        if name not in PUBLIC_CHANNELS:
+            await client.send({"errorMessage": "Subscription name invalid", "event": "subscriptionStatus", "status": "error", "subscription": subscription})
+            return
+        channel_name = name
+        if name == "ohlc":
+            channel_name = f"ohlc-{subscription.get('interval', 1)}"
+        elif name == "book":
+            channel_name = f"book-{subscription.get('depth', 10)}"
+        for pair in request.get("pair") or []:
+            key = (channel_name, pair)
+            channel_id = next(self._channel_ids)
+            message = {
+                "channelID": channel_id,
+                "channelName": channel_name,
+                "event": "subscriptionStatus",
+                "pair": pair,
+                "status": status,
+                "subscription": subscription,
+            }
+            if reqid is not None:
+                message["reqid"] = reqid
+            if not subscribe and key in client.feeds:
+                client.feeds.pop(key).cancel()
+            await client.send(message)
+            if subscribe and key not in client.feeds:
+                client.feeds[key] = asyncio.create_task(self._feed(client, channel_id, name, channel_name, pair, subscription))
+
+    def _price(self, pair: str) -> float:
+        price = self._prices.get(pair)
+        if price is None:
+            price = self.rng.uniform(1, 1000)
+        price = max(0.05, price * (1 + self.rng.gauss(0, 0.0005)))
+        self._prices[pair] = price
+        return price
+
+    async def _feed(self, client: _Client, channel_id: int, name: str, channel_name: str, pair: str, subscription: Dict[str, Any]):
+        rate = self.rates.get(name, self.rate)
+        book: Optional[_Book] = None
+        if name == "book":
+            book = _Book(self.rng, max(self._price(pair), 1.0), int(subscription.get("depth", 10)))
+            asks, bids = book.sides()
+            timestamp = f"{time.time():.6f}"
+            await client.send(
+                [channel_id, {"as": [[p, v, timestamp] for p, v in asks], "bs": [[p, v, timestamp] for p, v in bids]}, channel_name, pair]
+            )
+        start = time.monotonic()
+        sent = 0
+        # Messages due since the start are sent in bursts, so high rates don't depend on sleep precision
+        while True:
+            due = int((time.monotonic() - start) * rate)
+            while sent < due:
+                await client.send([channel_id, self._payload(name, pair, subscription, book), channel_name, pair])
+                sent += 1
+                self.messages_sent += 1
+            await asyncio.sleep(max(0.001, start + (sent + 1) / rate - time.monotonic()))
+
+    def _payload(self, name: str, pair: str, subscription: Dict[str, Any], book: Optional[_Book]) -> Any:
+        price = self._price(pair)
+        now = time.time()
+        volume = f"{self.rng.uniform(0.01, 10):.8f}"
+        if name == "ticker":
+            return {
+                "a": [f"{price * 1.0001:.5f}", 1, "1.000"],
+                "b": [f"{price * 0.9999:.5f}", 1, "1.000"],
+                "c": [f"{price:.5f}", volume],
+                "v": ["2634.11501494", "3591.17907851"],
+                "p": [f"{price:.5f}", f"{price:.5f}"],
+                "t": [11493, 16267],
+                "l": [f"{price * 0.99:.5f}", f"{price * 0.99:.5f}"],
+                "h": [f"{price * 1.01:.5f}", f"{price * 1.01:.5f}"],
+                "o": [f"{price:.5f}", f"{price:.5f}"],
+            }
+        if name == "trade":
+            return [[f"{price:.5f}", volume, f"{now:.6f}", self.rng.choice("bs"), self.rng.choice("lm"), ""]]
+        if name == "spread":
+            return [f"{price * 0.9999:.5f}", f"{price * 1.0001:.5f}", f"{now:.6f}", volume, volume]
+        if name == "ohlc":
+            interval = int(subscription.get("interval", 1)) * 60
+            end = (now // interval + 1) * interval
+            return [f"{now:.6f}", f"{end:.6f}", f"{price:.5f}", f"{price * 1.001:.5f}", f"{price * 0.999:.5f}", f"{price:.5f}", f"{price:.5f}", volume, 1]
+        assert book is not None
+        return book.update(f"{now:.6f}")
+
+    # Orders
+
+    @staticmethod
+    def _order_details(order: _Order, status: str) -> Dict[str, Any]:
+        return {
+            "avg_price": "0.00000000",
+            "cost": "0.00000000",
+            "descr": {
+                "close": None,
+                "leverage": None,
+                "order": order.description(),
+                "ordertype": order.ordertype,
+                "pair": order.pair,
+                "price": order.price,
+                "price2": order.price2,
+                "type": order.side,
+            },
+            "expiretm": None,
+            "fee": "0.00000000",
+            "limitprice": "0.00000000",
+            "misc": "",
+            "oflags": order.oflags,
+            "opentm": f"{time.time():.6f}",
+            "refid": None,
+            "starttm": None,
+            "status": status,
+            "stopprice": "0.00000000",
+            "timeinforce": "GTC",
+            "userref": order.userref,
+            "vol": order.volume,
+            "vol_exec": "0.00000000",
+        }
+
+    async def _add_order(self, client: _Client, request: Dict[str, Any]):
+        reqid = request.get("reqid")
+        missing = [field for field in ("ordertype", "type", "volume", "pair") if not request.get(field)]
+        if missing:
+            await client.send({"errorMessage": f"Missing {missing[0]}", "event": "addOrderStatus", "reqid": reqid, "status": "error"})
+            return
+        order = _Order(
+            txid=_txid(self.rng, "O"),
+            pair=request["pair"],
+            side=request["type"],
+            ordertype=request["ordertype"],
+            price=f"{float(request.get('price') or 0):.8f}",
+            price2=f"{float(request.get('price2') or 0):.8f}",
+            volume=f"{float(request['volume']):.8f}",
+            userref=int(request.get("userref") or 0),
+            oflags=request.get("oflags") or "fciq",
+        )
+        client.orders[order.txid] = order
+        await client.send({"descr": order.description(), "event": "addOrderStatus", "reqid": reqid, "status": "ok", "txid": order.txid})
+        await client.send_private("openOrders", [{order.txid: self._order_details(order, "pending")}])
+        await client.send_private("openOrders", [{order.txid: {"status": "open", "userref": order.userref}}])
+        if self.fill_after is not None:
+            asyncio.get_running_loop().call_later(self.fill_after, lambda: asyncio.ensure_future(self._fill(client, order.txid)))
+
+    async def _fill(self, client: _Client, txid: str):
+        order = client.orders.pop(txid, None)
+        if order is None:
+            return
+        cost = f"{float(order.price) * float(order.volume):.8f}"
+        await client.send_private(
+            "ownTrades",
+            [{_txid(self.rng, "T"): {
+                "cost": cost, "fee": "0.00000000", "margin": "0.00000000", "ordertxid": txid, "ordertype": order.ordertype,
+                "pair": order.pair, "postxid": _txid(self.rng, "T"), "price": order.price, "time": f"{time.time():.6f}",
+                "type": order.side, "vol": order.volume,
+            }}],
+        )
+        await client.send_private(
+            "openOrders",
+            [{txid: {"avg_price": order.price, "cost": cost, "fee": "0.00000000", "status": "closed", "userref": order.userref,
+                     "vol_exec": order.volume}}],
+        )
+
+    async def _cancel_order(self, client: _Client, request: Dict[str, Any]):
+        reqid = request.get("reqid")
+        txids = request.get("txid") or []
+        unknown = [txid for txid in txids if txid not in client.orders]
+        if unknown:
+            await client.send({"errorMessage": "EOrder:Unknown order", "event": "cancelOrderStatus", "reqid": reqid, "status": "error"})
+            return
+        await client.send({"event": "cancelOrderStatus", "reqid": reqid, "status": "ok"})
+        for txid in txids:
+            order = client.orders.pop(txid)
+            await client.send_private("openOrders", [{txid: {"lastupdated": f"{time.time():.6f}", "status": "canceled", "vol_exec": "0.00000000",
+                                                             "cost": "0.00000000", "fee": "0.00000000", "avg_price": "0.00000000",
+                                                             "userref": order.userref, "cancel_reason": "User requested"}}])
+
+    async def _edit_order(self, client: _Client, request: Dict[str, Any]):
+        reqid = request.get("reqid")
+        original = client.orders.pop(request.get("orderid", ""), None)
+        if original is None:
+            await client.send({"errorMessage": "EOrder:Unknown order", "event": "editOrderStatus", "reqid": reqid, "status": "error"})
+            return
+        order = dataclasses.replace(
+            original,
+            txid=_txid(self.rng, "O"),
+            price=f"{float(request['price']):.8f}" if request.get("price") else original.price,
+            price2=f"{float(request['price2']):.8f}" if request.get("price2") else original.price2,
+            volume=f"{float(request['volume']):.8f}" if request.get("volume") else original.volume,
+        )
+        client.orders[order.txid] = order
+        await client.send(
+            {"descr": order.description(), "event": "editOrderStatus", "originaltxid": original.txid, "reqid": reqid, "status": "ok", "txid": order.txid}
+        )
+        await client.send_private("openOrders", [{original.txid: {"status": "canceled", "userref": original.userref, "cancel_reason": "Order replaced"}}])
+        await client.send_private("openOrders", [{order.txid: self._order_details(order, "open")}])
+
+
+__all__ = [
+    "StandInServer",
+    "book_checksum",
+]
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.split("\n\n")[0])
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=8765)
+    parser.add_argument("--rate", type=float, default=10.0, help="Messages per second per public subscription")
+    parser.add_argument("--rates", default="", help="Per channel rates, e.g. book=5000,ticker=10")
+    parser.add_argument("--fill-after", type=float, default=None, help="Seconds after which orders get filled")
+    parser.add_argument("--seed", type=int, default=0)
+    args = parser.parse_args()
+    rates = {name: float(rate) for name, rate in (item.split("=") for item in args.rates.split(",") if item)}
+    server = StandInServer(args.host, args.port, rate=args.rate, rates=rates, fill_after=args.fill_after, seed=args.seed)
+
+    async def serve():
+        await server.start()
+        await asyncio.Future()
+
+    try:
+        asyncio.run(serve())
+    except KeyboardInterrupt:
+        pass
+
+
+if __name__ == "__main__":
+    main()
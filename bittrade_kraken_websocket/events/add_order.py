@@ -12,6 +12,7 @@ from reactivex.disposable import CompositeDisposable
 from expression import Option, curry_flip
 
 from bittrade_kraken_websocket.connection import EnhancedWebsocket
+from bittrade_kraken_websocket.connection.outbound import PRIORITY_ORDER
 from bittrade_kraken_websocket.events.events import EventName
 from bittrade_kraken_websocket.events.models.order import (
     Order,
@@ -25,6 +26,7 @@ from bittrade_kraken_websocket.events.request_response import (
     wait_for_response,
     response_ok,
 )
+from bittrade_kraken_websocket.events.templates import encode_request
 
 logger = getLogger(__name__)
 
@@ -47,6 +49,10 @@ class AddOrderRequest:
     userref: str = "1"
 
 
+# Fields that change from one order to the next; the others are pre-encoded
+ADD_ORDER_VARIABLES = ("price", "volume", "reqid")
+
+
 class AddOrderResponse(TypedDict):
     descr: str
     status: Literal["ok", "error"]
@@ -155,7 +161,9 @@ def create_order_lifecycle(
             map_response_to_order(request),
             operators.flat_map(initial_order_received),
         )
-        connection.send_json(dataclasses.asdict(request))  # type: ignore
+        connection.send_bytes(
+            encode_request(request, connection.token, ADD_ORDER_VARIABLES), PRIORITY_ORDER
+        )
         return CompositeDisposable(
             obs.subscribe(observer, scheduler=scheduler), sub
         )
@@ -182,4 +190,4 @@ def add_order_factory(
     return add_order
 
 
-__all__ = ["AddOrderError", "AddOrderRequest", "AddOrderResponse", "add_order_factory"]
+__all__ = ["ADD_ORDER_VARIABLES", "AddOrderError", "AddOrderRequest", "AddOrderResponse", "add_order_factory"]
@@ -10,6 +10,7 @@ from reactivex.disposable import CompositeDisposable
 from expression import Option
 
 from bittrade_kraken_websocket.connection import EnhancedWebsocket
+from bittrade_kraken_websocket.connection.outbound import PRIORITY_CANCEL
 from bittrade_kraken_websocket.events.events import EventName
 from bittrade_kraken_websocket.events.models.order import (
     Order,
@@ -19,6 +20,7 @@ from bittrade_kraken_websocket.events.request_response import (
     wait_for_response,
     response_ok,
 )
+from bittrade_kraken_websocket.events.templates import encode_request
 
 logger = getLogger(__name__)
 
@@ -34,6 +36,9 @@ class CancelOrderRequest:
     event: EventName = EventName.EVENT_CANCEL_ORDER
 
 
+CANCEL_ORDER_VARIABLES = ("txid", "reqid")
+
+
 class CancelOrderResponse(TypedDict):
     descr: str
     status: Literal["ok", "error"]
@@ -54,7 +59,9 @@ def cancel_order_lifecycle(
             wait_for_response(request.reqid, 5.0),
             response_ok(),
         )
-        connection.send_json(dataclasses.asdict(request))  # type: ignore
+        connection.send_bytes(
+            encode_request(request, connection.token, CANCEL_ORDER_VARIABLES), PRIORITY_CANCEL
+        )
         return CompositeDisposable(
             obs.subscribe(observer, scheduler=scheduler), 
             sub
@@ -83,6 +90,7 @@ def cancel_order_factory(
 
 
 __all__ = [
+    "CANCEL_ORDER_VARIABLES",
     "CancelOrderError",
     "CancelOrderRequest",
     "CancelOrderResponse",
@@ -10,6 +10,7 @@ from reactivex.disposable import CompositeDisposable
 from expression import Option
 
 from bittrade_kraken_websocket.connection import EnhancedWebsocket
+from bittrade_kraken_websocket.connection.outbound import PRIORITY_ORDER
 from bittrade_kraken_websocket.events.events import EventName
 from bittrade_kraken_websocket.events.models.order import (
     Order,
@@ -19,6 +20,7 @@ from bittrade_kraken_websocket.events.request_response import (
     wait_for_response,
     response_ok,
 )
+from bittrade_kraken_websocket.events.templates import encode_request
 
 logger = getLogger(__name__)
 
@@ -37,6 +39,9 @@ class EditOrderRequest:
     event: EventName = EventName.EVENT_EDIT_ORDER
 
 
+EDIT_ORDER_VARIABLES = ("orderid", "volume", "price", "price2", "reqid")
+
+
 class EditOrderResponse(TypedDict):
     txid: str # new order id
     originaltxid: str
@@ -59,7 +64,10 @@ def edit_order_lifecycle(
             wait_for_response(request.reqid, 30.0),
             response_ok(),
         )
-        connection.send_json(dataclasses.asdict(request, dict_factory=lambda x: {k: v for (k, v) in x if v is not None and v != ""}))  # type: ignore
+        # Empty fields are left out
+        connection.send_bytes(
+            encode_request(request, connection.token, EDIT_ORDER_VARIABLES, drop_empty=True), PRIORITY_ORDER
+        )
         return CompositeDisposable(
             obs.subscribe(observer, scheduler=scheduler), 
             sub
@@ -89,6 +97,7 @@ def edit_order_factory(
 
 
 __all__ = [
+    "EDIT_ORDER_VARIABLES",
     "EditOrderRequest",
     "EditOrderResponse",
     "edit_order_factory",
@@ -1,17 +1,25 @@
 import uuid
 from typing import Callable, Dict, List, Optional, Any
 
+import reactivex
 from reactivex import Observable, operators, Observer, compose
 from reactivex.abc import ObserverBase, SchedulerBase
 from reactivex.operators import do_action, take
 
 from logging import getLogger
 
+from bittrade_kraken_websocket.metrics import registry
+
 logger = getLogger(__name__)
 
 EventCaller = Callable[[Dict, int], Observable]
 
 
+def _timed_out(_: Any) -> Observable:
+    registry.increment("request_timeouts_total")
+    return reactivex.throw(Exception("Timeout"))
+
+
 def wait_for_response(is_match: Callable[[Any], bool] | int, timeout: float) -> Callable[[Observable[Dict | List]], Observable[Dict]]:
     if type(is_match) == int:
         is_match = build_matcher(is_match)
@@ -19,7 +27,7 @@ def wait_for_response(is_match: Callable[[Any], bool] | int, timeout: float) ->
         operators.filter(is_match),
         operators.do_action(on_next=lambda x: logger.debug('[SOCKET] Received matching message')),
         operators.take(1),
-        operators.timeout(timeout),
+        operators.timeout(timeout, reactivex.defer(_timed_out)),
     )
 
 
@@ -31,7 +39,7 @@ def request_response_factory(send_request: Callable[[int], None], id_generator:
     on subscribe it calls `send_request` with the id of the request as argument.
     when a message is found in the `messages` stream that matches the id, it is emitted and the observable then completes
 
-    :param send_request: A function that should send out the request on subscribe. Typically, lambda request_id: websocket.send_json(...)
+    :param send_request: A function that should send out the request on subscribe. Typically, lambda request_id: websocket.send(...)
     :param id_generator: An observable sequence of ids. Defaults to ids.id_generator which provides a (pretty unique) uuid1 based int. `.run()` is used on it, so it will block the current thread
     :param messages: The observable sequence of socket messages. It must contain at least the event messages (so cannot be limited to channel messages)
     :param timeout: Timeout in seconds
@@ -0,0 +1,107 @@
+import dataclasses
+import operator
+import re
+from typing import Any, Callable, Dict, Hashable, Iterable, List, Optional, Tuple
+
+import orjson
+
+# Control characters are always escaped by orjson, so placeholders can't be confused with real values
+_PLACEHOLDER = "\x00{}\x00"
+_PLACEHOLDER_PATTERN = re.compile(rb'"\\u0000(\w+)\\u0000"')
+
+
+class _Compiled:
+    __slots__ = ("head", "tail")
+
+    def __init__(self, payload: Dict[str, Any]):
+        parts = _PLACEHOLDER_PATTERN.split(orjson.dumps(payload))
+        self.head: bytes = parts[0]
+        # (variable name, fixed bytes that follow it)
+        self.tail: List[Tuple[str, bytes]] = [
+            (name.decode(), chunk) for name, chunk in zip(parts[1::2], parts[2::2])
+        ]
+
+    def render(self, values: Dict[str, Any]) -> bytes:
+        out = [self.head]
+        dumps = orjson.dumps
+        for name, chunk in self.tail:
+            out += (dumps(values[name]), chunk)
+        return b"".join(out)
+
+
+class Template:
+    """JSON frame whose fixed parts are encoded once; `render` only encodes the variable fields and splices them in.
+
+    Renders the same bytes as `EnhancedWebsocket.send_json` would send for the same payload, token included
+    (it goes into `subscription` for subscriptions, at the top level otherwise)
+    """
+
+    def __init__(self, payload: Dict[str, Any], variables: Iterable[str] = ()):
+        self._marked = {
+            key: (_PLACEHOLDER.format(key) if key in variables else value) for key, value in payload.items()
+        }
+        self._public = _Compiled(self._marked)
+        self._private: Optional[_Compiled] = None
+
+    def render(self, token: str = "", **values: Any) -> bytes:
+        if not token:
+            return self._public.render(values)
+        if self._private is None:
+            with_token = dict(self._marked)
+            if "subscription" in with_token:
+                with_token["subscription"] = {**with_token["subscription"], "token": _PLACEHOLDER.format("token")}
+            else:
+                with_token["token"] = _PLACEHOLDER.format("token")
+            self._private = _Compiled(with_token)
+        values["token"] = token
+        return self._private.render(values)
+
+
+_layouts: Dict[Hashable, Tuple[Tuple[str, ...], Callable[[Any], Any]]] = {}
+_templates_cache: Dict[Hashable, Template] = {}
+MAX_CACHED_TEMPLATES = 1024
+
+
+def _layout(cls: type, variables: Tuple[str, ...]) -> Tuple[Tuple[str, ...], Callable[[Any], Any]]:
+    names = tuple(field.name for field in dataclasses.fields(cls))
+    fixed = tuple(name for name in names if name not in variables)
+    # attrgetter with a single name doesn't return a tuple
+    return names, operator.attrgetter(*fixed) if len(fixed) > 1 else (lambda request: tuple(getattr(request, name) for name in fixed))
+
+
+def encode_request(request: Any, token: str = "", variables: Tuple[str, ...] = ("reqid",), drop_empty: bool = False) -> bytes:
+    """Encodes a request dataclass (e.g. AddOrderRequest) like `dataclasses.asdict` + `send_json` would, without going through a dict.
+    Templates are cached by request type and value of the fields not listed in `variables`, so requests that only differ by
+    variable fields (reqid, price, volume...) share the same pre-encoded bytes.
+    With `drop_empty`, fields that are None or "" are left out"""
+    cls = type(request)
+    layout_key = (cls, variables)
+    layout = _layouts.get(layout_key)
+    if layout is None:
+        layout = _layouts[layout_key] = _layout(cls, variables)
+    names, get_fixed = layout
+    values = {name: getattr(request, name) for name in variables}
+    key: Tuple[Any, ...] = (layout_key, get_fixed(request))
+    if drop_empty:
+        key += tuple(value is not None and value != "" for value in values.values())
+    try:
+        template = _templates_cache.get(key)
+    except TypeError:  # unhashable fixed field, e.g. a list that should have been listed in `variables`
+        template = None
+        key = None
+    if template is None:
+        payload = {name: getattr(request, name) for name in names}
+        if drop_empty:
+            payload = {name: value for name, value in payload.items() if value is not None and value != ""}
+        template = Template(payload, variables)
+        if key is not None:
+            if len(_templates_cache) >= MAX_CACHED_TEMPLATES:
+                _templates_cache.clear()
+            _templates_cache[key] = template
+    return template.render(token, **values)
+
+
+__all__ = [
+    "Template",
+    "encode_request",
+]
@@ -0,0 +1,45 @@
+from typing import Literal
+
+from .heartbeat import HEARTBEAT, HEARTBEAT_BYTES
+
+FRAME_HEARTBEAT = "FRAME_HEARTBEAT"
+FRAME_STATUS = "FRAME_STATUS"
+FRAME_CHANNEL = "FRAME_CHANNEL"
+FRAME_EVENT = "FRAME_EVENT"
+FrameKind = Literal["FRAME_HEARTBEAT", "FRAME_STATUS", "FRAME_CHANNEL", "FRAME_EVENT"]
+
+_SYSTEM_STATUS = '"event":"systemStatus"'
+_SYSTEM_STATUS_BYTES = _SYSTEM_STATUS.encode()
+
+
+def classify_frame(message: bytes | str) -> FrameKind:
+    """Tells what a raw frame is without decoding it.
+
+    Relies on Kraken's framing: channel messages are json arrays while events (heartbeat, systemStatus, subscriptionStatus, order responses...) are objects.
+    Heartbeats are always sent in the exact same compact form.
+    """
+    if type(message) == str:
+        if message == HEARTBEAT:
+            return FRAME_HEARTBEAT
+        if message[:1] == "[":
+            return FRAME_CHANNEL
+        if _SYSTEM_STATUS in message:
+            return FRAME_STATUS
+        return FRAME_EVENT
+    if message == HEARTBEAT_BYTES:
+        return FRAME_HEARTBEAT
+    if message[:1] == b"[":
+        return FRAME_CHANNEL
+    if _SYSTEM_STATUS_BYTES in message:
+        return FRAME_STATUS
+    return FRAME_EVENT
+
+
+__all__ = [
+    "FRAME_CHANNEL",
+    "FRAME_EVENT",
+    "FRAME_HEARTBEAT",
+    "FRAME_STATUS",
+    "FrameKind",
+    "classify_frame",
+]
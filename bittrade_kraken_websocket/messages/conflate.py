@@ -0,0 +1,100 @@
+from logging import getLogger
+from threading import Lock
+from typing import Any, Callable, Dict, Hashable, Optional, TypeVar
+
+from reactivex import Observable
+from reactivex.abc import ObserverBase, SchedulerBase
+from reactivex.disposable import CompositeDisposable, Disposable
+from reactivex.scheduler import EventLoopScheduler
+
+from bittrade_kraken_websocket.messages.filters.kind import public_channel_key
+
+logger = getLogger(__name__)
+
+_T = TypeVar("_T")
+
+_SINGLE_SLOT = object()
+
+
+def latest_key(value: Any) -> Hashable:
+    """Default key of `conflate_latest`:
+    the pair for (pair, payload) tuples of multi-pair subscriptions, (channel name, pair) for raw public channel messages,
+    a single slot for anything else (e.g. payloads of a single pair subscription)"""
+    if type(value) == tuple:
+        return value[0]
+    return public_channel_key(value) or _SINGLE_SLOT
+
+
+def conflate_latest(
+    key: Callable[[_T], Hashable] = latest_key, scheduler: Optional[SchedulerBase] = None
+) -> Callable[[Observable[_T]], Observable[_T]]:
+    """Keeps one slot per key and only delivers the newest value of each key, as soon as the observer is done with the previous one.
+    Values that arrive while the observer is busy overwrite the pending value of their key instead of queuing up,
+    and keys are delivered in the order they first became pending.
+
+    The observer is called on `scheduler`, by default a thread dedicated to the subscription.
+    Meant for streams where only the latest state matters, like `subscribe_ticker` and `subscribe_spread`.
+    """
+
+    def _conflate_latest(source: Observable[_T]) -> Observable[_T]:
+        def subscribe(observer: ObserverBase[_T], scheduler_: Optional[SchedulerBase] = None):
+            lock = Lock()
+            _scheduler = scheduler or EventLoopScheduler()
+            # Insertion ordered: overwriting a pending key keeps its place, so there is nothing allocated per value
+            pending: Dict[Hashable, _T] = {}
+            state = {"draining": False, "terminal": None}
+
+            def drain(*_: Any):
+                while True:
+                    with lock:
+                        if not pending:
+                            terminal = state["terminal"]
+                            if terminal is None:
+                                state["draining"] = False
+                                return
+                            break
+                        value = pending.pop(next(iter(pending)))
+                    try:
+                        observer.on_next(value)
+                    except:
+                        logger.exception("[CONFLATE] Error in observer")
+                terminal()  # type: ignore
+
+            def schedule_drain():
+                # Called with the lock held
+                if not state["draining"]:
+                    state["draining"] = True
+                    _scheduler.schedule(drain)
+
+            def on_next(value: _T):
+                k = key(value)
+                with lock:
+                    pending[k] = value
+                    schedule_drain()
+
+            def on_terminal(terminal: Callable[[], None]):
+                with lock:
+                    state["terminal"] = terminal
+                    schedule_drain()
+
+            disposables = [
+                source.subscribe(
+                    on_next=on_next,
+                    on_error=lambda error: on_terminal(lambda: observer.on_error(error)),
+                    on_completed=lambda: on_terminal(observer.on_completed),
+                    scheduler=scheduler_,
+                )
+            ]
+            if scheduler is None:
+                disposables.append(Disposable(_scheduler.dispose))  # type: ignore
+            return CompositeDisposable(*disposables)
+
+        return Observable(subscribe)
+
+    return _conflate_latest
+
+
+__all__ = [
+    "conflate_latest",
+    "latest_key",
+]
@@ -1,17 +1,37 @@
-from reactivex import operators
-from typing import TYPE_CHECKING
+from reactivex import compose, operators
+from typing import TYPE_CHECKING, Any, Optional, Sequence, Tuple
 
 if TYPE_CHECKING:
     from bittrade_kraken_websocket.channels import ChannelName
 
 
-def _is_channel_message(channel: "ChannelName", pair: str = "", subscription_keywords=None):
-    channel_name =channel.value
+def channel_name_for(channel: "ChannelName", subscription_keywords=None) -> str:
+    """Name used by Kraken in channel messages; some channels embed a subscription parameter, e.g. ohlc-15 or book-25"""
+    channel_name = channel.value
     if channel_name == "ohlc":
         channel_name = f"ohlc-{(subscription_keywords or {}).get('interval', 1)}"
+    elif channel_name == "book":
+        channel_name = f"book-{(subscription_keywords or {}).get('depth', 10)}"
+    return channel_name
+
+
+def public_channel_key(message: Any) -> Optional[Tuple[str, str]]:
+    """(channel name, pair) of a public channel message, None for anything else (including private channel messages)"""
+    if not isinstance(message, list) or len(message) < 3:
+        return None
+    channel_name, pair = message[-2], message[-1]
+    if type(channel_name) != str or type(pair) != str:
+        return None
+    return channel_name, pair
+
+
+def _is_channel_message(channel: "ChannelName", pair: str | Sequence[str] = "", subscription_keywords=None):
+    channel_name = channel_name_for(channel, subscription_keywords)
+    if not isinstance(pair, str):
+        return _is_channel_message_for_pairs(channel_name, frozenset(pair))
     # Channel messages have at least 3 length and come with second to last as channel name
     def func(x):
-        if type(x) != list or len(x) < 3 or x[-2] != channel_name:
+        if not isinstance(x, list) or len(x) < 3 or x[-2] != channel_name:
             return False
         if not pair:
             return True
@@ -20,5 +40,23 @@ def _is_channel_message(channel: "ChannelName", pair: str = "", subscription_key
     return func
 
 
-def keep_channel_messages(channel: "ChannelName", pair: str = "", subscription_keywords=None):
+def _is_channel_message_for_pairs(channel_name: str, pairs: frozenset):
+    def func(x):
+        if not isinstance(x, list) or len(x) < 3 or x[-2] != channel_name:
+            return False
+        return type(x[-1]) == str and x[-1] in pairs
+
+    return func
+
+
+def keep_channel_messages(channel: "ChannelName", pair: str | Sequence[str] = "", subscription_keywords=None):
     return operators.filter(_is_channel_message(channel, pair, subscription_keywords))
+
+
+def keep_channel_messages_batched(channel: "ChannelName", pair: str | Sequence[str] = "", subscription_keywords=None):
+    """Batch counterpart of `keep_channel_messages`; batches left without any message of the channel are dropped"""
+    func = _is_channel_message(channel, pair, subscription_keywords)
+    return compose(
+        operators.map(lambda batch: [x for x in batch if func(x)]),
+        operators.filter(bool),
+    )
@@ -0,0 +1,152 @@
+from logging import getLogger
+from threading import RLock
+from typing import Callable, Dict, List, Optional, Sequence, Set, Tuple
+
+from reactivex import Observable
+from reactivex.abc import DisposableBase, ObserverBase, SchedulerBase
+from reactivex.disposable import Disposable
+
+logger = getLogger(__name__)
+
+RouteKey = Tuple[str, str]  # channel name as sent by Kraken (e.g. "ticker", "ohlc-5"), pair ("" for any pair)
+
+
+class ChannelRouter(Observable[Dict | List]):
+    """Demultiplexes a shared messages stream by (channel name, pair).
+
+    Each incoming channel message is looked up once in a dictionary of routes and only handed to the observers
+    that asked for its channel/pair, so the cost per message does not grow with the number of subscriptions
+    (unlike piping the messages stream into one `keep_channel_messages` filter per subscription).
+
+    The router itself is an Observable of all messages, which means it can be passed wherever a `messages`
+    observable is expected; `subscribe_to_channel` detects it and uses the routes instead of a filter.
+
+    The source is subscribed to once, when the first observer (routed or not) subscribes,
+    and released when the last one leaves.
+    """
+
+    def __init__(self, source: Observable[Dict | List]):
+        super().__init__()
+        self._source = source
+        self._lock = RLock()
+        # Routes and passthrough observers are replaced (never mutated) on change so that dispatching
+        # on the socket thread can read them without taking the lock
+        self._routes: Dict[RouteKey, Tuple[ObserverBase, ...]] = {}
+        self._passthrough: Tuple[ObserverBase, ...] = ()
+        # One token per subscription still in place (routed for no pair at all included), cleared when the source terminates
+        self._active: Set[object] = set()
+        self._subscription: Optional[DisposableBase] = None
+
+    @property
+    def routes_count(self) -> int:
+        return len(self._routes)
+
+    def wants(self, channel_name: str, pair: str) -> bool:
+        """Whether a message of that channel and pair would reach any observer"""
+        routes = self._routes
+        return bool(self._passthrough) or (channel_name, pair) in routes or (channel_name, "") in routes
+
+    def channel(self, channel_name: str, pair: str | Sequence[str] = "") -> Observable[Dict | List]:
+        """Observable of the messages for a given channel name and pair(s); an empty pair means all pairs"""
+        pairs = [pair] if isinstance(pair, str) else list(dict.fromkeys(pair))
+        keys = tuple((channel_name, p) for p in pairs)
+
+        def subscribe(observer: ObserverBase, scheduler: Optional[SchedulerBase] = None):
+            return self._add(observer, keys)
+
+        return Observable(subscribe)
+
+    def _subscribe_core(self, observer: ObserverBase, scheduler: Optional[SchedulerBase] = None):
+        return self._add(observer, None)
+
+    def _add(self, observer: ObserverBase, keys: Optional[Tuple[RouteKey, ...]]) -> DisposableBase:
+        with self._lock:
+            if keys is None:
+                self._passthrough = self._passthrough + (observer,)
+            else:
+                routes = dict(self._routes)
+                for key in keys:
+                    routes[key] = routes.get(key, ()) + (observer,)
+                self._routes = routes
+            token = object()
+            self._active.add(token)
+            if self._subscription is None:
+                self._subscription = self._source.subscribe(
+                    on_next=self._dispatch,
+                    on_error=self._on_error,
+                    on_completed=self._on_completed,
+                )
+
+        return Disposable(lambda: self._remove(observer, keys, token))
+
+    def _remove(self, observer: ObserverBase, keys: Optional[Tuple[RouteKey, ...]], token: object):
+        subscription = None
+        with self._lock:
+            if token not in self._active:
+                return
+            self._active.discard(token)
+            if keys is None:
+                self._passthrough = tuple(o for o in self._passthrough if o is not observer)
+            else:
+                routes = dict(self._routes)
+                for key in keys:
+                    remaining = tuple(o for o in routes.get(key, ()) if o is not observer)
+                    if remaining:
+                        routes[key] = remaining
+                    else:
+                        routes.pop(key, None)
+                self._routes = routes
+            if not self._active:
+                subscription, self._subscription = self._subscription, None
+        if subscription is not None:
+            subscription.dispose()
+
+    def _dispatch(self, message: Dict | List):
+        routes = self._routes
+        # Channel messages have at least 3 length and come with second to last as channel name
+        # Public channels end with the pair while private ones end with a {"sequence": ...} dict
+        if routes and isinstance(message, list) and len(message) > 2:
+            channel_name = message[-2]
+            if type(channel_name) == str:
+                pair = message[-1]
+                if type(pair) == str:
+                    for observer in routes.get((channel_name, pair), ()):
+                        observer.on_next(message)
+                for observer in routes.get((channel_name, ""), ()):
+                    observer.on_next(message)
+        for observer in self._passthrough:
+            observer.on_next(message)
+
+    def _release_all(self) -> Tuple[ObserverBase, ...]:
+        with self._lock:
+            # An observer routed for several pairs must only be notified once
+            observers = tuple(dict.fromkeys(
+                self._passthrough + tuple(o for observers in self._routes.values() for o in observers)
+            ))
+            self._routes = {}
+            self._passthrough = ()
+            self._active = set()
+            self._subscription = None
+        return observers
+
+    def _on_error(self, error: Exception):
+        for observer in self._release_all():
+            observer.on_error(error)
+
+    def _on_completed(self):
+        for observer in self._release_all():
+            observer.on_completed()
+
+
+def route_channels() -> Callable[[Observable[Dict | List]], ChannelRouter]:
+    """Turns a messages observable into a ChannelRouter; best used on the shared messages stream
+
+    messages = socket_connection.pipe(keep_messages_only(), route_channels())
+    """
+    return ChannelRouter
+
+
+__all__ = [
+    "ChannelRouter",
+    "route_channels",
+]
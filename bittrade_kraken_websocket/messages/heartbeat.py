@@ -1,8 +1,9 @@
 from reactivex import operators
 
 HEARTBEAT = '{"event":"heartbeat"}'
+HEARTBEAT_BYTES = HEARTBEAT.encode()
 
 def _is_not_heartbeat(m: str):
     return m != HEARTBEAT
 def ignore_heartbeat():
-    return operators.filter(_is_not_heartbeat)
\ No newline at end of file
+    return operators.filter(_is_not_heartbeat)
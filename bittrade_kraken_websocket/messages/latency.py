@@ -0,0 +1,214 @@
+import time
+from typing import Any, Callable, Dict, List, Optional
+
+from reactivex import Observable, operators
+
+from bittrade_kraken_websocket.messages.timestamps import Stamped, StampedMessage
+
+# Log-linear buckets: values below 2**SUB_BUCKET_BITS are exact, above that each power of 2 is split in 2**SUB_BUCKET_BITS buckets (~3% precision)
+SUB_BUCKET_BITS = 5
+_SUB_BUCKETS = 1 << SUB_BUCKET_BITS
+# Values are clamped to about 18 minutes (in ns)
+_MAX_VALUE = (1 << 40) - 1
+
+
+def _bucket_index(value: int) -> int:
+    if value < _SUB_BUCKETS:
+        return value
+    shift = value.bit_length() - SUB_BUCKET_BITS - 1
+    return _SUB_BUCKETS + shift * _SUB_BUCKETS + (value >> shift) - _SUB_BUCKETS
+
+
+def _bucket_value(index: int) -> int:
+    """Middle of the bucket"""
+    if index < _SUB_BUCKETS:
+        return index
+    shift, sub = divmod(index - _SUB_BUCKETS, _SUB_BUCKETS)
+    low = (sub + _SUB_BUCKETS) << shift
+    return low + ((1 << shift) >> 1)
+
+
+class LatencyHistogram:
+    """Fixed-size histogram of durations in ns; recording is constant time and allocation free.
+    Negative values (e.g. clocks out of sync) are counted as 0"""
+
+    def __init__(self):
+        self._counts: List[int] = [0] * (_bucket_index(_MAX_VALUE) + 1)
+        self.count = 0
+        self.total = 0
+        self.min: Optional[int] = None
+        self.max: Optional[int] = None
+
+    def record(self, value: int):
+        if value < 0:
+            value = 0
+        elif value > _MAX_VALUE:
+            value = _MAX_VALUE
+        self._counts[_bucket_index(value)] += 1
+        self.count += 1
+        self.total += value
+        if self.min is None or value < self.min:
+            self.min = value
+        if self.max is None or value > self.max:
+            self.max = value
+
+    @property
+    def mean(self) -> float:
+        return self.total / self.count if self.count else 0.0
+
+    def percentile(self, percent: float) -> int:
+        """Approximate value below which `percent`% of the recorded values are"""
+        if not self.count:
+            return 0
+        rank = max(1, int(self.count * percent / 100 + 0.5))
+        seen = 0
+        for index, count in enumerate(self._counts):
+            seen += count
+            if seen >= rank:
+                return min(max(_bucket_value(index), self.min), self.max)  # type: ignore
+        return self.max  # type: ignore
+
+    def merge(self, other: "LatencyHistogram"):
+        for index, count in enumerate(other._counts):
+            if count:
+                self._counts[index] += count
+        self.count += other.count
+        self.total += other.total
+        for value in (other.min, other.max):
+            if value is not None:
+                self.min = value if self.min is None else min(self.min, value)
+                self.max = value if self.max is None else max(self.max, value)
+
+    def reset(self):
+        self.__init__()
+
+    def snapshot(self) -> Dict[str, float]:
+        return {
+            "count": self.count,
+            "mean": self.mean,
+            "min": self.min or 0,
+            "p50": self.percentile(50),
+            "p90": self.percentile(90),
+            "p99": self.percentile(99),
+            "p999": self.percentile(99.9),
+            "max": self.max or 0,
+        }
+
+
+def _seconds_to_ns(value: str | float) -> int:
+    return int(float(value) * 1e9)
+
+
+def _trade_time(message: List) -> int:
+    # [channelID, [[price, volume, time, side, orderType, misc], ...], "trade", pair]
+    return _seconds_to_ns(message[1][-1][2])
+
+
+def _spread_time(message: List) -> int:
+    # [channelID, [bid, ask, timestamp, bidVolume, askVolume], "spread", pair]
+    return _seconds_to_ns(message[1][2])
+
+
+def _ohlc_time(message: List) -> int:
+    # [channelID, [time, etime, open, high, low, close, vwap, volume, count], "ohlc-5", pair]
+    return _seconds_to_ns(message[1][0])
+
+
+def _book_time(message: List) -> int:
+    # [channelID, {"a": [[price, volume, timestamp], ...], "b": [...]}, (second dict), "book-10", pair]
+    return max(
+        _seconds_to_ns(level[2])
+        for side in message[1:-2]
+        for key in ("a", "b", "as", "bs")
+        for level in side.get(key, ())
+    )
+
+
+def _own_trades_time(message: List) -> int:
+    # [[{trade id: {"time": ...}}, ...], "ownTrades", {"sequence": n}]
+    return max(_seconds_to_ns(trade["time"]) for entry in message[0] for trade in entry.values())
+
+
+# Exchange time (ns since epoch) of a channel message, by channel name (without its parameter, e.g. "ohlc" for "ohlc-5")
+EXCHANGE_TIME: Dict[str, Callable[[List], int]] = {
+    "trade": _trade_time,
+    "spread": _spread_time,
+    "ohlc": _ohlc_time,
+    "book": _book_time,
+    "ownTrades": _own_trades_time,
+}
+
+
+class LatencyCollector:
+    """Histograms, by channel name, of:
+    - delivery: time from reception to the payload reaching `track_delivery` (time spent in the pipeline)
+    - exchange_lag: time from the exchange timestamp of a message to its reception (network and exchange side); clocks must be in sync
+
+    Both need a connection created with `timestamps=True`
+    """
+
+    def __init__(
+        self,
+        clock: Callable[[], int] = time.monotonic_ns,
+    ):
+        self.clock = clock
+        self.delivery: Dict[str, LatencyHistogram] = {}
+        self.exchange_lag: Dict[str, LatencyHistogram] = {}
+
+    def _histogram(self, histograms: Dict[str, LatencyHistogram], channel: str) -> LatencyHistogram:
+        histogram = histograms.get(channel)
+        if histogram is None:
+            histogram = histograms.setdefault(channel, LatencyHistogram())
+        return histogram
+
+    def track_delivery(self, channel: str) -> Callable[[Observable], Observable]:
+        """Records, as they go through, the delivery latency of payloads from a `subscribe_*` helper called with `stamped=True`.
+        Keyed (pair, payload) tuples and batches are supported"""
+        histogram = self._histogram(self.delivery, channel)
+        clock = self.clock
+
+        def record(value: Any):
+            if type(value) == Stamped:
+                histogram.record(clock() - value.received_ns)
+            elif type(value) in (list, tuple):
+                for item in value:
+                    record(item)
+
+        return operators.do_action(record)
+
+    def track_exchange_lag(self) -> Callable[[Observable], Observable]:
+        """Records, as they go through, the exchange lag of channel messages (or message batches), e.g. right after `keep_messages_only`"""
+        exchange_lag = self.exchange_lag
+
+        def record(message: Any):
+            if type(message) == StampedMessage:
+                channel_name = message[-2]
+                if type(channel_name) != str:
+                    return
+                extract = EXCHANGE_TIME.get(channel_name.split("-", 1)[0])
+                if extract is None:
+                    return
+                try:
+                    exchange_ns = extract(message)
+                except (LookupError, TypeError, ValueError):
+                    return
+                self._histogram(exchange_lag, channel_name).record(message.received_at - exchange_ns)
+            elif type(message) == list:
+                for item in message:
+                    if type(item) == StampedMessage:
+                        record(item)
+
+        return operators.do_action(record)
+
+    def snapshot(self) -> Dict[str, Dict[str, Dict[str, float]]]:
+        return {
+            "delivery": {channel: h.snapshot() for channel, h in self.delivery.items()},
+            "exchange_lag": {channel: h.snapshot() for channel, h in self.exchange_lag.items()},
+        }
+
+
+__all__ = [
+    "EXCHANGE_TIME",
+    "LatencyCollector",
+    "LatencyHistogram",
+]
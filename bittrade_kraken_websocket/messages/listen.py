@@ -5,7 +5,7 @@ from reactivex import operators, Observable, compose
 
 from bittrade_kraken_websocket.connection.connection_operators import filter_socket_status_only
 from bittrade_kraken_websocket.connection.enhanced_websocket import EnhancedWebsocket
-from bittrade_kraken_websocket.connection.generic import WebsocketBundle, WEBSOCKET_MESSAGE, WEBSOCKET_STATUS
+from bittrade_kraken_websocket.connection.generic import WebsocketBundle, WEBSOCKET_MESSAGE, WEBSOCKET_MESSAGE_BATCH, WEBSOCKET_STATUS
 from bittrade_kraken_websocket.connection.status import Status
 
 
@@ -13,6 +13,10 @@ def _is_message(message: WebsocketBundle):
     return message[1] == WEBSOCKET_MESSAGE
 
 
+def _is_message_batch(message: WebsocketBundle):
+    return message[1] == WEBSOCKET_MESSAGE_BATCH
+
+
 def message_only() -> Callable[[Observable[WebsocketBundle]], Observable[Status | Dict | List]]:
     return operators.map(lambda x: x[2])
 
@@ -24,6 +28,15 @@ def keep_messages_only() -> Callable[[Observable[WebsocketBundle]], Observable[D
     )
 
 
+def keep_message_batches_only() -> Callable[[Observable[WebsocketBundle]], Observable[List[Dict | List]]]:
+    """Batch counterpart of `keep_messages_only`, for connections created with `batching`: lists of channel messages.
+    Events are not batched; `keep_messages_only` still gets them"""
+    return compose(
+        operators.filter(_is_message_batch),
+        message_only(),
+    )
+
+
 def keep_status_only() -> Callable[[Observable], Observable[Status]]:
     return compose(
         filter_socket_status_only(),
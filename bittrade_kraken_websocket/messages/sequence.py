@@ -6,6 +6,7 @@ import reactivex
 from reactivex import Observable, compose, operators
 
 from bittrade_kraken_websocket.channels.models.message import PublicMessage
+from bittrade_kraken_websocket.metrics import registry
 
 logger = getLogger(__name__)
 
@@ -25,7 +26,7 @@ def correct_sequence_or_throw(x: Tuple[PrivateMessage, PrivateMessage]) -> Priva
     if actual == expected:
         return current
     logger.warning('[SOCKET][SEQUENCE] Invalid sequence; expected %s, got %s', expected, actual)
-    raise InvalidSequence()
+    raise InvalidSequence(current[1])
 
 
 def in_sequence() -> Callable[[Observable[PrivateMessage]], Observable[PrivateMessage]]:
@@ -43,6 +44,7 @@ def retry_on_invalid_sequence() -> Callable[[Observable[PublicMessage]], Observa
 
     def on_error(exc, source):
         if type(exc) == InvalidSequence:
+            registry.increment("sequence_resets_total", (exc.args[0] if exc.args else "",))
             return reactivex.empty()
         return reactivex.throw(exc)
 
@@ -0,0 +1,36 @@
+from typing import Any, Iterable, NamedTuple
+
+
+class StampedMessage(list):
+    """Channel message (a list, as decoded) that also carries when its frame was received.
+    Only produced by connections created with `timestamps=True`
+
+    :param: received_ns: time.monotonic_ns() at reception; compare with time.monotonic_ns() for time spent in the pipeline
+    :param: received_at: time.time_ns() at reception; compare with exchange timestamps
+    """
+
+    __slots__ = ("received_ns", "received_at")
+
+    def __init__(self, message: Iterable[Any], received_ns: int, received_at: int):
+        super().__init__(message)
+        self.received_ns = received_ns
+        self.received_at = received_at
+
+
+class Stamped(NamedTuple):
+    """Payload emitted by the `subscribe_*` helpers with `stamped=True`"""
+
+    payload: Any
+    received_ns: int
+    received_at: int
+
+
+def stamped(payload: Any, message: StampedMessage) -> Stamped:
+    return Stamped(payload, message.received_ns, message.received_at)
+
+
+__all__ = [
+    "Stamped",
+    "StampedMessage",
+    "stamped",
+]
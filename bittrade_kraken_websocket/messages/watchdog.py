@@ -0,0 +1,198 @@
+import time
+from logging import getLogger
+from threading import Lock
+from typing import Any, Callable, Dict, List, Optional, Sequence, Tuple
+
+from reactivex import Observable
+from reactivex.abc import DisposableBase, ObserverBase, SchedulerBase
+from reactivex.disposable import Disposable
+from reactivex.scheduler import TimeoutScheduler
+
+from bittrade_kraken_websocket.messages.filters.kind import public_channel_key
+from bittrade_kraken_websocket.metrics import registry as metrics
+
+logger = getLogger(__name__)
+
+# (channel name, pair)
+WatchKey = Tuple[str, str]
+
+
+class _Watched:
+    __slots__ = ("key", "last", "interval", "count", "stale", "resubscribe", "recycle")
+
+    def __init__(self, key: WatchKey, now: float, resubscribe: Callable[[List[str]], None], recycle: Callable[[], None]):
+        self.key = key
+        self.last = now
+        # Learned time between updates (exponentially weighted average)
+        self.interval: Optional[float] = None
+        self.count = 0
+        # Resubscriptions since the last update
+        self.stale = 0
+        self.resubscribe = resubscribe
+        self.recycle = recycle
+
+    def seen(self, now: float, alpha: float):
+        gap = now - self.last
+        self.last = now
+        self.count += 1
+        self.stale = 0
+        if self.count > 1:
+            self.interval = gap if self.interval is None else self.interval + alpha * (gap - self.interval)
+
+
+class StalenessWatchdog:
+    """Detects public channel subscriptions that stopped updating while the socket is still up.
+
+    A (channel, pair) is stale when it got no update for longer than its timeout: the one given in `timeouts` for its channel
+    (e.g. {"trade": 30.0}), otherwise `factor` times its learned interval between updates, within [min_timeout, max_timeout].
+    A stale pair is resubscribed on its own (unsubscribe then subscribe); if it is still stale after `recycle_after` resubscriptions,
+    the socket is closed so that `retry_with_backoff` reconnects.
+
+    Pass it as `watchdog` to the `subscribe_*` helpers. Private channels are not watched: they only update when something happens
+    """
+
+    def __init__(
+        self,
+        timeouts: Optional[Dict[str, float]] = None,
+        *,
+        factor: float = 10.0,
+        min_timeout: float = 2.0,
+        max_timeout: float = 300.0,
+        warmup: int = 5,
+        recycle_after: int = 2,
+        check_interval: float = 0.5,
+        alpha: float = 0.1,
+        clock: Callable[[], float] = time.monotonic,
+        scheduler: Optional[SchedulerBase] = None,
+    ):
+        """
+        :param: warmup: Number of updates needed before the learned interval is used; until then, `max_timeout` applies
+        :param: check_interval: How often, in seconds, subscriptions are checked
+        """
+        self.timeouts = timeouts or {}
+        self.factor = factor
+        self.min_timeout = min_timeout
+        self.max_timeout = max_timeout
+        self.warmup = warmup
+        self.recycle_after = recycle_after
+        self.check_interval = check_interval
+        self.alpha = alpha
+        self.clock = clock
+        self.scheduler = scheduler or TimeoutScheduler.singleton()
+        self._lock = Lock()
+        self._watched: List[_Watched] = []
+        self._checker: Optional[DisposableBase] = None
+
+    def timeout_for(self, watched: _Watched) -> float:
+        configured = self.timeouts.get(watched.key[0].split("-", 1)[0])
+        if configured is not None:
+            return configured
+        if watched.interval is None or watched.count < self.warmup:
+            return self.max_timeout
+        return min(max(self.factor * watched.interval, self.min_timeout), self.max_timeout)
+
+    @property
+    def watched(self) -> Dict[WatchKey, Dict[str, Any]]:
+        """Current state of the watched subscriptions"""
+        with self._lock:
+            watched = list(self._watched)
+        now = self.clock()
+        return {
+            w.key: {"idle": now - w.last, "interval": w.interval, "timeout": self.timeout_for(w), "stale": w.stale}
+            for w in watched
+        }
+
+    def check(self, *_: Any):
+        now = self.clock()
+        with self._lock:
+            watched = list(self._watched)
+        stale: Dict[int, Tuple[_Watched, List[str]]] = {}
+        for w in watched:
+            if now - w.last <= self.timeout_for(w):
+                continue
+            w.stale += 1
+            # Give the resubscription the same time again before checking it
+            w.last = now
+            if w.stale > self.recycle_after:
+                logger.warning("[WATCHDOG] %s still stale after %s resubscriptions; recycling socket", w.key, w.stale - 1)
+                metrics.increment("stale_reconnects_total", w.key)
+                w.stale = 0
+                w.recycle()
+                continue
+            logger.warning("[WATCHDOG] %s stale; resubscribing", w.key)
+            metrics.increment("stale_resubscribes_total", w.key)
+            # Pairs of the same subscription are resubscribed together
+            stale.setdefault(id(w.resubscribe), (w, []))[1].append(w.key[1])
+        for w, pairs in stale.values():
+            try:
+                w.resubscribe(pairs)
+            except Exception as exc:
+                logger.error("[WATCHDOG] Could not resubscribe %s: %s", pairs, exc)
+
+    def _add(self, watched: List[_Watched]):
+        with self._lock:
+            self._watched = self._watched + watched
+            if self._checker is None:
+                self._checker = self.scheduler.schedule_periodic(self.check_interval, self.check)
+
+    def _remove(self, watched: List[_Watched]):
+        with self._lock:
+            self._watched = [w for w in self._watched if w not in watched]
+            checker = None
+            if not self._watched:
+                checker, self._checker = self._checker, None
+        if checker is not None:
+            checker.dispose()
+
+    def watch(
+        self,
+        channel_name: str,
+        pairs: Sequence[str],
+        resubscribe: Callable[[List[str]], None],
+        recycle: Callable[[], None],
+    ) -> Callable[[Observable[Any]], Observable[Any]]:
+        """Operator on the messages (or message batches) of a public channel subscription; updates go through untouched
+
+        :param: resubscribe: Sends unsubscribe/subscribe events for the given pairs
+        :param: recycle: Closes the socket
+        """
+
+        def _watch(source: Observable[Any]) -> Observable[Any]:
+            def subscribe(observer: ObserverBase[Any], scheduler: Optional[SchedulerBase] = None):
+                now = self.clock()
+                by_pair = {pair: _Watched((channel_name, pair), now, resubscribe, recycle) for pair in pairs}
+                clock, alpha = self.clock, self.alpha
+
+                def on_next(value: Any):
+                    key = public_channel_key(value)
+                    if key is not None:
+                        w = by_pair.get(key[1])
+                        if w is not None:
+                            w.seen(clock(), alpha)
+                    elif type(value) == list:
+                        for message in value:
+                            key = public_channel_key(message)
+                            w = key and by_pair.get(key[1])
+                            if w:
+                                w.seen(clock(), alpha)
+                    observer.on_next(value)
+
+                watched = list(by_pair.values())
+                self._add(watched)
+                subscription = source.subscribe(on_next, observer.on_error, observer.on_completed, scheduler=scheduler)
+
+                def dispose():
+                    self._remove(watched)
+                    subscription.dispose()
+
+                return Disposable(dispose)
+
+            return Observable(subscribe)
+
+        return _watch
+
+
+__all__ = [
+    "StalenessWatchdog",
+    "WatchKey",
+]
@@ -0,0 +1,118 @@
+import threading
+from typing import Any, Dict, List, Tuple
+
+Labels = Tuple[str, ...]
+
+# name: (help, label names)
+METRICS: Dict[str, Tuple[str, Labels]] = {
+    "messages_total": ("Channel messages received", ("channel", "pair")),
+    "bytes_total": ("Size of the channel messages received, as sent by Kraken", ("channel", "pair")),
+    "decode_errors_total": ("Frames that could not be decoded", ()),
+    "reconnects_total": ("Reconnection attempts by retry_with_backoff", ()),
+    "backoff_seconds_total": ("Time waited by retry_with_backoff before reconnecting", ()),
+    "sequence_resets_total": ("Private channel resubscriptions after an invalid sequence", ("channel",)),
+    "request_timeouts_total": ("Requests (orders, cancels...) that got no response in time", ()),
+    "stale_resubscribes_total": ("Resubscriptions of channels that stopped updating", ("channel", "pair")),
+    "stale_reconnects_total": ("Sockets closed because a channel stayed stale after resubscribing", ("channel", "pair")),
+    "book_checksum_mismatches_total": ("Books found out of sync with Kraken's checksum, and resubscribed", ("channel", "pair")),
+    "shared_feed_missed_total": ("Messages a SharedFeedReader lost by falling behind the publisher", ("feed",)),
+}
+
+
+class MetricsRegistry:
+    """Counters updated by the library itself; read them with `snapshot` or `to_prometheus`.
+
+    Each thread increments counters of its own (no lock is taken per update); reading sums them up
+    """
+
+    def __init__(self, prefix: str = "kraken_ws"):
+        self.prefix = prefix
+        self.enabled = True
+        self._local = threading.local()
+        self._lock = threading.Lock()
+        self._shards: List[Dict[Tuple[str, Labels], float]] = []
+
+    def _shard(self) -> Dict[Tuple[str, Labels], float]:
+        try:
+            return self._local.shard
+        except AttributeError:
+            shard: Dict[Tuple[str, Labels], float] = {}
+            with self._lock:
+                self._shards.append(shard)
+            self._local.shard = shard
+            return shard
+
+    def increment(self, name: str, labels: Labels = (), value: float = 1):
+        if not self.enabled:
+            return
+        shard = self._shard()
+        key = (name, labels)
+        shard[key] = shard.get(key, 0) + value
+
+    def count_message(self, message: List[Any], size: int):
+        """Counts a decoded channel message and its raw size, by channel name and pair (empty for private channels)"""
+        if not self.enabled:
+            return
+        channel_name, pair = message[-2], message[-1]
+        if type(channel_name) != str:
+            return
+        labels = (channel_name, pair if type(pair) == str else "")
+        shard = self._shard()
+        key = ("messages_total", labels)
+        shard[key] = shard.get(key, 0) + 1
+        key = ("bytes_total", labels)
+        shard[key] = shard.get(key, 0) + size
+
+    def snapshot(self) -> Dict[str, Dict[Labels, float]]:
+        """{metric name: {label values: value}}"""
+        with self._lock:
+            shards = list(self._shards)
+        totals: Dict[str, Dict[Labels, float]] = {}
+        for shard in shards:
+            # dict.copy doesn't let other threads in, unlike iterating
+            for (name, labels), value in shard.copy().items():
+                values = totals.setdefault(name, {})
+                values[labels] = values.get(labels, 0) + value
+        return totals
+
+    def reset(self):
+        with self._lock:
+            for shard in self._shards:
+                shard.clear()
+
+    def to_prometheus(self) -> str:
+        """Prometheus text exposition format"""
+        lines = []
+        for name, values in sorted(self.snapshot().items()):
+            full_name = f"{self.prefix}_{name}"
+            description, label_names = METRICS.get(name, ("", ()))
+            if description:
+                lines.append(f"# HELP {full_name} {description}")
+            lines.append(f"# TYPE {full_name} counter")
+            for labels, value in sorted(values.items()):
+                if labels:
+                    names = label_names or tuple(f"label{i}" for i in range(len(labels)))
+                    label_text = ",".join(f'{n}="{_escape(v)}"' for n, v in zip(names, labels))
+                    lines.append(f"{full_name}{{{label_text}}} {_format(value)}")
+                else:
+                    lines.append(f"{full_name} {_format(value)}")
+        return "\n".join(lines) + "\n"
+
+
+def _escape(value: str) -> str:
+    return value.replace("\\", "\\\\").replace('"', '\\"').replace("\n", "\\n")
+
+
+def _format(value: float) -> str:
+    return str(int(value)) if value == int(value) else repr(value)
+
+
+# Updated by connections, retry_with_backoff, retry_on_invalid_sequence, wait_for_response, StalenessWatchdog, SharedFeedReader and the book checksum verification
+registry = MetricsRegistry()
+
+
+__all__ = [
+    "METRICS",
+    "MetricsRegistry",
+    "registry",
+]
@@ -1,11 +1,18 @@
-from bittrade_kraken_websocket.messages.listen import keep_messages_only
+from bittrade_kraken_websocket.messages.listen import keep_messages_only, keep_message_batches_only
 from bittrade_kraken_websocket.connection.connection_operators import map_socket_only, ready_socket
 from bittrade_kraken_websocket.messages.listen import filter_new_socket_only
+from bittrade_kraken_websocket.messages.filters.router import route_channels
+from bittrade_kraken_websocket.channels.payload import group_by_pair
+from bittrade_kraken_websocket.messages.conflate import conflate_latest
 
 
 __all__ = [
     'keep_messages_only',
+    'keep_message_batches_only',
     'map_socket_only',
     'ready_socket',
     'filter_new_socket_only',
-]
\ No newline at end of file
+    'route_channels',
+    'group_by_pair',
+    'conflate_latest',
+]
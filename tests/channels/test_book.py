@@ -0,0 +1,228 @@
+import random
+from unittest.mock import MagicMock
+
+import orjson
+import pytest
+from reactivex import operators
+from reactivex.testing import ReactiveTest, TestScheduler
+
+from bittrade_kraken_websocket.channels.book import BookSide, OrderBook, book_metrics, subscribe_book, subscribe_book_metrics
+from bittrade_kraken_websocket.development.server import book_checksum
+
+on_next = ReactiveTest.on_next
+
+SNAPSHOT = [
+    0,
+    {
+        "as": [["5541.30000", "2.50700000", "1534614248.123678"], ["5541.80000", "0.33000000", "1534614098.345543"], ["5542.70000", "0.64700000", "1534614244.654432"]],
+        "bs": [["5541.20000", "1.52900000", "1534614248.765567"], ["5539.90000", "0.30000000", "1534614241.769870"], ["5539.50000", "5.00000000", "1534613831.243486"]],
+    },
+    "book-10",
+    "XBT/USD",
+]
+
+
+def test_order_book_applies_snapshot_and_updates():
+    book = OrderBook("XBT/USD", depth=3)
+    assert not book.apply([0, {"a": [["5541.30000", "1.00000000", "1534614248.1"]], "c": "1"}, "book-10", "XBT/USD"])
+    assert book.apply(SNAPSHOT)
+    assert book.price_decimals == 5 and book.volume_decimals == 8
+    assert book.best_ask == 5541.3 and book.best_bid == 5541.2
+    assert list(book.asks_px_int) == [554130000, 554180000, 554270000]
+
+    # Update of an existing level, new best bid (pushing the worst bid out of depth) and removal of a level, with both sides in two dicts
+    book.apply([
+        1234,
+        {"a": [["5541.30000", "1.00000000", "1534614248.456738"], ["5541.80000", "0.00000000", "1534614335.345903"]]},
+        {"b": [["5541.25000", "2.00000000", "1534614248.456738"]], "c": "974942666"},
+        "book-10",
+        "XBT/USD",
+    ])
+    assert book.ask_levels() == [(5541.3, 1.0), (5542.7, 0.647)]
+    assert book.bid_levels() == [(5541.25, 2.0), (5541.2, 1.529), (5539.9, 0.3)]
+    assert book.checksum == 974942666
+    assert book.updates == 1
+
+    # Below the worst level of a full side: outside the book
+    book.apply([1234, {"b": [["5500.00000", "1.00000000", "1534614248.5"]], "c": "1"}, "book-10", "XBT/USD"])
+    assert book.bid_levels(2) == [(5541.25, 2.0), (5541.2, 1.529)]
+    assert len(book.bids) == 3
+
+    # A new snapshot replaces everything
+    book.apply(SNAPSHOT)
+    assert book.updates == 0
+    assert book.bid_levels(1) == [(5541.2, 1.529)]
+
+
+def test_subscribe_book():
+    scheduler = TestScheduler()
+    socket = MagicMock(token="")
+    sockets = scheduler.create_hot_observable(on_next(205, socket))
+    messages = scheduler.create_hot_observable(
+        on_next(300, SNAPSHOT),
+        on_next(305, [1, {"a": [["1.0", "1.0", "1.0"]]}, "book-25", "XBT/USD"]),
+        on_next(310, [1, {"a": [["5541.30000", "0.00000000", "1534614248.456738"]], "c": "1705525271"}, "book-10", "XBT/USD"]),
+    )
+
+    results = scheduler.start(lambda: sockets.pipe(subscribe_book("XBT/USD", messages), operators.map(lambda book: book.best_ask)))
+
+    assert results.messages == [on_next(300, 5541.3), on_next(310, 5541.8)]
+    assert orjson.loads(socket.send_bytes.call_args_list[0].args[0]) == {
+        "event": "subscribe",
+        "subscription": {"name": "book", "depth": 10},
+        "pair": ["XBT/USD"],
+    }
+
+
+def test_checksum_matches_kraken_formatting():
+    book = OrderBook("XBT/USD")
+    book.apply(SNAPSHOT)
+    assert book.compute_checksum() == int(
+        book_checksum([tuple(level[:2]) for level in SNAPSHOT[1]["as"]], [tuple(level[:2]) for level in SNAPSHOT[1]["bs"]])
+    )
+    assert book.verify()
+    book.apply([1, {"a": [["5541.30000", "0.00000000", "1534614248.456738"]], "c": "1705525271"}, "book-10", "XBT/USD"])
+    assert book.verify()
+    book.apply([1, {"b": [["5541.20000", "1.00000000", "1534614248.456738"]], "c": "1705525271"}, "book-10", "XBT/USD"])
+    assert not book.verify()
+
+
+def test_subscribe_book_resubscribes_pair_on_checksum_mismatch():
+    scheduler = TestScheduler()
+    socket = MagicMock(token="")
+    sockets = scheduler.create_hot_observable(on_next(205, socket))
+    eth_snapshot = [0, {"as": [["2000.10", "1.000", "1.0"]], "bs": [["1999.90", "2.000", "1.0"]]}, "book-10", "ETH/USD"]
+    messages = scheduler.create_hot_observable(
+        on_next(300, SNAPSHOT),
+        on_next(301, eth_snapshot),
+        # Wrong checksum: the XBT/USD book has drifted
+        on_next(310, [1, {"a": [["5541.30000", "0.00000000", "1534614248.456738"]], "c": "1"}, "book-10", "XBT/USD"]),
+        on_next(315, [1, {"a": [["5541.80000", "0.00000000", "1534614248.456738"]], "c": "1"}, "book-10", "XBT/USD"]),
+        on_next(320, SNAPSHOT),
+    )
+
+    results = scheduler.start(
+        lambda: sockets.pipe(
+            subscribe_book(["XBT/USD", "ETH/USD"], messages),
+            operators.map(lambda x: (x[0], x[1].best_ask)),
+        )
+    )
+
+    assert results.messages == [
+        on_next(300, ("XBT/USD", 5541.3)),
+        on_next(301, ("ETH/USD", 2000.1)),
+        on_next(320, ("XBT/USD", 5541.3)),
+    ]
+    sent = [orjson.loads(call.args[0]) for call in socket.send_bytes.call_args_list]
+    assert [(message["event"], message["pair"]) for message in sent[:3]] == [
+        ("subscribe", ["XBT/USD", "ETH/USD"]),
+        ("unsubscribe", ["XBT/USD"]),
+        ("subscribe", ["XBT/USD"]),
+    ]
+
+
+def test_subscribe_book_checks_depth():
+    with pytest.raises(ValueError):
+        subscribe_book("XBT/USD", MagicMock(), depth=20)
+
+
+def test_level_views_follow_the_book():
+    book = OrderBook("XBT/USD", depth=3)
+    book.apply(SNAPSHOT)
+    bids_px = book.bids_px
+    assert book.version == 2
+    assert list(bids_px) == [5541.2, 5539.9, 5539.5] and list(book.asks_qty) == [2.507, 0.33, 0.647]
+    with pytest.raises(TypeError):
+        bids_px[0] = 1.0
+
+    book.apply([1, {"b": [["5539.90000", "0.00000000", "1.0"], ["5541.25000", "2.00000000", "1.0"]], "c": "1"}, "book-10", "XBT/USD"])
+    assert book.version == 4
+    # Views share the book's buffers: an earlier view sees the levels move, a new one covers the levels now in the book
+    assert list(bids_px) == [5541.25, 5541.2, 5539.5] and list(book.bids_px) == [5541.25, 5541.2, 5539.5]
+    assert list(book.bids_qty_int) == [200000000, 152900000, 500000000]
+    assert book.read_consistent(lambda b: (b.version, list(b.bids_px[:1]))) == (4, [5541.25])
+
+    book.apply([1, {"b": [["5541.20000", "0.00000000", "1.0"]], "c": "1"}, "book-10", "XBT/USD"])
+    assert list(book.bids_px) == [5541.25, 5539.5]
+
+
+def test_book_side_keeps_top_and_band_volumes():
+    rng = random.Random(3)
+    for descending in (False, True):
+        side = BookSide(descending, capacity=8, top_levels=3, band_bps=20)
+        for _ in range(3000):
+            price = rng.randrange(100_000, 100_400, 10)
+            side.set(price, rng.choice((0, 0, rng.randrange(1, 1000))))
+            prices, volumes = side.prices[: side.count], side.volumes[: side.count]
+            assert side.top_volume == sum(volumes[:3])
+            if side.count:
+                best = prices[0]
+                in_band = [v for p, v in zip(prices, volumes) if abs(p - best) * 10_000 <= best * 20]
+                assert (side.band_count, side.band_volume) == (len(in_band), sum(in_band))
+
+
+def test_subscribe_book_metrics():
+    scheduler = TestScheduler()
+    sockets = scheduler.create_hot_observable(on_next(205, MagicMock(token="")))
+    messages = scheduler.create_hot_observable(
+        on_next(300, SNAPSHOT),
+        # Deep in the book: the metrics don't change
+        on_next(310, [1, {"b": [["5539.50000", "4.00000000", "1534614248.456738"]], "c": "1921627933"}, "book-10", "XBT/USD"]),
+        on_next(320, [1, {"a": [["5541.30000", "0.00000000", "1534614248.456738"]], "c": "1926452308"}, "book-10", "XBT/USD"]),
+    )
+
+    results = scheduler.start(lambda: sockets.pipe(subscribe_book_metrics("XBT/USD", messages, top_levels=1, band_bps=1)))
+
+    assert [message.time for message in results.messages] == [300, 320]
+    first, second = (message.value.value for message in results.messages)
+    assert first.pair == "XBT/USD" and first.mid == pytest.approx(5541.25)
+    assert first.microprice == pytest.approx((5541.3 * 1.529 + 5541.2 * 2.507) / (1.529 + 2.507))
+    assert first.imbalance == pytest.approx((1.529 - 2.507) / (1.529 + 2.507))
+    assert first.bid_depth == 1.529 and first.ask_depth == 2.507 + 0.33
+    # 5542.7 is more than 1 bps above the new best ask
+    assert second.mid == pytest.approx(5541.5) and second.ask_depth == 0.33
+
+
+def test_book_metrics_throttles_per_pair():
+    scheduler = TestScheduler()
+    books = {pair: OrderBook(pair) for pair in ("XBT/USD", "ETH/USD")}
+    books["XBT/USD"].apply(SNAPSHOT)
+    books["ETH/USD"].apply([0, {"as": [["2000.10", "1.000", "1.0"]], "bs": [["1999.90", "2.000", "1.0"]]}, "book-10", "ETH/USD"])
+    updates = scheduler.create_hot_observable(
+        on_next(205, books["XBT/USD"]),
+        on_next(206, books["ETH/USD"]),
+        on_next(207, ("XBT/USD", books["XBT/USD"])),
+    )
+
+    results = scheduler.start(lambda: updates.pipe(book_metrics(10, scheduler), operators.map(lambda metrics: metrics.pair)))
+
+    # One sampling period per pair, from its first metrics; XBT/USD's metrics didn't change at 207
+    assert results.messages == [on_next(215, "XBT/USD"), on_next(216, "ETH/USD")]
+
+
+def test_subscribe_book_emits_level_changes_after_reconnection():
+    scheduler = TestScheduler()
+    sockets = scheduler.create_hot_observable(on_next(205, MagicMock(token="")), on_next(400, MagicMock(token="")))
+    fresh_snapshot = [
+        0,
+        {
+            "as": [["5541.30000", "2.50700000", "1534614248.123678"], ["5541.80000", "0.40000000", "1534614098.345543"], ["5542.70000", "0.64700000", "1534614244.654432"]],
+            "bs": [["5541.20000", "1.52900000", "1534614248.765567"], ["5539.50000", "5.00000000", "1534613831.243486"], ["5539.00000", "1.00000000", "1534613831.243486"]],
+        },
+        "book-10",
+        "XBT/USD",
+    ]
+    messages = scheduler.create_hot_observable(
+        on_next(300, SNAPSHOT),
+        on_next(310, [1, {"a": [["5541.30000", "0.00000000", "1534614248.456738"]], "c": "1705525271"}, "book-10", "XBT/USD"]),
+        on_next(410, fresh_snapshot),
+    )
+
+    results = scheduler.start(lambda: sockets.pipe(subscribe_book("XBT/USD", messages), operators.map(lambda book: book.resync)))
+
+    # The first snapshot and updates aren't resyncs; the snapshot after reconnecting only brings what changed meanwhile
+    assert [(message.time, message.value.value) for message in results.messages] == [
+        (300, None),
+        (310, None),
+        (410, [("a", 5541.3, 2.507), ("a", 5541.8, 0.4), ("b", 5539.9, 0.0), ("b", 5539.0, 1.0)]),
+    ]
@@ -0,0 +1,57 @@
+from unittest.mock import MagicMock
+
+from reactivex.testing import ReactiveTest, TestScheduler
+
+from bittrade_kraken_websocket.channels.ohlc import subscribe_ohlc
+from bittrade_kraken_websocket.channels.registry import SubscriptionRegistry
+from bittrade_kraken_websocket.channels.ticker import subscribe_ticker
+from bittrade_kraken_websocket.events import EventName
+
+on_next = ReactiveTest.on_next
+
+
+def _status(name, pair, status="subscribed", **subscription):
+    message = {"event": "subscriptionStatus", "pair": pair, "status": status, "subscription": {"name": name, **subscription}}
+    if status == "error":
+        message["errorMessage"] = "Currency pair not supported"
+    return message
+
+
+def _sent(socket):
+    return [(call.args[0]["event"], call.args[0]["subscription"]["name"], call.args[0].get("pair")) for call in socket.send.call_args_list]
+
+
+def test_registry_resubscribes_everything_at_once():
+    scheduler = TestScheduler()
+    first, second = MagicMock(token=""), MagicMock(token="")
+    sockets = scheduler.create_hot_observable(on_next(210, first), on_next(400, second))
+    messages = scheduler.create_hot_observable(
+        on_next(220, _status("ticker", "XBT/USD")),
+        on_next(230, _status("ticker", "ETH/USD")),
+        on_next(240, _status("ohlc", "XBT/USD", interval=5)),
+        on_next(410, _status("ticker", "XBT/USD")),
+        on_next(420, _status("ohlc", "XBT/USD", interval=5)),
+        on_next(450, _status("ticker", "ETH/USD", "error")),
+    )
+    registry = SubscriptionRegistry(messages, clock=lambda: scheduler.clock)
+    durations = []
+    registry.resubscribed.subscribe(durations.append)
+    xbt = sockets.pipe(subscribe_ticker("XBT/USD", messages, registry=registry)).subscribe()
+    sockets.pipe(subscribe_ticker("ETH/USD", messages, registry=registry)).subscribe()
+    sockets.pipe(subscribe_ohlc("XBT/USD", messages, 5, registry=registry)).subscribe()
+    scheduler.advance_to(300)
+
+    assert _sent(first) == [
+        (EventName.EVENT_SUBSCRIBE, "ticker", ["XBT/USD", "ETH/USD"]),
+        (EventName.EVENT_SUBSCRIBE, "ohlc", ["XBT/USD"]),
+    ]
+    assert durations == [30]
+
+    scheduler.advance_to(500)
+    assert _sent(second) == _sent(first)
+    assert durations == [30, 50]
+    assert registry.errors == {("ticker", "ETH/USD"): "Currency pair not supported"}
+
+    xbt.dispose()
+    assert _sent(second)[-1] == (EventName.EVENT_UNSUBSCRIBE, "ticker", ["XBT/USD"])
+    assert sorted(registry.active) == [("ohlc-5", "XBT/USD"), ("ticker", "ETH/USD")]
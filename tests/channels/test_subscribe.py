@@ -0,0 +1,89 @@
+from unittest.mock import MagicMock, patch
+
+import orjson
+import pytest
+from reactivex import operators
+from reactivex.testing import ReactiveTest, TestScheduler
+
+from bittrade_kraken_websocket.channels import ChannelName
+from bittrade_kraken_websocket.channels.payload import group_by_pair
+from bittrade_kraken_websocket.channels import subscribe as subscribe_module
+from bittrade_kraken_websocket.channels.subscribe import send_resubscription, subscription_messages
+from bittrade_kraken_websocket.channels.ticker import subscribe_ticker
+from bittrade_kraken_websocket.events import EventName
+
+on_next = ReactiveTest.on_next
+
+
+def test_subscription_messages_single_pair():
+    assert subscription_messages(ChannelName.CHANNEL_TICKER, "XBT/USD") == [
+        {"event": EventName.EVENT_SUBSCRIBE, "subscription": {"name": "ticker"}, "pair": ["XBT/USD"]}
+    ]
+    assert subscription_messages(ChannelName.CHANNEL_OWN_TRADES, subscription_kwargs={"snapshot": False}) == [
+        {"event": EventName.EVENT_SUBSCRIBE, "subscription": {"name": "ownTrades", "snapshot": False}}
+    ]
+
+
+def test_subscription_messages_are_chunked():
+    pairs = [f"P{i}/USD" for i in range(5)]
+    with patch("bittrade_kraken_websocket.channels.subscribe.MAX_PAIRS_PER_SUBSCRIPTION", 2):
+        messages = subscription_messages(
+            ChannelName.CHANNEL_OHLC, pairs, {"interval": 5}, EventName.EVENT_UNSUBSCRIBE
+        )
+    assert [m["pair"] for m in messages] == [pairs[0:2], pairs[2:4], pairs[4:5]]
+    assert all(m["event"] == EventName.EVENT_UNSUBSCRIBE for m in messages)
+    assert all(m["subscription"] == {"name": "ohlc", "interval": 5} for m in messages)
+
+
+def test_subscribe_ticker_multiple_pairs():
+    scheduler = TestScheduler()
+    socket = MagicMock(token="")
+    sockets = scheduler.create_hot_observable(on_next(205, socket))
+    messages = scheduler.create_hot_observable(
+        on_next(300, [1, {"a": 1}, "ticker", "XBT/USD"]),
+        on_next(310, [2, {"a": 2}, "ticker", "DOT/USD"]),
+        on_next(320, [3, {"a": 3}, "ticker", "ETH/USD"]),
+    )
+
+    results = scheduler.start(
+        lambda: sockets.pipe(subscribe_ticker(["XBT/USD", "ETH/USD"], messages))
+    )
+
+    assert results.messages == [
+        on_next(300, ("XBT/USD", {"a": 1})),
+        on_next(320, ("ETH/USD", {"a": 3})),
+    ]
+    assert socket.send_bytes.call_count == 2  # one subscribe, one unsubscribe
+    assert orjson.loads(socket.send_bytes.call_args_list[0].args[0])["pair"] == ["XBT/USD", "ETH/USD"]
+
+
+def test_group_by_pair():
+    scheduler = TestScheduler()
+    source = scheduler.create_hot_observable(
+        on_next(300, ("XBT/USD", 1)),
+        on_next(310, ("ETH/USD", 2)),
+        on_next(320, ("XBT/USD", 3)),
+    )
+
+    results = scheduler.start(
+        lambda: source.pipe(
+            group_by_pair(),
+            operators.flat_map(lambda group: group.pipe(operators.map(lambda x: (group.key, x)))),
+        )
+    )
+
+    assert [m.value.value for m in results.messages] == [("XBT/USD", 1), ("ETH/USD", 2), ("XBT/USD", 3)]
+
+
+def test_subscribe_ticker_needs_a_pair():
+    with pytest.raises(ValueError):
+        subscribe_ticker([], MagicMock())
+
+
+def test_resubscriptions_are_not_cached():
+    socket = MagicMock(token="")
+    cached = len(subscribe_module._templates_cache)
+    for pairs in (["XBT/USD"], ["ETH/USD"], ["XBT/USD", "ETH/USD"]):
+        send_resubscription(socket, ChannelName.CHANNEL_TICKER, pairs)
+    assert len(subscribe_module._templates_cache) == cached
+    assert [orjson.loads(call.args[0])["pair"] for call in socket.send_bytes.call_args_list][:2] == [["XBT/USD"], ["XBT/USD"]]
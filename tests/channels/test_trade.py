@@ -0,0 +1,37 @@
+from unittest.mock import MagicMock
+
+from reactivex.testing import ReactiveTest, TestScheduler
+
+from bittrade_kraken_websocket.channels.trade import TradePayload, subscribe_trade
+
+on_next = ReactiveTest.on_next
+
+
+def test_subscribe_trade_batched():
+    scheduler = TestScheduler()
+    sockets = scheduler.create_hot_observable(on_next(205, MagicMock(token="")))
+    batches = scheduler.create_hot_observable(
+        on_next(
+            300,
+            [
+                [1, [["1.0", "2.0", "1.1", "b", "l", ""]], "trade", "XBT/USD"],
+                [2, [["9.0", "2.0", "1.1", "b", "l", ""]], "trade", "ETH/USD"],
+                [1, [["1.1", "3.0", "1.2", "s", "m", ""], ["1.2", "1.0", "1.2", "s", "m", ""]], "trade", "XBT/USD"],
+            ],
+        ),
+    )
+
+    results = scheduler.start(
+        lambda: sockets.pipe(subscribe_trade("XBT/USD", batches, batched=True))
+    )
+
+    assert results.messages == [
+        on_next(
+            300,
+            [
+                TradePayload("1.0", "2.0", "1.1", "b", "l", ""),
+                TradePayload("1.1", "3.0", "1.2", "s", "m", ""),
+                TradePayload("1.2", "1.0", "1.2", "s", "m", ""),
+            ],
+        )
+    ]
@@ -0,0 +1,97 @@
+import asyncio
+
+import orjson
+import pytest
+import reactivex
+from reactivex import operators
+
+from bittrade_kraken_websocket.channels.ticker import subscribe_ticker
+from bittrade_kraken_websocket.connection.asyncio_connection import (
+    raw_websocket_connection_async,
+    to_async_iterable,
+)
+from bittrade_kraken_websocket.connection.generic import (
+    WEBSOCKET_HEARTBEAT,
+    WEBSOCKET_MESSAGE,
+    WEBSOCKET_STATUS,
+)
+from bittrade_kraken_websocket.connection.status import WEBSOCKET_CLOSED, WEBSOCKET_OPENED
+from bittrade_kraken_websocket.messages.heartbeat import HEARTBEAT
+from bittrade_kraken_websocket.messages.listen import filter_new_socket_only, keep_messages_only
+
+websockets = pytest.importorskip("websockets")
+
+
+def test_to_async_iterable():
+    async def consume():
+        return [x async for x in to_async_iterable(reactivex.from_iterable([1, 2, 3]))]
+
+    assert asyncio.run(consume()) == [1, 2, 3]
+
+
+def test_to_async_iterable_raises_errors():
+    async def consume():
+        async for _ in to_async_iterable(reactivex.throw(ValueError("boom"))):
+            pass
+
+    with pytest.raises(ValueError):
+        asyncio.run(consume())
+
+
+def test_raw_connection_async_categories():
+    async def handler(websocket, *args):
+        await websocket.send('{"event":"systemStatus","status":"online"}')
+        await websocket.send(HEARTBEAT)
+        await websocket.send('[1,{"a":42},"ticker","XBT/USD"]')
+        await websocket.close()
+
+    async def main():
+        async with websockets.serve(handler, "127.0.0.1", 0) as server:
+            port = server.sockets[0].getsockname()[1]
+            connection = raw_websocket_connection_async(f"ws://127.0.0.1:{port}")
+            return [
+                (category, message)
+                async for _, category, message in to_async_iterable(
+                    connection.pipe(operators.catch(reactivex.empty()))
+                )
+            ]
+
+    assert asyncio.run(main()) == [
+        (WEBSOCKET_STATUS, WEBSOCKET_OPENED),
+        (WEBSOCKET_STATUS, "online"),
+        (WEBSOCKET_HEARTBEAT, {"event": "heartbeat"}),
+        (WEBSOCKET_MESSAGE, [1, {"a": 42}, "ticker", "XBT/USD"]),
+        (WEBSOCKET_STATUS, WEBSOCKET_CLOSED),
+    ]
+
+
+def test_channel_subscription_over_async_connection():
+    received = []
+
+    async def handler(websocket, *args):
+        async for frame in websocket:
+            message = orjson.loads(frame)
+            received.append(message)
+            if message["event"] == "subscribe":
+                await websocket.send('[1,{"c":["1.0","2.0"]},"ticker","XBT/USD"]')
+
+    async def main():
+        async with websockets.serve(handler, "127.0.0.1", 0) as server:
+            port = server.sockets[0].getsockname()[1]
+            connection = raw_websocket_connection_async(f"ws://127.0.0.1:{port}").pipe(
+                operators.share()
+            )
+            messages = connection.pipe(keep_messages_only(), operators.share())
+            ticker = connection.pipe(
+                filter_new_socket_only(),
+                subscribe_ticker("XBT/USD", messages),
+            )
+            async for payload in to_async_iterable(ticker):
+                return payload
+
+    assert asyncio.run(main()) == {"c": ["1.0", "2.0"]}
+    assert received[0] == {
+        "event": "subscribe",
+        "pair": ["XBT/USD"],
+        "subscription": {"name": "ticker"},
+    }
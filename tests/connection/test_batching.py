@@ -0,0 +1,61 @@
+from unittest.mock import patch
+
+from reactivex.scheduler import ImmediateScheduler
+from reactivex.testing import TestScheduler
+
+from bittrade_kraken_websocket.connection.batching import Batching, MessageBatcher
+from bittrade_kraken_websocket.connection.generic import WEBSOCKET_MESSAGE, WEBSOCKET_MESSAGE_BATCH, raw_websocket_connection
+
+
+def test_batcher_emits_on_count_and_window():
+    scheduler = TestScheduler()
+    emitted = []
+    batcher = MessageBatcher(
+        Batching(count=3, window=50),
+        lambda batch: emitted.append((scheduler.clock, batch)),
+        scheduler,
+    )
+    for time, message in [(100, "a"), (110, "b"), (120, "c"), (130, "d"), (300, "e"), (310, "f")]:
+        scheduler.schedule_absolute(time, lambda *_, m=message: batcher.add(m))
+    scheduler.start()
+
+    assert emitted == [
+        (120, ["a", "b", "c"]),  # count reached
+        (180, ["d"]),  # window elapsed after "d"
+        (350, ["e", "f"]),
+    ]
+
+
+def test_batcher_flushes_before_other_emissions():
+    scheduler = TestScheduler()
+    emitted = []
+    batcher = MessageBatcher(Batching(count=10, window=50), emitted.append, scheduler)
+    scheduler.schedule_absolute(100, lambda *_: batcher.add("a"))
+    scheduler.schedule_absolute(110, lambda *_: batcher.emit_in_order(lambda: emitted.append("status")))
+    scheduler.start()
+
+    assert emitted == [["a"], "status"]
+
+
+def test_batched_connection_emits_events_on_their_own():
+    scheduler = TestScheduler()
+    with patch("bittrade_kraken_websocket.connection.generic.WebSocketApp") as app:
+        bundles = []
+        raw_websocket_connection(
+            "wss://test", scheduler=ImmediateScheduler(), batching=Batching(count=10, window=50, scheduler=scheduler)
+        ).subscribe(bundles.append)
+        on_message = app.call_args.kwargs["on_message"]
+        for frame in (
+            '[1,{"a":["1.0",0,"1.0"]},"ticker","XBT/USD"]',
+            '[1,{"a":["2.0",0,"1.0"]},"ticker","XBT/USD"]',
+            '{"event":"addOrderStatus","reqid":5,"status":"ok","txid":"OUF4EM-FRGI2-MQMWZD"}',
+            '[1,{"a":["3.0",0,"1.0"]},"ticker","XBT/USD"]',
+        ):
+            on_message(None, frame)
+        scheduler.advance_by(100)
+
+    assert [(kind, message) for _, kind, message in bundles] == [
+        (WEBSOCKET_MESSAGE_BATCH, [[1, {"a": ["1.0", 0, "1.0"]}, "ticker", "XBT/USD"], [1, {"a": ["2.0", 0, "1.0"]}, "ticker", "XBT/USD"]]),
+        (WEBSOCKET_MESSAGE, {"event": "addOrderStatus", "reqid": 5, "status": "ok", "txid": "OUF4EM-FRGI2-MQMWZD"}),
+        (WEBSOCKET_MESSAGE_BATCH, [[1, {"a": ["3.0", 0, "1.0"]}, "ticker", "XBT/USD"]]),
+    ]
@@ -0,0 +1,90 @@
+from unittest.mock import patch
+
+from reactivex.scheduler import ImmediateScheduler
+
+from bittrade_kraken_websocket.connection.capture import CaptureLog, capture_files, read_capture, replay_capture
+from bittrade_kraken_websocket.connection.generic import WEBSOCKET_HEARTBEAT, WEBSOCKET_MESSAGE, WEBSOCKET_STATUS, raw_websocket_connection
+from bittrade_kraken_websocket.connection.status import WEBSOCKET_CLOSED, WEBSOCKET_OPENED
+from bittrade_kraken_websocket.messages.heartbeat import HEARTBEAT
+
+FRAMES = [
+    '{"connectionID":1,"event":"systemStatus","status":"online","version":"1.9.0"}',
+    HEARTBEAT,
+    '[340,{"c":["1.0","0.1"]},"ticker","XBT/USD"]',
+    b'[340,{"c":["1.1","0.1"]},"ticker","XBT/USD"]',
+]
+
+
+def test_capture_rotates_and_reads_back(tmp_path):
+    path = str(tmp_path / "capture")
+    log = CaptureLog(path, max_bytes=60)
+    for i, frame in enumerate(FRAMES):
+        log.write(frame, received_ns=i * 1000)
+    log.close()
+
+    files = capture_files(path)
+    assert len(files) > 1
+    records = [record for file in files for record in read_capture(file)]
+    assert records == [(i * 1000, frame.encode() if type(frame) == str else frame) for i, frame in enumerate(FRAMES)]
+    # A new log for the same path carries on after the existing files
+    assert CaptureLog(path).current_file > files[-1]
+
+
+def test_capture_is_closed_with_the_connection(tmp_path):
+    path = str(tmp_path / "capture")
+    log = CaptureLog(path)
+    with patch("bittrade_kraken_websocket.connection.generic.WebSocketApp") as app:
+        connection = raw_websocket_connection("wss://test", scheduler=ImmediateScheduler(), capture=log).subscribe()
+        app.call_args.kwargs["on_message"](None, FRAMES[2])
+        connection.dispose()
+    # Written after the log was closed, e.g. by the next connection: goes to a file of its own
+    log.write(FRAMES[3], received_ns=1)
+    log.close()
+
+    files = capture_files(path)
+    assert len(files) == 2
+    assert [record[1] for record in read_capture(files[0])] == [FRAMES[2].encode()]
+    assert list(read_capture(files[1])) == [(1, FRAMES[3])]
+
+
+def test_replay_capture_as_bundles(tmp_path):
+    path = str(tmp_path / "capture")
+    log = CaptureLog(path)
+    for frame in FRAMES:
+        log.write(frame)
+    log.close()
+
+    bundles, completed = [], []
+    replay_capture(path, speed=None, scheduler=ImmediateScheduler()).subscribe(
+        on_next=bundles.append, on_completed=lambda: completed.append(True)
+    )
+
+    assert [(category, message) for _, category, message in bundles] == [
+        (WEBSOCKET_STATUS, WEBSOCKET_OPENED),
+        (WEBSOCKET_STATUS, "online"),
+        (WEBSOCKET_HEARTBEAT, {"event": "heartbeat"}),
+        (WEBSOCKET_MESSAGE, [340, {"c": ["1.0", "0.1"]}, "ticker", "XBT/USD"]),
+        (WEBSOCKET_MESSAGE, [340, {"c": ["1.1", "0.1"]}, "ticker", "XBT/USD"]),
+        (WEBSOCKET_STATUS, WEBSOCKET_CLOSED),
+    ]
+    assert completed == [True]
+
+
+def test_replay_capture_stops_the_writer_at_the_end(tmp_path):
+    path = str(tmp_path / "capture")
+    log = CaptureLog(path)
+    log.write(FRAMES[2])
+    log.close()
+
+    sockets = []
+
+    def on_next(bundle):
+        if bundle[2] == WEBSOCKET_OPENED:
+            sockets.append(bundle[0])
+            bundle[0].send_bytes(b"subscribe")
+
+    replay_capture(path, speed=None, scheduler=ImmediateScheduler()).subscribe(on_next=on_next)
+
+    writer = sockets[0].writer
+    writer._thread.join(2)
+    assert not writer._thread.is_alive()
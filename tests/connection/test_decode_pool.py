@@ -0,0 +1,116 @@
+import threading
+import time
+
+import orjson
+
+from bittrade_kraken_websocket.connection.decode_pool import DecodePool, shard_key
+from bittrade_kraken_websocket.connection.shared_ring import FrameRing
+
+
+def best_price(message):
+    # Keeps the first level only; drops the even sequence numbers
+    if message[1]["a"][0][2] % 2 == 0:
+        return None
+    return [message[0], message[1]["a"][0], message[-2], message[-1]]
+
+
+def test_shard_key_takes_channel_and_pair_from_frame_tail():
+    assert shard_key('[42,{"a":[["1.0","2.0"]]},"book-10","XBT/USD"]') == ',"book-10","XBT/USD"]'
+    assert shard_key(b'[42,["1.0"],"trade","ETH/USD"]') == b',"trade","ETH/USD"]'
+    # Private channel message, event and heartbeat
+    assert shard_key('[[{"id":{}}],"ownTrades",{"sequence":1}]') is None
+    assert shard_key('{"event":"subscriptionStatus","pair":"XBT/USD"}') is None
+    assert shard_key('{"event":"heartbeat"}') is None
+
+
+def test_frame_ring_wraps_around():
+    ring = FrameRing(256)
+    reader = FrameRing(256, name=ring.name)
+    try:
+        received = []
+        for i in range(200):
+            frame = b"x" * (i % 50) + str(i).encode()
+            assert ring.try_write(frame)
+            if i % 3 == 2:
+                received.extend(reader.read_many())
+        received.extend(reader.read_many())
+        assert received == [b"x" * (i % 50) + str(i).encode() for i in range(200)]
+        assert len(ring) == 0
+        # Full until read
+        while ring.try_write(b"y" * 40):
+            pass
+        assert not ring.try_write(b"y" * 40)
+        reader.read_many(1)
+        assert ring.try_write(b"y" * 40)
+    finally:
+        reader.close()
+        ring.close()
+
+
+def test_decode_pool_keeps_order_per_pair():
+    pairs = ["XBT/USD", "ETH/USD", "SOL/USD", "ADA/USD", "DOT/USD"]
+    received = []
+    done = threading.Event()
+    expected = 100 * len(pairs) // 2
+
+    def receiver(message):
+        received.append(message)
+        if len(received) == expected:
+            done.set()
+
+    with DecodePool(3, handler=best_price, ring_size=4096) as pool:
+        pool.receiver = receiver
+        for i in range(100):
+            for pair in pairs:
+                frame = orjson.dumps([1, {"a": [["1.0", "2.0", i]]}, "book-10", pair]).decode()
+                assert pool.submit(frame)
+        assert not pool.submit('{"event":"heartbeat"}')
+        assert done.wait(20)
+
+    for pair in pairs:
+        assert [message[1][2] for message in received if message[-1] == pair] == list(range(1, 100, 2))
+
+
+def slow_echo(message):
+    time.sleep(0.2)
+    return message
+
+
+def test_decode_pool_drops_results_in_flight_when_the_receiver_changes():
+    old, new = [], []
+    done = threading.Event()
+
+    def receiver(message):
+        new.append(message)
+        done.set()
+
+    with DecodePool(1, handler=slow_echo) as pool:
+        pool.receiver = old.append
+        for i in range(3):
+            assert pool.submit(orjson.dumps([i, {}, "book-10", "XBT/USD"]))
+        pool.receiver = receiver
+        assert pool.submit(orjson.dumps([3, {}, "book-10", "XBT/USD"]))
+        assert done.wait(20)
+
+    assert old == []
+    assert new == [[3, {}, "book-10", "XBT/USD"]]
+
+
+def test_decode_pool_gives_up_on_a_worker_that_makes_no_room():
+    frame = orjson.dumps([1, {"a": "x" * 40}, "book-10", "XBT/USD"])
+    with DecodePool(1, handler=slow_echo, ring_size=512, submit_timeout=0.01) as pool:
+        submitted = 0
+        while pool.submit(frame):
+            submitted += 1
+        assert submitted
+        # Frames of that worker are left to the caller from now on
+        assert not pool.submit(orjson.dumps([2, {}, "book-10", "XBT/USD"]))
+
+
+def test_decode_pool_refuses_frames_once_closed():
+    pool = DecodePool(1)
+    frame = orjson.dumps([1, {}, "book-10", "XBT/USD"])
+    assert not pool.submit(frame)
+    with pool:
+        assert pool.submit(frame)
+    assert not pool.submit(frame)
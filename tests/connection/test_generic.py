@@ -2,4 +2,53 @@ from unittest.mock import MagicMock, patch
 
 from reactivex.scheduler import CurrentThreadScheduler
 
+from bittrade_kraken_websocket.connection.enhanced_websocket import EnhancedWebsocket
+from bittrade_kraken_websocket.connection.generic import (
+    WEBSOCKET_HEARTBEAT,
+    WEBSOCKET_MESSAGE,
+    WEBSOCKET_STATUS,
+    message_to_bundle,
+)
+from bittrade_kraken_websocket.messages.timestamps import StampedMessage
 
+
+def test_message_to_bundle():
+    socket = EnhancedWebsocket(None)  # type: ignore
+    assert message_to_bundle(socket, '{"event":"heartbeat"}') == (
+        socket,
+        WEBSOCKET_HEARTBEAT,
+        {"event": "heartbeat"},
+    )
+    assert message_to_bundle(socket, '{"event":"systemStatus","status":"online"}') == (
+        socket,
+        WEBSOCKET_STATUS,
+        "online",
+    )
+    assert message_to_bundle(socket, '[1,{"a":1},"ticker","XBT/USD"]') == (
+        socket,
+        WEBSOCKET_MESSAGE,
+        [1, {"a": 1}, "ticker", "XBT/USD"],
+    )
+    assert message_to_bundle(socket, "not json") is None
+
+
+def test_message_to_bundle_skips_heartbeat_without_decoding():
+    socket = EnhancedWebsocket(None)  # type: ignore
+    with patch("bittrade_kraken_websocket.connection.generic.orjson.loads") as loads:
+        assert message_to_bundle(socket, '{"event":"heartbeat"}', heartbeats=False) is None
+        message_to_bundle(socket, '{"event":"heartbeat"}')
+    loads.assert_not_called()
+
+
+def test_message_to_bundle_stamps_channel_messages():
+    socket = EnhancedWebsocket(None)  # type: ignore
+    _, _, message = message_to_bundle(socket, '[1,{"a":1},"ticker","XBT/USD"]', stamp=(5, 1_700_000_000_000_000_000))  # type: ignore
+    assert type(message) == StampedMessage
+    assert message == [1, {"a": 1}, "ticker", "XBT/USD"]
+    assert (message.received_ns, message.received_at) == (5, 1_700_000_000_000_000_000)
+    # Events are left as they are
+    assert message_to_bundle(socket, '{"event":"pong","reqid":1}', stamp=(5, 6)) == (
+        socket,
+        WEBSOCKET_MESSAGE,
+        {"event": "pong", "reqid": 1},
+    )
@@ -0,0 +1,106 @@
+import threading
+
+import reactivex
+from reactivex import operators
+from reactivex.subject import Subject
+
+from bittrade_kraken_websocket.connection.generic import WEBSOCKET_MESSAGE, WEBSOCKET_STATUS
+from bittrade_kraken_websocket.connection.handoff import (
+    HANDOFF_CONFLATE,
+    HANDOFF_DROP_OLDEST,
+    HandoffQueue,
+    handoff,
+    handoff_key,
+    to_blocking_iterator,
+)
+
+
+def ticker(pair, price):
+    return None, WEBSOCKET_MESSAGE, [340, {"c": [price]}, "ticker", pair]
+
+
+def test_drop_oldest_never_drops_statuses():
+    queue = HandoffQueue(2, HANDOFF_DROP_OLDEST)
+    status = (None, WEBSOCKET_STATUS, "WEBSOCKET_OPENED")
+    for bundle in [status, ticker("XBT/USD", "1"), ticker("XBT/USD", "2"), ticker("XBT/USD", "3")]:
+        queue.put(bundle)
+    queue.put_completed()
+
+    assert list(queue) == [status, ticker("XBT/USD", "3")]
+    assert queue.dropped == 2
+
+
+def book(pair, price):
+    return None, WEBSOCKET_MESSAGE, [336, {"a": [[price, "1.0", "1700000000.0"]]}, "book-10", pair]
+
+
+def test_book_and_trade_messages_are_never_dropped_by_default():
+    queue = HandoffQueue(1, HANDOFF_CONFLATE)
+    trade = (None, WEBSOCKET_MESSAGE, [337, [["1.0", "2.0", "1700000000.0", "b", "l", ""]], "trade", "XBT/USD"])
+    for bundle in [book("XBT/USD", "1"), book("XBT/USD", "2"), trade, trade]:
+        queue.put(bundle)
+    queue.put_completed()
+
+    assert list(queue) == [book("XBT/USD", "1"), book("XBT/USD", "2"), trade, trade]
+    assert queue.conflated == queue.dropped == 0
+
+
+def test_handoff_key_allows_listed_channels():
+    queue = HandoffQueue(10, HANDOFF_CONFLATE, key=handoff_key("book"))
+    for bundle in [ticker("XBT/USD", "1"), book("XBT/USD", "1"), ticker("XBT/USD", "2"), book("XBT/USD", "2")]:
+        queue.put(bundle)
+    queue.put_completed()
+
+    assert list(queue) == [ticker("XBT/USD", "1"), book("XBT/USD", "2"), ticker("XBT/USD", "2")]
+    assert queue.conflated == 1
+
+
+def test_conflate_keeps_latest_per_channel_and_pair_in_place():
+    queue = HandoffQueue(10, HANDOFF_CONFLATE)
+    for bundle in [ticker("XBT/USD", "1"), ticker("ETH/USD", "1"), ticker("XBT/USD", "2")]:
+        queue.put(bundle)
+    assert queue.depth == 2
+    queue.put_completed()
+
+    assert list(queue) == [ticker("XBT/USD", "2"), ticker("ETH/USD", "1")]
+    assert queue.conflated == 1
+    assert queue.dropped == 0
+
+
+def test_handoff_delivers_on_consumer_thread():
+    source = Subject()
+    received = []
+    done = threading.Event()
+    source.pipe(handoff(HandoffQueue(10))).subscribe(
+        on_next=lambda x: received.append((x, threading.current_thread())),
+        on_completed=done.set,
+    )
+    source.on_next(ticker("XBT/USD", "1"))
+    source.on_completed()
+
+    assert done.wait(2)
+    assert [x for x, _ in received] == [ticker("XBT/USD", "1")]
+    assert received[0][1] is not threading.current_thread()
+
+
+def test_handoff_forwards_errors():
+    errors = []
+    done = threading.Event()
+    reactivex.throw(ValueError("boom")).pipe(handoff()).subscribe(
+        on_error=lambda e: (errors.append(e), done.set())
+    )
+
+    assert done.wait(2)
+    assert str(errors[0]) == "boom"
+
+
+def test_blocking_iterator():
+    values = to_blocking_iterator(reactivex.from_iterable(range(5)).pipe(operators.map(lambda x: x * 2)))
+
+    assert list(values) == [0, 2, 4, 6, 8]
+
+
+def test_blocking_iterator_reuses_its_queue():
+    queue = HandoffQueue(10)
+    assert list(to_blocking_iterator(reactivex.from_iterable(range(3)), queue)) == [0, 1, 2]
+    assert list(to_blocking_iterator(reactivex.from_iterable(range(2)), queue)) == [0, 1]
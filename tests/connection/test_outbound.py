@@ -0,0 +1,125 @@
+import threading
+from unittest.mock import MagicMock
+
+import orjson
+
+from bittrade_kraken_websocket.connection.enhanced_websocket import EnhancedWebsocket
+from bittrade_kraken_websocket.connection.outbound import (
+    PRIORITY_CANCEL,
+    PRIORITY_ORDER,
+    PRIORITY_OTHER,
+    OutboundWriter,
+    RateLimit,
+    TokenBucket,
+    priority_of,
+)
+from bittrade_kraken_websocket.events.events import EventName
+
+
+def test_priority_of():
+    assert priority_of({"event": EventName.EVENT_CANCEL_ORDER}) == PRIORITY_CANCEL
+    assert priority_of({"event": "addOrder"}) == PRIORITY_ORDER
+    assert priority_of({"event": "subscribe"}) == PRIORITY_OTHER
+
+
+def test_token_bucket():
+    now = [0.0]
+    bucket = TokenBucket(RateLimit(2, 1.0), clock=lambda: now[0])
+    bucket.take(1)
+    bucket.take(1)
+    assert bucket.wait_time(1) == 1.0
+    now[0] = 0.5
+    assert bucket.wait_time(1) == 0.5
+    now[0] = 10
+    assert bucket.available == 2  # capped
+
+
+def test_writer_sends_by_priority():
+    sent = []
+    first_sent = threading.Event()
+    release = threading.Event()
+    done = threading.Event()
+
+    def send(data):
+        sent.append(data)
+        if len(sent) == 1:
+            first_sent.set()
+            release.wait(2)
+        if len(sent) == 4:
+            done.set()
+
+    writer = OutboundWriter(send)
+    writer.put(b"first")
+    assert first_sent.wait(2)
+    # Queued while the writer is busy
+    writer.put(b"subscribe", PRIORITY_OTHER)
+    writer.put(b"add", PRIORITY_ORDER)
+    writer.put(b"cancel", PRIORITY_CANCEL)
+    release.set()
+
+    assert done.wait(2)
+    writer.close()
+    assert sent == [b"first", b"cancel", b"add", b"subscribe"]
+
+
+def test_writer_throttles_orders_but_not_subscriptions():
+    sent = []
+    done = threading.Event()
+
+    def send(data):
+        sent.append(data)
+        if data == b"subscribe":
+            done.set()
+
+    writer = OutboundWriter(send, TokenBucket(RateLimit(1, 0.001)))
+    writer.put(b"add 1", PRIORITY_ORDER)
+    writer.put(b"add 2", PRIORITY_ORDER)
+    writer.put(b"subscribe", PRIORITY_OTHER)
+
+    assert done.wait(2)
+    assert sent == [b"add 1", b"subscribe"]
+    assert writer.pending == 1
+    writer.close()
+
+
+def test_rate_limiter_can_be_replaced_after_sending():
+    socket = MagicMock()
+    sent = threading.Event()
+    socket.send.side_effect = lambda data: data == b"add 2" and sent.set()
+    enhanced = EnhancedWebsocket(socket)
+    enhanced.rate_limiter = TokenBucket(RateLimit(1, 0.001))
+    enhanced.send_bytes(b"add 1", PRIORITY_ORDER)
+    enhanced.send_bytes(b"add 2", PRIORITY_ORDER)
+    # The writer is running and "add 2" waits for the first bucket
+    enhanced.rate_limiter = TokenBucket(RateLimit(10, 1))
+
+    assert sent.wait(2)
+    enhanced.stop_writer()
+    assert enhanced.writer.bucket is enhanced.rate_limiter
+
+
+def test_send_returns_immediately_and_adds_token():
+    socket = MagicMock()
+    sent = threading.Event()
+    socket.send.side_effect = lambda _: sent.set()
+    enhanced = EnhancedWebsocket(socket, token="abc")
+    enhanced.send({"event": "subscribe", "subscription": {"name": "openOrders"}})
+
+    assert sent.wait(2)
+    enhanced.stop_writer()
+    assert orjson.loads(socket.send.call_args.args[0]) == {
+        "event": "subscribe",
+        "subscription": {"name": "openOrders", "token": "abc"},
+    }
+
+
+def test_sends_after_stopping_the_writer_are_dropped():
+    socket = MagicMock()
+    enhanced = EnhancedWebsocket(socket)
+    enhanced.stop_writer()
+    enhanced.send({"event": "subscribe", "subscription": {"name": "ticker"}})
+    enhanced.send_bytes(b"subscribe")
+
+    # No writer thread was started for them
+    assert enhanced._writer is None
+    socket.send.assert_not_called()
@@ -0,0 +1,76 @@
+from unittest.mock import MagicMock
+
+import orjson
+
+from reactivex.operators import publish
+from reactivex.testing import ReactiveTest, TestScheduler
+
+from bittrade_kraken_websocket.channels.ticker import subscribe_ticker
+from bittrade_kraken_websocket.connection.generic import WEBSOCKET_MESSAGE, WEBSOCKET_STATUS
+from bittrade_kraken_websocket.connection.pool import (
+    ConnectionPool,
+    hash_sharding,
+    least_loaded_sharding,
+)
+from bittrade_kraken_websocket.connection.status import WEBSOCKET_OPENED
+
+on_next = ReactiveTest.on_next
+
+
+def test_sharding_policies():
+    assert hash_sharding("XBT/USD", [0, 0, 0]) == hash_sharding("XBT/USD", [5, 0, 1])
+    assert 0 <= hash_sharding("ETH/USD", [0, 0, 0]) < 3
+    assert least_loaded_sharding("XBT/USD", [3, 1, 2]) == 1
+
+
+def _fake_connections(scheduler: TestScheduler):
+    sockets = [MagicMock(token=""), MagicMock(token="")]
+    feeds = [
+        [
+            on_next(210, (sockets[0], WEBSOCKET_STATUS, WEBSOCKET_OPENED)),
+            on_next(300, (sockets[0], WEBSOCKET_MESSAGE, [1, {"a": 0}, "ticker", "XBT/USD"])),
+        ],
+        [
+            on_next(220, (sockets[1], WEBSOCKET_STATUS, WEBSOCKET_OPENED)),
+            on_next(310, (sockets[1], WEBSOCKET_MESSAGE, [2, {"a": 1}, "ticker", "ETH/USD"])),
+        ],
+    ]
+
+    def factory():
+        return scheduler.create_hot_observable(feeds.pop(0)).pipe(publish())
+
+    return sockets, factory
+
+
+def test_pool_spreads_subscriptions_and_merges_messages():
+    scheduler = TestScheduler()
+    sockets, factory = _fake_connections(scheduler)
+    pool = ConnectionPool(2, sharding=least_loaded_sharding, connection_factory=factory)
+    xbt = scheduler.create_observer()
+    eth = scheduler.create_observer()
+    merged = scheduler.create_observer()
+    pool.subscribe(subscribe_ticker, "XBT/USD").subscribe(xbt)
+    pool.subscribe(subscribe_ticker, "ETH/USD").subscribe(eth)
+    pool.messages.subscribe(merged)
+    pool.connect()
+    scheduler.start()
+
+    assert pool.loads == [1, 1]
+    assert xbt.messages == [on_next(300, {"a": 0})]
+    assert eth.messages == [on_next(310, {"a": 1})]
+    assert merged.messages == [
+        on_next(300, [1, {"a": 0}, "ticker", "XBT/USD"]),
+        on_next(310, [2, {"a": 1}, "ticker", "ETH/USD"]),
+    ]
+    assert orjson.loads(sockets[0].send_bytes.call_args.args[0])["pair"] == ["XBT/USD"]
+    assert orjson.loads(sockets[1].send_bytes.call_args.args[0])["pair"] == ["ETH/USD"]
+
+
+def test_pool_releases_load_on_dispose():
+    scheduler = TestScheduler()
+    _, factory = _fake_connections(scheduler)
+    pool = ConnectionPool(2, sharding=least_loaded_sharding, connection_factory=factory)
+    subscription = pool.subscribe(subscribe_ticker, "XBT/USD").subscribe()
+    assert pool.loads == [1, 0]
+    subscription.dispose()
+    assert pool.loads == [0, 0]
@@ -0,0 +1,131 @@
+from unittest.mock import MagicMock
+
+from reactivex import operators
+from reactivex.operators import publish
+from reactivex.testing import ReactiveTest, TestScheduler
+
+from bittrade_kraken_websocket.channels.book import subscribe_book
+from bittrade_kraken_websocket.channels.ticker import subscribe_ticker
+from bittrade_kraken_websocket.channels.trade import TradePayload, subscribe_trade
+from bittrade_kraken_websocket.connection.generic import WEBSOCKET_MESSAGE, WEBSOCKET_STATUS
+from bittrade_kraken_websocket.connection.redundant import FirstArrival, RedundantConnection, message_identity
+from bittrade_kraken_websocket.connection.status import WEBSOCKET_CLOSED, WEBSOCKET_OPENED
+
+on_next = ReactiveTest.on_next
+
+
+def test_message_identity_ignores_channel_id():
+    assert message_identity([1, {"a": ["1"]}, "ticker", "XBT/USD"]) == message_identity([7, {"a": ["1"]}, "ticker", "XBT/USD"])
+    assert message_identity([1, {"a": ["1"]}, "ticker", "XBT/USD"]) != message_identity([1, {"a": ["1"]}, "ticker", "ETH/USD"])
+    assert message_identity([1, [["1.0", "2.0", "1.1", "b", "l", ""]], "trade", "XBT/USD"]) == (
+        ("trade", "XBT/USD"),
+        (("1.0", "2.0", "1.1"),),
+    )
+    assert message_identity({"event": "heartbeat"}) is None
+
+
+def test_first_arrival_counts_occurrences_per_leg():
+    now = [0]
+    deduplicator = FirstArrival(2, clock=lambda: now[0])
+    same = [1, {"c": ["1"]}, "ticker", "XBT/USD"]
+    assert deduplicator.accept(0, same)
+    now[0] = 100
+    # Unchanged ticker sent twice by the exchange
+    assert deduplicator.accept(0, same)
+    now[0] = 150
+    assert not deduplicator.accept(1, same)
+    assert not deduplicator.accept(1, same)
+    now[0] = 200
+    assert deduplicator.accept(1, same)
+    assert deduplicator.wins == [2, 1]
+    assert deduplicator.duplicates == 2
+    assert deduplicator.leads[0].max == 50
+
+
+def test_redundant_connection_forwards_first_copy_and_fails_over():
+    scheduler = TestScheduler()
+    sockets = [MagicMock(token=""), MagicMock(token="")]
+    trade = [[["1.0", "2.0", "1.1", "b", "l", ""]], "trade", "XBT/USD"]
+    feeds = [
+        [
+            on_next(210, (sockets[0], WEBSOCKET_STATUS, WEBSOCKET_OPENED)),
+            on_next(300, (sockets[0], WEBSOCKET_MESSAGE, [1, {"a": 0}, "ticker", "XBT/USD"])),
+            on_next(330, (sockets[0], WEBSOCKET_MESSAGE, [3, *trade])),
+            # This leg goes down (and is reconnecting)
+            on_next(350, (sockets[0], WEBSOCKET_STATUS, WEBSOCKET_CLOSED)),
+        ],
+        [
+            on_next(220, (sockets[1], WEBSOCKET_STATUS, WEBSOCKET_OPENED)),
+            on_next(305, (sockets[1], WEBSOCKET_MESSAGE, [2, {"a": 0}, "ticker", "XBT/USD"])),
+            on_next(320, (sockets[1], WEBSOCKET_MESSAGE, [4, *trade])),
+            on_next(400, (sockets[1], WEBSOCKET_MESSAGE, [2, {"a": 1}, "ticker", "XBT/USD"])),
+        ],
+    ]
+
+    def factory():
+        return scheduler.create_hot_observable(feeds.pop(0)).pipe(publish())
+
+    redundant = RedundantConnection(2, connection_factory=factory)
+    redundant.deduplicator.clock = lambda: int(scheduler.clock)
+    tickers = scheduler.create_observer()
+    trades = scheduler.create_observer()
+    redundant.subscribe(subscribe_ticker, "XBT/USD").subscribe(tickers)
+    redundant.subscribe(subscribe_trade, "XBT/USD").subscribe(trades)
+    redundant.connect()
+    scheduler.start()
+
+    assert tickers.messages == [on_next(300, {"a": 0}), on_next(400, {"a": 1})]
+    assert trades.messages == [on_next(320, [TradePayload("1.0", "2.0", "1.1", "b", "l", "")])]
+    stats = redundant.stats()
+    assert stats["wins"] == [1, 2]
+    assert stats["duplicates"] == 2
+    # Both legs sent a subscription
+    assert sockets[0].send_bytes.call_count == 2
+    assert sockets[1].send_bytes.call_count == 2
+
+
+def test_redundant_connection_keeps_a_complete_book_per_leg():
+    scheduler = TestScheduler()
+    sockets = [MagicMock(token=""), MagicMock(token="")]
+    bids = [["5541.20000", "1.52900000", "1.0"], ["5539.90000", "0.30000000", "1.0"], ["5539.50000", "5.00000000", "1.0"]]
+    asks = [["5541.30000", "2.50700000", "1.0"], ["5541.80000", "0.33000000", "1.0"], ["5542.70000", "0.64700000", "1.0"]]
+    first = [0, {"a": [["5541.30000", "0.00000000", "2.0"]], "c": "1705525271"}, "book-10", "XBT/USD"]
+    second = [0, {"a": [["5541.80000", "0.00000000", "3.0"]], "c": "1045734720"}, "book-10", "XBT/USD"]
+    third = [0, {"a": [["5542.70000", "0.50000000", "4.0"]], "c": "3761920809"}, "book-10", "XBT/USD"]
+    feeds = [
+        [
+            on_next(210, (sockets[0], WEBSOCKET_STATUS, WEBSOCKET_OPENED)),
+            on_next(300, (sockets[0], WEBSOCKET_MESSAGE, [0, {"as": asks, "bs": bids}, "book-10", "XBT/USD"])),
+            on_next(310, (sockets[0], WEBSOCKET_MESSAGE, first)),
+            on_next(330, (sockets[0], WEBSOCKET_MESSAGE, second)),
+            on_next(340, (sockets[0], WEBSOCKET_MESSAGE, third)),
+        ],
+        [
+            on_next(220, (sockets[1], WEBSOCKET_STATUS, WEBSOCKET_OPENED)),
+            # Before this leg's snapshot: its book can't use it, the other leg's delivers it
+            on_next(305, (sockets[1], WEBSOCKET_MESSAGE, first)),
+            on_next(306, (sockets[1], WEBSOCKET_MESSAGE, [0, {"as": asks[1:], "bs": bids}, "book-10", "XBT/USD"])),
+            on_next(320, (sockets[1], WEBSOCKET_MESSAGE, second)),
+            on_next(345, (sockets[1], WEBSOCKET_MESSAGE, third)),
+        ],
+    ]
+
+    def factory():
+        return scheduler.create_hot_observable(feeds.pop(0)).pipe(publish())
+
+    redundant = RedundantConnection(2, connection_factory=factory)
+    books = scheduler.create_observer()
+    redundant.subscribe(subscribe_book, "XBT/USD").pipe(operators.map(lambda book: book.ask_levels())).subscribe(books)
+    redundant.connect()
+    scheduler.start()
+
+    assert [(message.time, message.value.value) for message in books.messages] == [
+        (300, [(5541.3, 2.507), (5541.8, 0.33), (5542.7, 0.647)]),
+        (306, [(5541.8, 0.33), (5542.7, 0.647)]),
+        (310, [(5541.8, 0.33), (5542.7, 0.647)]),
+        (320, [(5542.7, 0.647)]),
+        (340, [(5542.7, 0.5)]),
+    ]
+    # Each leg applied every update: no checksum mismatch, so nothing sent besides the subscriptions
+    assert sockets[0].send_bytes.call_count == 1
+    assert sockets[1].send_bytes.call_count == 1
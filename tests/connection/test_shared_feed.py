@@ -0,0 +1,74 @@
+import threading
+
+from reactivex.subject import Subject
+
+from bittrade_kraken_websocket.connection.shared_feed import SharedFeedPublisher, SharedFeedReader
+from bittrade_kraken_websocket.connection.shared_ring import BroadcastRing
+
+
+def test_broadcast_ring_readers_skip_what_was_overwritten():
+    ring = BroadcastRing("kraken-test-broadcast", 256)
+    fast = BroadcastRing("kraken-test-broadcast", create=False)
+    slow = BroadcastRing("kraken-test-broadcast", create=False)
+    try:
+        received = []
+        for i in range(40):
+            ring.write(b"x" * 20 + str(i).encode())
+            records, missed = fast.read_many()
+            assert missed == 0
+            received.extend(records)
+        assert received == [b"x" * 20 + str(i).encode() for i in range(40)]
+        # The slow reader was lapped: it is told how many records it lost and resumes from the newest
+        assert slow.read_many() == ([], 40)
+        ring.write(b"next")
+        assert slow.read_many() == ([b"next"], 0)
+        assert ring.written == 41
+    finally:
+        slow.close()
+        fast.close()
+        ring.close()
+
+
+def test_reader_mirrors_subscribe_helpers():
+    messages = Subject()
+    publisher = SharedFeedPublisher("kraken-test-feed", 4096)
+    reader = SharedFeedReader("kraken-test-feed", poll_interval=0.001)
+    tickers, trades = [], []
+    done = threading.Event()
+    try:
+        publisher.publish(messages)
+        reader.subscribe_ticker("XBT/USD").subscribe(tickers.append)
+        reader.subscribe_trade(["XBT/USD", "ETH/USD"]).subscribe(lambda x: (trades.append(x), len(trades) == 2 and done.set()))
+        messages.on_next({"event": "heartbeat"})
+        messages.on_next([340, {"c": ["1.0", "0.1"]}, "ticker", "XBT/USD"])
+        messages.on_next([341, {"c": ["2.0", "0.1"]}, "ticker", "ETH/USD"])
+        messages.on_next([
+            [342, [["1.0", "2.0", "1.1", "b", "l", ""]], "trade", "XBT/USD"],
+            [343, [["3.0", "4.0", "1.2", "s", "m", ""]], "trade", "ETH/USD"],
+        ])
+        assert done.wait(5)
+        assert tickers == [{"c": ["1.0", "0.1"]}]
+        assert [(pair, [trade.price for trade in payload]) for pair, payload in trades] == [("XBT/USD", ["1.0"]), ("ETH/USD", ["3.0"])]
+        assert publisher.published == 4
+        assert reader.missed == 0
+    finally:
+        publisher.close()
+
+
+def test_reader_rebuilds_messages_of_subscribed_channels_only():
+    messages = Subject()
+    publisher = SharedFeedPublisher("kraken-test-feed-book", 4096)
+    reader = SharedFeedReader("kraken-test-feed-book", poll_interval=0.001)
+    books = []
+    done = threading.Event()
+    try:
+        publisher.publish(messages)
+        reader.channel("book-10", "XBT/USD").subscribe(lambda x: (books.append(x), done.set()))
+        assert reader.messages.wants("book-10", "XBT/USD")
+        assert not reader.messages.wants("book-10", "ETH/USD")
+        messages.on_next([336, {"a": [["1.0", "2.0", "1.1"]]}, "book-10", "ETH/USD"])
+        messages.on_next([336, {"a": [["1.0", "2.0", "1.1"]]}, {"b": [["0.9", "1.0", "1.2"]], "c": "123"}, "book-10", "XBT/USD"])
+        assert done.wait(5)
+        assert books == [[0, {"a": [["1.0", "2.0", "1.1"]]}, {"b": [["0.9", "1.0", "1.2"]], "c": "123"}, "book-10", "XBT/USD"]]
+    finally:
+        publisher.close()
@@ -0,0 +1,93 @@
+import threading
+
+import orjson
+import pytest
+from reactivex import operators
+
+from bittrade_kraken_websocket.channels.ticker import subscribe_ticker
+from bittrade_kraken_websocket.connection.generic import raw_websocket_connection
+from bittrade_kraken_websocket.messages.listen import filter_new_socket_only, keep_messages_only
+
+websockets = pytest.importorskip("websockets")
+from websockets.sync.client import connect  # noqa: E402
+
+from bittrade_kraken_websocket.development.server import StandInServer, book_checksum  # noqa: E402
+
+
+@pytest.fixture
+def server():
+    server = StandInServer(rate=200).start_in_thread()
+    yield server
+    server.stop_thread()
+
+
+def receive_until(socket, predicate):
+    while True:
+        message = orjson.loads(socket.recv(timeout=2))
+        if predicate(message):
+            return message
+
+
+def test_library_subscribes_to_stand_in(server):
+    connection = raw_websocket_connection(server.url).pipe(operators.publish())
+    messages = connection.pipe(keep_messages_only(), operators.share())
+    received = []
+    done = threading.Event()
+
+    def on_next(x):
+        received.append(x)
+        if len({pair for pair, _ in received}) == 2:
+            done.set()
+
+    connection.pipe(
+        filter_new_socket_only(), subscribe_ticker(["XBT/USD", "ETH/USD"], messages)
+    ).subscribe(on_next)
+    subscription = connection.connect()
+    try:
+        assert done.wait(5)
+    finally:
+        subscription.dispose()
+    assert "c" in received[0][1]
+
+
+def test_order_lifecycle_with_sequences(server):
+    with connect(server.url) as socket:
+        assert orjson.loads(socket.recv(timeout=2))["event"] == "systemStatus"
+        socket.send(orjson.dumps({"event": "subscribe", "subscription": {"name": "openOrders", "token": "abc"}}).decode())
+        snapshot = receive_until(socket, lambda m: type(m) == list)
+        assert snapshot == [[], "openOrders", {"sequence": 1}]
+        socket.send(orjson.dumps({
+            "event": "addOrder", "reqid": 5, "ordertype": "limit", "type": "buy", "price": "0.998", "volume": "10", "pair": "USDT/USD", "token": "abc",
+        }).decode())
+        response = receive_until(socket, lambda m: type(m) == dict and m.get("event") == "addOrderStatus")
+        assert response["status"] == "ok" and response["reqid"] == 5
+        pending = receive_until(socket, lambda m: type(m) == list)
+        assert pending[0][0][response["txid"]]["status"] == "pending"
+        assert pending[2] == {"sequence": 2}
+        server.skip_sequence()
+        socket.send(orjson.dumps({"event": "cancelOrder", "reqid": 6, "txid": [response["txid"]]}).decode())
+        receive_until(socket, lambda m: type(m) == dict and m.get("event") == "cancelOrderStatus")
+        canceled = receive_until(socket, lambda m: type(m) == list and m[0][0][response["txid"]]["status"] == "canceled")
+        assert canceled[2] == {"sequence": 5}  # 3 was "open", 4 skipped
+
+
+def test_book_checksums(server):
+    with connect(server.url) as socket:
+        socket.send(orjson.dumps({"event": "subscribe", "pair": ["XBT/USD"], "subscription": {"name": "book", "depth": 10}}).decode())
+        snapshot = receive_until(socket, lambda m: type(m) == list)
+        assert snapshot[2] == "book-10"
+        asks = {float(p): (p, v) for p, v, _ in snapshot[1]["as"]}
+        bids = {float(p): (p, v) for p, v, _ in snapshot[1]["bs"]}
+        for _ in range(50):
+            update = receive_until(socket, lambda m: type(m) == list)[1]
+            for key, side in (("a", asks), ("b", bids)):
+                for price, volume, _ in update.get(key, []):
+                    if float(volume) == 0:
+                        side.pop(float(price), None)
+                    else:
+                        side[float(price)] = (price, volume)
+            expected = book_checksum([asks[p] for p in sorted(asks)], [bids[p] for p in sorted(bids, reverse=True)])
+            assert update["c"] == expected
+        # The sync client can't process the close handshake while a message is waiting to be read
+        socket.send(orjson.dumps({"event": "unsubscribe", "pair": ["XBT/USD"], "subscription": {"name": "book", "depth": 10}}).decode())
+        receive_until(socket, lambda m: type(m) == dict and m.get("status") == "unsubscribed")
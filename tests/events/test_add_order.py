@@ -2,12 +2,14 @@ import dataclasses
 from decimal import Decimal
 from unittest.mock import MagicMock
 
+import orjson
 import pytest
 import reactivex
 from reactivex import operators
 from reactivex.testing import ReactiveTest, TestScheduler
 from reactivex.testing.subscription import Subscription
 from bittrade_kraken_websocket.channels.open_orders import OpenOrdersPayloadEntryDescr
+from bittrade_kraken_websocket.connection.outbound import PRIORITY_ORDER
 
 from bittrade_kraken_websocket.events.add_order import (
     AddOrderRequest,
@@ -63,7 +65,7 @@ def test_pydantic_parse_description():
 
 def test_create_order_lifecycle():
     scheduler = TestScheduler()
-    socket = MagicMock()
+    socket = MagicMock(token="")
     messages = scheduler.create_hot_observable(
         from_sample("addOrder_messages_feed.json", start_time=0, time_interval=2)
     )
@@ -129,12 +131,12 @@ def test_create_order_lifecycle():
     #     assert message.value.kind == exp.value.kind
     #     assert message.value == exp.value
 
-    socket.send_json.assert_called_once_with(dataclasses.asdict(request_sample))
+    socket.send_bytes.assert_called_once_with(orjson.dumps(dataclasses.asdict(request_sample)), PRIORITY_ORDER)
 
 
 def test_create_order_lifecycle_timeout():
     scheduler = TestScheduler()
-    socket = MagicMock()
+    socket = MagicMock(token="")
     messages = scheduler.create_hot_observable(
         from_sample("addOrder_messages_feed.json", start_time=10, time_interval=6)
     )
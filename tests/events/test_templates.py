@@ -0,0 +1,65 @@
+import dataclasses
+
+import orjson
+
+from bittrade_kraken_websocket.channels import ChannelName
+from bittrade_kraken_websocket.channels.subscribe import subscription_messages, subscription_templates
+from bittrade_kraken_websocket.connection.enhanced_websocket import EnhancedWebsocket
+from bittrade_kraken_websocket.events.add_order import ADD_ORDER_VARIABLES, AddOrderRequest
+from bittrade_kraken_websocket.events.cancel_order import CANCEL_ORDER_VARIABLES, CancelOrderRequest
+from bittrade_kraken_websocket.events.edit_order import EDIT_ORDER_VARIABLES, EditOrderRequest
+from bittrade_kraken_websocket.events.models.order import OrderSide, OrderType
+from bittrade_kraken_websocket.events.templates import Template, encode_request
+
+
+class _Socket:
+    def send(self, data):
+        self.sent = data
+
+
+def send_json_bytes(payload, token=""):
+    socket = _Socket()
+    EnhancedWebsocket(socket, token=token).send_json(payload)  # type: ignore
+    return socket.sent
+
+
+def test_template_splices_variables():
+    template = Template({"event": "ping", "reqid": 0}, ["reqid"])
+
+    assert template.render(reqid=42) == b'{"event":"ping","reqid":42}'
+    assert template.render("abc", reqid=43) == b'{"event":"ping","reqid":43,"token":"abc"}'
+
+
+def test_add_order_same_bytes_as_send_json():
+    for price, token in [("10", ""), ("10.5", "abc"), ("11", "abc")]:
+        request = AddOrderRequest(
+            ordertype=OrderType.limit, type=OrderSide.buy, price=price, volume="1", pair="USDT/USD", reqid=5
+        )
+        assert encode_request(request, token, ADD_ORDER_VARIABLES) == send_json_bytes(
+            dataclasses.asdict(request), token
+        )
+
+
+def test_cancel_order_same_bytes_as_send_json():
+    request = CancelOrderRequest(txid=["OXW22X-FYBXP-JQDBJT"], reqid=7)
+
+    assert encode_request(request, "abc", CANCEL_ORDER_VARIABLES) == send_json_bytes(
+        dataclasses.asdict(request), "abc"
+    )
+
+
+def test_edit_order_drops_empty_fields():
+    request = EditOrderRequest(orderid="OXW22X", pair="USDT/USD", volume="2", price="1.01", reqid=8)
+    expected = {k: v for k, v in dataclasses.asdict(request).items() if v is not None and v != ""}
+
+    assert encode_request(request, "abc", EDIT_ORDER_VARIABLES, drop_empty=True) == send_json_bytes(
+        expected, "abc"
+    )
+
+
+def test_subscription_templates_put_token_in_subscription():
+    (template,) = subscription_templates(ChannelName.CHANNEL_OPEN_ORDERS)
+    (message,) = subscription_messages(ChannelName.CHANNEL_OPEN_ORDERS)
+
+    assert orjson.loads(template.render("abc")) == orjson.loads(send_json_bytes(message, "abc"))
+    assert orjson.loads(template.render("abc"))["subscription"]["token"] == "abc"
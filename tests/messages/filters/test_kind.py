@@ -1,5 +1,7 @@
 from bittrade_kraken_websocket.channels import ChannelName
-from bittrade_kraken_websocket.messages.filters.kind import _is_channel_message
+from reactivex.testing import ReactiveTest, TestScheduler
+
+from bittrade_kraken_websocket.messages.filters.kind import _is_channel_message, keep_channel_messages_batched
 
 
 def test_is_channel_message():
@@ -17,4 +19,18 @@ def test_is_channel_message():
     assert not func([1, 2, "ticker"])
     assert not func([1, 2, "ohlc"]) # from kraken's messages, it's always the second to last which is the channel
     assert func([1, "ticker", "USDT/USD"])
-    assert func([1, 2, "ticker", "USDT/USD"])
\ No newline at end of file
+    assert func([1, 2, "ticker", "USDT/USD"])
+
+
+def test_keep_channel_messages_batched():
+    scheduler = TestScheduler()
+    source = scheduler.create_hot_observable(
+        ReactiveTest.on_next(300, [[1, {}, "ticker", "XBT/USD"], [2, {}, "ticker", "ETH/USD"], [3, {}, "spread", "XBT/USD"]]),
+        ReactiveTest.on_next(400, [[2, {}, "ticker", "ETH/USD"]]),
+    )
+    results = scheduler.start(lambda: source.pipe(
+        keep_channel_messages_batched(ChannelName.CHANNEL_TICKER, "XBT/USD")
+    ))
+    assert results.messages == [
+        ReactiveTest.on_next(300, [[1, {}, "ticker", "XBT/USD"]]),
+    ]
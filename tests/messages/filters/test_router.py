@@ -0,0 +1,136 @@
+from unittest.mock import MagicMock
+
+import orjson
+
+from reactivex import operators
+from reactivex.testing import ReactiveTest, TestScheduler
+
+from bittrade_kraken_websocket.channels import ChannelName
+from bittrade_kraken_websocket.channels.subscribe import subscribe_to_channel
+from bittrade_kraken_websocket.messages.filters.router import ChannelRouter, route_channels
+from tests.helpers.subscriptions import from_to
+
+on_next = ReactiveTest.on_next
+on_error = ReactiveTest.on_error
+on_completed = ReactiveTest.on_completed
+
+
+def test_router_routes_by_channel_and_pair():
+    scheduler = TestScheduler()
+    messages = scheduler.create_hot_observable(
+        on_next(210, [1, {"a": 1}, "ticker", "XBT/USD"]),
+        on_next(220, [2, {"a": 2}, "ticker", "ETH/USD"]),
+        on_next(230, [3, ["t"], "trade", "XBT/USD"]),
+        on_next(240, {"event": "heartbeat"}),
+        on_next(250, [[{"order": 1}], "openOrders", {"sequence": 1}]),
+    )
+    router = messages.pipe(route_channels())
+    ticker_xbt = scheduler.create_observer()
+    ticker_any = scheduler.create_observer()
+    open_orders = scheduler.create_observer()
+    everything = scheduler.create_observer()
+    router.channel("ticker", "XBT/USD").subscribe(ticker_xbt)
+    router.channel("ticker").subscribe(ticker_any)
+    router.channel("openOrders").subscribe(open_orders)
+    router.subscribe(everything)
+    scheduler.start()
+
+    assert ticker_xbt.messages == [on_next(210, [1, {"a": 1}, "ticker", "XBT/USD"])]
+    assert ticker_any.messages == [
+        on_next(210, [1, {"a": 1}, "ticker", "XBT/USD"]),
+        on_next(220, [2, {"a": 2}, "ticker", "ETH/USD"]),
+    ]
+    assert open_orders.messages == [
+        on_next(250, [[{"order": 1}], "openOrders", {"sequence": 1}])
+    ]
+    assert len(everything.messages) == 5
+
+
+def test_router_subscribes_source_once_and_releases_it():
+    scheduler = TestScheduler()
+    messages = scheduler.create_hot_observable(
+        on_next(210, [1, {"a": 1}, "ticker", "XBT/USD"]),
+    )
+    router = ChannelRouter(messages)
+    first = router.channel("ticker", "XBT/USD").subscribe(scheduler.create_observer())
+    second = router.channel("ticker", "ETH/USD").subscribe(scheduler.create_observer())
+    scheduler.schedule_absolute(300, lambda *_: first.dispose())
+    scheduler.schedule_absolute(400, lambda *_: second.dispose())
+    scheduler.start()
+
+    assert messages.subscriptions == [from_to(0, 400)]
+    assert router.routes_count == 0
+
+
+def test_router_releases_source_after_subscription_without_pairs():
+    scheduler = TestScheduler()
+    messages = scheduler.create_hot_observable(on_next(210, [1, {"a": 1}, "ticker", "XBT/USD"]))
+    router = ChannelRouter(messages)
+    subscription = router.channel("ticker", []).subscribe(scheduler.create_observer())
+    scheduler.schedule_absolute(300, lambda *_: subscription.dispose())
+    scheduler.start()
+
+    assert messages.subscriptions == [from_to(0, 300)]
+
+
+def test_router_propagates_errors():
+    scheduler = TestScheduler()
+    error = Exception("boom")
+    messages = scheduler.create_hot_observable(on_error(210, error))
+    router = ChannelRouter(messages)
+    observer = scheduler.create_observer()
+    router.channel("ticker", "XBT/USD").subscribe(observer)
+    scheduler.start()
+
+    assert observer.messages == [on_error(210, error)]
+
+
+def test_subscribe_to_channel_uses_router():
+    scheduler = TestScheduler()
+    socket = MagicMock(token="")
+    messages = scheduler.create_hot_observable(
+        on_next(210, [1, ["a"], "ohlc-5", "XBT/USD"]),
+        on_next(220, [1, ["b"], "ohlc-1", "XBT/USD"]),
+        on_next(230, [2, ["c"], "ohlc-5", "ETH/USD"]),
+    )
+    router = ChannelRouter(messages)
+    sockets = scheduler.create_hot_observable(on_next(205, socket))
+
+    results = scheduler.start(
+        lambda: sockets.pipe(
+            subscribe_to_channel(
+                router,
+                ChannelName.CHANNEL_OHLC,
+                pair="XBT/USD",
+                subscription_kwargs={"interval": 5},
+            ),
+            operators.map(lambda x: x[1]),
+        )
+    )
+
+    assert results.messages == [on_next(210, ["a"])]
+    assert orjson.loads(socket.send_bytes.call_args_list[0].args[0])["subscription"] == {
+        "name": "ohlc",
+        "interval": 5,
+    }
+
+
+def test_router_routes_multiple_pairs_to_one_observer():
+    scheduler = TestScheduler()
+    error = Exception("boom")
+    messages = scheduler.create_hot_observable(
+        on_next(210, [1, {"a": 1}, "ticker", "XBT/USD"]),
+        on_next(220, [2, {"a": 2}, "ticker", "ETH/USD"]),
+        on_next(230, [3, {"a": 3}, "ticker", "DOT/USD"]),
+        on_error(240, error),
+    )
+    router = ChannelRouter(messages)
+    observer = scheduler.create_observer()
+    router.channel("ticker", ["XBT/USD", "ETH/USD"]).subscribe(observer)
+    scheduler.start()
+
+    assert observer.messages == [
+        on_next(210, [1, {"a": 1}, "ticker", "XBT/USD"]),
+        on_next(220, [2, {"a": 2}, "ticker", "ETH/USD"]),
+        on_error(240, error),
+    ]
@@ -0,0 +1,19 @@
+from bittrade_kraken_websocket.messages.classify import (
+    FRAME_CHANNEL,
+    FRAME_EVENT,
+    FRAME_HEARTBEAT,
+    FRAME_STATUS,
+    classify_frame,
+)
+
+
+def test_classify_frame():
+    assert classify_frame('{"event":"heartbeat"}') == FRAME_HEARTBEAT
+    assert classify_frame(b'{"event":"heartbeat"}') == FRAME_HEARTBEAT
+    assert classify_frame('{"connectionID":1,"event":"systemStatus","status":"online"}') == FRAME_STATUS
+    assert classify_frame(b'{"event":"systemStatus","status":"maintenance"}') == FRAME_STATUS
+    assert classify_frame('[1028,{"a":[]},"ticker","USDT/USD"]') == FRAME_CHANNEL
+    assert classify_frame(b'[[{"T":{}}],"ownTrades",{"sequence":1}]') == FRAME_CHANNEL
+    assert classify_frame('{"event":"subscriptionStatus","status":"subscribed"}') == FRAME_EVENT
+    assert classify_frame(b'{"event":"addOrderStatus"}') == FRAME_EVENT
+    assert classify_frame("") == FRAME_EVENT
@@ -0,0 +1,44 @@
+from reactivex.subject import Subject
+from reactivex.testing import TestScheduler
+
+from bittrade_kraken_websocket.operators import conflate_latest
+
+
+def test_conflate_latest_keeps_newest_per_key():
+    scheduler = TestScheduler()
+    source = Subject()
+    received = []
+    source.pipe(conflate_latest(scheduler=scheduler)).subscribe(
+        on_next=received.append, on_completed=lambda: received.append("completed")
+    )
+    # Observer is busy (scheduler not running yet) while these arrive
+    for value in [("XBT/USD", 1), ("ETH/USD", 1), ("XBT/USD", 2), ("XBT/USD", 3)]:
+        source.on_next(value)
+    source.on_completed()
+    scheduler.start()
+
+    assert received == [("XBT/USD", 3), ("ETH/USD", 1), "completed"]
+
+
+def test_conflate_latest_delivers_every_value_when_keeping_up():
+    scheduler = TestScheduler()
+    source = Subject()
+    received = []
+    source.pipe(conflate_latest(scheduler=scheduler)).subscribe(received.append)
+    for value in [{"c": ["1"]}, {"c": ["2"]}]:
+        source.on_next(value)
+        scheduler.start()
+
+    assert received == [{"c": ["1"]}, {"c": ["2"]}]
+
+
+def test_conflate_latest_custom_key():
+    scheduler = TestScheduler()
+    source = Subject()
+    received = []
+    source.pipe(conflate_latest(key=lambda x: x % 2, scheduler=scheduler)).subscribe(received.append)
+    for value in range(6):
+        source.on_next(value)
+    scheduler.start()
+
+    assert received == [4, 5]
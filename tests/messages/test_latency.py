@@ -0,0 +1,63 @@
+from unittest.mock import MagicMock
+
+from reactivex.subject import Subject
+
+from bittrade_kraken_websocket.channels.ticker import subscribe_ticker
+from bittrade_kraken_websocket.channels.trade import TradePayload, subscribe_trade
+from bittrade_kraken_websocket.messages.latency import LatencyCollector, LatencyHistogram
+from bittrade_kraken_websocket.messages.timestamps import Stamped, StampedMessage
+
+
+def test_histogram_percentiles():
+    histogram = LatencyHistogram()
+    for value in range(1, 10_001):
+        histogram.record(value * 1_000)
+    histogram.record(-5)
+
+    assert histogram.count == 10_001
+    assert histogram.min == 0
+    assert histogram.max == 10_000_000
+    # ~3% precision
+    assert abs(histogram.percentile(50) - 5_000_000) < 5_000_000 * 0.03
+    assert abs(histogram.percentile(99) - 9_900_000) < 9_900_000 * 0.03
+    assert histogram.percentile(100) == 10_000_000
+
+    other = LatencyHistogram()
+    other.record(20_000_000)
+    histogram.merge(other)
+    assert histogram.count == 10_002
+    assert histogram.max == 20_000_000
+
+
+def test_stamped_payloads_and_collector():
+    now = [1_000]
+    collector = LatencyCollector(clock=lambda: now[0])
+    messages = Subject()
+    sockets = Subject()
+    tickers, trades = [], []
+    sockets.pipe(
+        subscribe_ticker("XBT/USD", messages, stamped=True),
+        collector.track_delivery("ticker"),
+    ).subscribe(tickers.append)
+    sockets.pipe(
+        subscribe_trade("XBT/USD", messages, stamped=True),
+        collector.track_delivery("trade"),
+    ).subscribe(trades.append)
+    sockets.on_next(MagicMock(token=""))
+    raw = messages.pipe(collector.track_exchange_lag())
+    raw.subscribe()
+
+    received_at = 1_672_125_043_000_000_000
+    ticker = StampedMessage([1, {"c": ["1.0", "1"]}, "ticker", "XBT/USD"], 400, received_at)
+    trade = StampedMessage([2, [["1.0", "2.0", "1672125042.500000", "b", "l", ""]], "trade", "XBT/USD"], 900, received_at)
+    for message in (ticker, trade):
+        messages.on_next(message)
+
+    assert tickers == [Stamped({"c": ["1.0", "1"]}, 400, received_at)]
+    assert trades == [Stamped([TradePayload("1.0", "2.0", "1672125042.500000", "b", "l", "")], 900, received_at)]
+    assert collector.delivery["ticker"].max == 600
+    assert collector.delivery["trade"].max == 100
+    # Ticker messages have no exchange time
+    assert list(collector.exchange_lag) == ["trade"]
+    assert abs(collector.exchange_lag["trade"].max - 500_000_000) <= 1_000
+    assert collector.snapshot()["delivery"]["ticker"]["count"] == 1
@@ -1,9 +1,9 @@
 from reactivex.testing import ReactiveTest, TestScheduler
 
 from bittrade_kraken_websocket.connection.enhanced_websocket import EnhancedWebsocket
-from bittrade_kraken_websocket.connection.generic import WEBSOCKET_MESSAGE, WEBSOCKET_STATUS, WEBSOCKET_HEARTBEAT
+from bittrade_kraken_websocket.connection.generic import WEBSOCKET_MESSAGE, WEBSOCKET_MESSAGE_BATCH, WEBSOCKET_STATUS, WEBSOCKET_HEARTBEAT
 from bittrade_kraken_websocket.connection.status import WEBSOCKET_OPENED, WEBSOCKET_CLOSED
-from bittrade_kraken_websocket.messages.listen import keep_messages_only, keep_status_only, filter_new_socket_only
+from bittrade_kraken_websocket.messages.listen import keep_messages_only, keep_message_batches_only, keep_status_only, filter_new_socket_only
 
 on_next = ReactiveTest.on_next
 on_error = ReactiveTest.on_error
@@ -27,6 +27,22 @@ def test_listen_message_only():
         on_next(500, '{"a": 42}'),
     ]
 
+def test_listen_message_batches_only():
+    scheduler = TestScheduler()
+    source = scheduler.create_hot_observable(
+        on_next(300, ['a', WEBSOCKET_MESSAGE_BATCH, [[1], [2]]]),
+        on_next(400, ['a', WEBSOCKET_STATUS, 'c']),
+        on_next(500, ['b', WEBSOCKET_MESSAGE, [3]]),
+    )
+
+    results = scheduler.start(lambda: source.pipe(
+        keep_message_batches_only()
+    ))
+
+    assert results.messages == [
+        on_next(300, [[1], [2]]),
+    ]
+
 def test_listen_status_only():
     scheduler = TestScheduler()
     source = scheduler.create_hot_observable(
@@ -0,0 +1,58 @@
+from unittest.mock import MagicMock
+
+import orjson
+from reactivex.subject import Subject
+from reactivex.testing import ReactiveTest, TestScheduler
+
+from bittrade_kraken_websocket.channels.ticker import subscribe_ticker
+from bittrade_kraken_websocket.messages.watchdog import StalenessWatchdog
+
+on_next = ReactiveTest.on_next
+
+
+def test_watchdog_resubscribes_stale_pair_then_recycles_socket():
+    scheduler = TestScheduler()
+    socket = MagicMock(token="")
+    sockets = scheduler.create_hot_observable(on_next(205, socket))
+    messages = scheduler.create_hot_observable(
+        on_next(210, [2, {"a": 1}, "ticker", "ETH/USD"]),
+        *[on_next(time, [1, {"a": time}, "ticker", "XBT/USD"]) for time in range(210, 400, 20)],
+    )
+    watchdog = StalenessWatchdog(
+        {"ticker": 50}, recycle_after=1, check_interval=10, clock=lambda: scheduler.clock, scheduler=scheduler
+    )
+    sockets.pipe(subscribe_ticker(["XBT/USD", "ETH/USD"], messages, watchdog=watchdog)).subscribe()
+
+    scheduler.advance_to(300)
+    sent = [orjson.loads(call.args[0]) for call in socket.send_bytes.call_args_list]
+    assert [(m["event"], m["pair"]) for m in sent] == [
+        ("subscribe", ["XBT/USD", "ETH/USD"]),
+        ("unsubscribe", ["ETH/USD"]),
+        ("subscribe", ["ETH/USD"]),
+    ]
+    socket.socket.close.assert_not_called()
+
+    # Resubscribing didn't help
+    scheduler.advance_to(340)
+    socket.socket.close.assert_called_once()
+    assert socket.send_bytes.call_count == 3
+    assert watchdog.watched[("ticker", "XBT/USD")]["stale"] == 0
+
+
+def test_watchdog_learns_interval():
+    now = [0.0]
+    watchdog = StalenessWatchdog(factor=10, min_timeout=2, max_timeout=300, warmup=3, clock=lambda: now[0])
+    resubscribe = MagicMock()
+    watch = watchdog.watch("trade", ["XBT/USD"], resubscribe, MagicMock())
+    source = Subject()
+    subscription = source.pipe(watch).subscribe()
+    assert watchdog.watched[("trade", "XBT/USD")]["timeout"] == 300
+    for _ in range(5):
+        now[0] += 0.5
+        source.on_next([1, [], "trade", "XBT/USD"])
+    assert watchdog.watched[("trade", "XBT/USD")]["timeout"] == 5.0
+    now[0] += 5.5
+    watchdog.check()
+    resubscribe.assert_called_once_with(["XBT/USD"])
+    subscription.dispose()
+    assert watchdog.watched == {}
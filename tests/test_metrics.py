@@ -0,0 +1,71 @@
+import threading
+
+from reactivex import operators
+from reactivex.subject import Subject
+
+from bittrade_kraken_websocket.connection.enhanced_websocket import EnhancedWebsocket
+from bittrade_kraken_websocket.connection.generic import message_to_bundle
+from bittrade_kraken_websocket.messages.sequence import in_sequence, retry_on_invalid_sequence
+from bittrade_kraken_websocket.metrics import MetricsRegistry, registry
+
+
+def test_counters_from_several_threads():
+    metrics = MetricsRegistry()
+
+    def count():
+        for _ in range(1000):
+            metrics.count_message([1, {}, "ticker", "XBT/USD"], 10)
+            metrics.increment("decode_errors_total")
+
+    threads = [threading.Thread(target=count) for _ in range(4)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    metrics.count_message([[], "ownTrades", {"sequence": 1}], 5)
+
+    assert metrics.snapshot() == {
+        "messages_total": {("ticker", "XBT/USD"): 4000, ("ownTrades", ""): 1},
+        "bytes_total": {("ticker", "XBT/USD"): 40000, ("ownTrades", ""): 5},
+        "decode_errors_total": {(): 4000},
+    }
+
+
+def test_prometheus_text():
+    metrics = MetricsRegistry()
+    metrics.count_message([1, {}, "ticker", 'X"Y'], 10)
+    metrics.increment("backoff_seconds_total", value=1.5)
+
+    assert metrics.to_prometheus() == (
+        "# HELP kraken_ws_backoff_seconds_total Time waited by retry_with_backoff before reconnecting\n"
+        "# TYPE kraken_ws_backoff_seconds_total counter\n"
+        "kraken_ws_backoff_seconds_total 1.5\n"
+        "# HELP kraken_ws_bytes_total Size of the channel messages received, as sent by Kraken\n"
+        "# TYPE kraken_ws_bytes_total counter\n"
+        'kraken_ws_bytes_total{channel="ticker",pair="X\\"Y"} 10\n'
+        "# HELP kraken_ws_messages_total Channel messages received\n"
+        "# TYPE kraken_ws_messages_total counter\n"
+        'kraken_ws_messages_total{channel="ticker",pair="X\\"Y"} 1\n'
+    )
+
+
+def _value(name, labels=()):
+    return registry.snapshot().get(name, {}).get(labels, 0)
+
+
+def test_library_updates_registry():
+    socket = EnhancedWebsocket(None)  # type: ignore
+    messages, errors = _value("messages_total", ("spread", "ETH/USD")), _value("decode_errors_total")
+    message_to_bundle(socket, '[1,["1.0","2.0","1.1","1","1"],"spread","ETH/USD"]')
+    message_to_bundle(socket, "not json")
+    assert _value("messages_total", ("spread", "ETH/USD")) == messages + 1
+    assert _value("decode_errors_total") == errors + 1
+
+    resets = _value("sequence_resets_total", ("openOrders",))
+    source = Subject()
+    received = []
+    source.pipe(in_sequence(), retry_on_invalid_sequence(), operators.take(3)).subscribe(received.append)
+    for sequence in (1, 2, 5, 8):
+        source.on_next([[], "openOrders", {"sequence": sequence}])
+    assert [message[2]["sequence"] for message in received] == [1, 2, 8]
+    assert _value("sequence_resets_total", ("openOrders",)) == resets + 1